@@ -1,6 +1,6 @@
 {
     "name": "AFIP RG 5329 - Percepción IVA Simplificado",
-    "version": "18.0.1.0.0",
+    "version": "18.0.1.1.0",
     "category": "Accounting/Localizations/Argentina",
     "summary": "Régimen de percepción de IVA RG 5329 - Versión Simplificada - Odoo 18",
     "description": """
@@ -37,9 +37,12 @@
     "data": [
         "security/ir.model.access.csv",
         "data/tax_data.xml",
+        "data/ir_cron_data.xml",
         "views/product_template_views.xml",
         "views/res_partner_views.xml",
-        "views/account_tax_views.xml"
+        "views/account_tax_views.xml",
+        "views/order_rg5329_views.xml",
+        "views/rg5329_profile_trace_views.xml"
     ],
     "assets": {
         "web.assets_backend": [
@@ -0,0 +1 @@
+from . import rg5329_recompute
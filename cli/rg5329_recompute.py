@@ -0,0 +1,122 @@
+"""
+Recálculo masivo y en paralelo de la percepción RG 5329 almacenada en facturas.
+
+Uso::
+
+    odoo-bin --addons-path=/mnt/extra-addons,/usr/lib/python3/dist-packages/odoo/addons \
+        rg5329_recompute -c /etc/odoo/odoo.conf -d mi_base --workers 8
+
+``--addons-path`` tiene que ser el primer argumento: odoo-bin solo busca
+comandos dentro de los addons cuando lo recibe antes del nombre del comando.
+
+Las facturas y notas de crédito de cliente se dividen en rangos de id con
+la misma cantidad de moves. Cada rango lo procesa un proceso del pool, con
+su propio registry y cursor, y se confirma por separado: si el comando se
+interrumpe, los rangos ya terminados quedan guardados.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from odoo import SUPERUSER_ID, api, sql_db
+from odoo.cli import Command
+from odoo.modules.registry import Registry
+from odoo.tools import SQL, config
+
+_logger = logging.getLogger(__name__)
+
+
+def _worker_pool(workers):
+    """
+    Pool de procesos por fork: los hijos heredan la configuración y el
+    addons_path ya inicializados. Con spawn el hijo no puede des-serializar
+    funciones de ``odoo.addons.modulo_rg5329`` porque todavía no conoce el
+    addons_path. Quien lo usa debe cerrar antes las conexiones a la base.
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+
+
+def _recompute_partition(dbname, min_id, max_id):
+    """Recalcula un rango de ids en su propio registry/cursor y lo confirma"""
+    registry = Registry(dbname)
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        return env['account.move']._rg5329_recompute_perception_range(min_id, max_id)
+
+
+class Rg5329Recompute(Command):
+    """Recompute the stored RG 5329 perception of customer invoices in parallel"""
+    name = 'rg5329_recompute'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description=self.__doc__,
+        )
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='database', required=True, help="Database name")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help="Number of worker processes (default: CPU count)")
+        parser.add_argument('--partition-size', type=int, default=10000,
+                            help="Invoices per partition / transaction (default: 10000)")
+        args, odoo_args = parser.parse_known_args(cmdargs)
+
+        config_args = ['-d', args.database, *odoo_args]
+        if args.config:
+            config_args += ['-c', args.config]
+        config.parse_config(config_args)
+
+        with Registry(args.database).cursor() as cr:
+            partitions = self._get_partitions(cr, args.partition_size)
+        total = sum(count for _min_id, _max_id, count in partitions)
+        _logger.info("RG5329 recompute: %d invoices in %d partitions, %d workers",
+                     total, len(partitions), args.workers)
+        if not partitions:
+            return
+
+        done = 0
+        t0 = time.monotonic()
+        # Los hijos no deben heredar las conexiones abiertas por _get_partitions
+        sql_db.close_all()
+        with _worker_pool(args.workers) as executor:
+            futures = {
+                executor.submit(_recompute_partition, args.database, min_id, max_id): (min_id, max_id)
+                for min_id, max_id, _count in partitions
+            }
+            for future in as_completed(futures):
+                min_id, max_id = futures[future]
+                try:
+                    done += future.result()
+                except Exception:
+                    _logger.exception("RG5329 recompute: partition %d-%d failed (rolled back)", min_id, max_id)
+                    continue
+                elapsed = time.monotonic() - t0
+                rate = done / elapsed if elapsed else 0.0
+                eta = (total - done) / rate if rate else 0.0
+                _logger.info("RG5329 recompute: %d/%d invoices (%.1f%%), %.0f invoices/s, ETA %.0fs",
+                             done, total, 100.0 * done / total, rate, eta)
+
+        _logger.info("RG5329 recompute: finished %d/%d invoices in %.1fs",
+                     done, total, time.monotonic() - t0)
+
+    def _get_partitions(self, cr, partition_size):
+        """[(min_id, max_id, count)] con ``partition_size`` moves por rango"""
+        cr.execute(SQL(
+            """
+            SELECT MIN(id), MAX(id), COUNT(*)
+              FROM (
+                  SELECT id, (ROW_NUMBER() OVER (ORDER BY id) - 1) / %s AS bucket
+                    FROM account_move
+                   WHERE move_type IN ('out_invoice', 'out_refund')
+              ) moves
+          GROUP BY bucket
+          ORDER BY bucket
+            """,
+            partition_size,
+        ))
+        return cr.fetchall()
@@ -0,0 +1,26 @@
+import hmac
+
+from odoo import http
+from odoo.http import request
+from werkzeug.exceptions import NotFound
+
+from ..utils import metrics_store
+
+
+class Rg5329MetricsController(http.Controller):
+
+    @http.route('/rg5329/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def rg5329_metrics(self, **kwargs):
+        """Métricas RG 5329 de todos los procesos en formato Prometheus (Bearer token)"""
+        token = metrics_store.get_token()
+        if not token:
+            raise NotFound()
+        authorization = request.httprequest.headers.get('Authorization', '')
+        if not hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return request.make_response(
+                'Unauthorized', status=401, headers=[('WWW-Authenticate', 'Bearer')],
+            )
+        return request.make_response(
+            metrics_store.render_prometheus(),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
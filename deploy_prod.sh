@@ -142,6 +142,7 @@ if [[ -f "$TEST_SCRIPT" ]] && command -v python3 &>/dev/null; then
     python3 "$TEST_SCRIPT" \
         --host "http://$PROD_HOST:8069" \
         --db "$DB_NAME" \
+        --concurrent \
         && log "Tests OK" \
         || { log "Algunos tests fallaron. Ver salida arriba."; TESTS_FAILED=1; }
 else
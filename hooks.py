@@ -0,0 +1,15 @@
+def _resync_rg5329_threshold_amounts(env, batch_size=1000):
+    """
+    Recalcula el monto umbral RG 5329 almacenado de todos los pedidos no
+    cancelados (también los confirmados: _get_stock_move_price_unit lo lee
+    al agregar líneas a una orden de compra confirmada). Lo usan las
+    migraciones de bases donde el campo existía sin ser calculado.
+    """
+    for model in ('sale.order', 'purchase.order'):
+        Order = env[model]
+        field = Order._fields['rg5329_threshold_amount']
+        order_ids = Order.search([('state', '!=', 'cancel')]).ids
+        for start in range(0, len(order_ids), batch_size):
+            env.add_to_compute(field, Order.browse(order_ids[start:start + batch_size]))
+            Order.flush_model(['rg5329_threshold_amount'])
+            env.invalidate_all()
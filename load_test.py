@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga XML-RPC para modulo_rg5329
+Ejecuta escenarios de pedidos de venta y compra en paralelo (una conexión por
+hilo) y reporta el throughput y la latencia p50/p95/p99 por método RPC, junto
+con el delta de rg5329_taxes_restored_total leído de /rg5329/metrics.
+
+Escenarios (cada iteración):
+    sale      crear SO → agregar líneas → cruzar el umbral → action_confirm
+    purchase  crear PO → agregar líneas → cruzar el umbral → button_confirm
+
+Uso:
+    python3 load_test.py --threads 8 --iterations 20
+    python3 load_test.py --host http://mi-servidor:8069 --db odoo --password secret \\
+        --scenario purchase --threads 16 --duration 120 --metrics-token $RG5329_METRICS_TOKEN
+"""
+import argparse
+import itertools
+import math
+import sys
+import threading
+import time
+import urllib.request
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from test_upgrade import OdooClient
+
+# Debajo y por encima del umbral de $10M, repartido entre las líneas del pedido
+BELOW_THRESHOLD = 5_000_000
+ABOVE_THRESHOLD = 20_000_000
+
+TAXES_RESTORED_METRIC = "rg5329_taxes_restored_total"
+
+
+class Stats:
+    """Latencias por método RPC y escenarios completados, compartidas entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.scenarios: dict[str, int] = {}
+        self.failed_scenarios: dict[str, int] = {}
+
+    def add_call(self, key: str, elapsed_ms: float, error: bool = False):
+        with self._lock:
+            self.latencies.setdefault(key, []).append(elapsed_ms)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def add_scenario(self, name: str, ok: bool):
+        with self._lock:
+            counter = self.scenarios if ok else self.failed_scenarios
+            counter[name] = counter.get(name, 0) + 1
+
+
+class TimedClient(OdooClient):
+    """OdooClient que mide cada llamada execute_kw como ``modelo.método``"""
+
+    def __init__(self, stats: Stats, *args):
+        super().__init__(*args)
+        self.stats = stats
+
+    def execute(self, model: str, method: str, *args, **kwargs) -> Any:
+        t0 = time.perf_counter()
+        error = False
+        try:
+            return super().execute(model, method, *args, **kwargs)
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.stats.add_call(f"{model}.{method}", (time.perf_counter() - t0) * 1000, error)
+
+
+class LoadRunner:
+    """
+    Pool de hilos con un TimedClient (y por lo tanto sus ServerProxy) por
+    hilo: xmlrpc.client.ServerProxy no es seguro para usar desde varios hilos.
+    """
+
+    def __init__(self, args, fixtures: dict):
+        self.args = args
+        self.fixtures = fixtures
+        self.stats = Stats()
+        self._local = threading.local()
+        self._sequence = itertools.count(1)
+
+    def _client(self) -> TimedClient:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = TimedClient(
+                self.stats, self.args.host, self.args.db, self.args.user, self.args.password
+            )
+        return client
+
+    def _line_values(self, qty_field: str, count: int, total: float, label: str) -> list:
+        price_unit = round(total / count, 2)
+        return [(0, 0, {
+            "product_id": self.fixtures["product_id"],
+            qty_field: 1,
+            "price_unit": price_unit,
+            "name": f"[LOAD] RG5329 {label}",
+        }) for _ in range(count)]
+
+    def _run_order(self, name: str, model: str, line_model: str, qty_field: str, confirm: str):
+        """crear → agregar líneas → cruzar el umbral → confirmar (y limpiar)"""
+        client = self._client()
+        lines = self.args.lines
+        label = f"{name} #{next(self._sequence)}"
+        order_id = None
+        try:
+            # Primer línea al crear, el resto en una segunda escritura (carga incremental)
+            order_id = client.execute(model, "create", {
+                "partner_id": self.fixtures["partner_id"],
+                "order_line": self._line_values(qty_field, 1, BELOW_THRESHOLD / lines, label),
+            })
+            if lines > 1:
+                client.execute(model, "write", [order_id], {
+                    "order_line": self._line_values(
+                        qty_field, lines - 1, BELOW_THRESHOLD * (lines - 1) / lines, label
+                    ),
+                })
+            # Subir la primera línea lo suficiente para superar el umbral
+            line_ids = client.execute(line_model, "search", [["order_id", "=", order_id]], limit=1)
+            client.execute(line_model, "write", line_ids, {
+                "price_unit": ABOVE_THRESHOLD - BELOW_THRESHOLD * (lines - 1) / lines,
+            })
+            client.execute(model, confirm, [order_id])
+            self.stats.add_scenario(name, True)
+        except Exception as e:
+            self.stats.add_scenario(name, False)
+            if self.args.verbose:
+                print(f"    [FAIL] {label}: {e}")
+        finally:
+            if order_id and not self.args.keep:
+                self._cleanup(client, model, order_id)
+
+    def _cleanup(self, client: OdooClient, model: str, order_id: int):
+        # Sin medir: usa el cliente base para no mezclar la limpieza en las latencias
+        cancel = "action_cancel" if model == "sale.order" else "button_cancel"
+        for method in (cancel, "unlink"):
+            try:
+                OdooClient.execute(client, model, method, [order_id])
+            except Exception:
+                pass
+
+    def sale(self):
+        self._run_order("sale", "sale.order", "sale.order.line", "product_uom_qty", "action_confirm")
+
+    def purchase(self):
+        self._run_order("purchase", "purchase.order", "purchase.order.line", "product_qty", "button_confirm")
+
+    def _worker(self, deadline: float | None, iterations: int):
+        scenarios = [getattr(self, name) for name in self.args.scenario]
+        done = 0
+        while (deadline is None and done < iterations) or (deadline is not None and time.monotonic() < deadline):
+            scenarios[done % len(scenarios)]()
+            done += 1
+
+    def run(self) -> float:
+        deadline = time.monotonic() + self.args.duration if self.args.duration else None
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.threads, thread_name_prefix="rg5329-load") as pool:
+            futures = [
+                pool.submit(self._worker, deadline, self.args.iterations)
+                for _ in range(self.args.threads)
+            ]
+            for future in futures:
+                future.result()
+        return time.perf_counter() - t0
+
+
+def resolve_fixtures(client: OdooClient) -> dict:
+    """Partner RI no exento y producto con apply_rg5329, como en test_upgrade.py"""
+    partner_ids = client.execute(
+        "res.partner", "search",
+        [["l10n_ar_afip_responsibility_type_id.code", "=", "1"],
+         ["rg5329_exempt", "=", False]],
+        limit=1
+    )
+    if not partner_ids:
+        raise LookupError("No hay partners RI no exentos para la prueba de carga")
+    product_ids = client.execute(
+        "product.product", "search",
+        [["apply_rg5329", "=", True], ["purchase_ok", "=", True], ["sale_ok", "=", True]],
+        limit=1
+    )
+    if not product_ids:
+        raise LookupError("No hay productos con apply_rg5329=True para la prueba de carga")
+    return {"partner_id": partner_ids[0], "product_id": product_ids[0]}
+
+
+def scrape_counter(host: str, token: str, metric: str) -> float | None:
+    """Suma de todas las series de ``metric`` en /rg5329/metrics (None si no está disponible)"""
+    request = urllib.request.Request(
+        f"{host}/rg5329/metrics", headers={"Authorization": f"Bearer {token}"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            body = response.read().decode()
+    except Exception as e:
+        print(f"[WARN] no se pudo leer /rg5329/metrics: {e}")
+        return None
+    total = 0.0
+    for line in body.splitlines():
+        if line.startswith(metric) and not line.startswith("#"):
+            name = line.split("{", 1)[0].split(" ", 1)[0]
+            if name == metric:
+                total += float(line.rsplit(" ", 1)[1])
+    return total
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre ``values`` ya ordenados"""
+    index = max(0, math.ceil(pct / 100 * len(values)) - 1)
+    return values[index]
+
+
+def print_report(stats: Stats, elapsed: float, restored_delta: float | None):
+    total_calls = sum(len(v) for v in stats.latencies.values())
+    total_scenarios = sum(stats.scenarios.values())
+    print(f"\n{'=' * 84}")
+    print(f"  Duración: {elapsed:.1f} s   Llamadas RPC: {total_calls} ({total_calls / elapsed:.1f}/s)"
+          f"   Escenarios OK: {total_scenarios} ({total_scenarios / elapsed:.2f}/s)")
+    for name in sorted(set(stats.scenarios) | set(stats.failed_scenarios)):
+        print(f"    {name:<10} ok={stats.scenarios.get(name, 0):<6} fallidos={stats.failed_scenarios.get(name, 0)}")
+    print(f"{'-' * 84}")
+    print(f"  {'método':<36} {'n':>6} {'/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'err':>4}")
+    for key in sorted(stats.latencies):
+        values = sorted(stats.latencies[key])
+        print(f"  {key:<36} {len(values):>6} {len(values) / elapsed:>7.1f} "
+              f"{percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} "
+              f"{percentile(values, 99):>9.1f} {stats.errors.get(key, 0):>4}")
+    print(f"{'-' * 84}")
+    if restored_delta is None:
+        print(f"  {TAXES_RESTORED_METRIC}: sin datos (usar --metrics-token)")
+    else:
+        print(f"  {TAXES_RESTORED_METRIC} delta: {restored_delta:g}")
+    print("=" * 84)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga XML-RPC modulo_rg5329")
+    parser.add_argument("--host",     default="http://localhost:8069")
+    parser.add_argument("--db",       default="odoo")
+    parser.add_argument("--user",     default="admin")
+    parser.add_argument("--password", default="admin")
+    parser.add_argument("--scenario", choices=["sale", "purchase"], action="append",
+                        help="escenario a ejecutar (repetible; por defecto ambos alternados)")
+    parser.add_argument("--threads",    type=int, default=4, help="hilos concurrentes (una conexión por hilo)")
+    parser.add_argument("--iterations", type=int, default=10, help="escenarios por hilo")
+    parser.add_argument("--duration",   type=float, default=0,
+                        help="segundos de carga sostenida (reemplaza --iterations)")
+    parser.add_argument("--lines",      type=int, default=10, help="líneas por pedido")
+    parser.add_argument("--keep", action="store_true", help="no cancelar ni borrar los pedidos creados")
+    parser.add_argument("--metrics-token", default=None,
+                        help="Bearer token de /rg5329/metrics (RG5329_METRICS_TOKEN del servidor)")
+    parser.add_argument("--metrics-settle", type=float, default=6.0,
+                        help="segundos a esperar antes de la lectura final (los workers vuelcan cada 5 s)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    args.scenario = args.scenario or ["sale", "purchase"]
+    args.lines = max(1, args.lines)
+
+    print(f"Conectando a {args.host}  DB={args.db}  user={args.user}")
+    try:
+        fixtures = resolve_fixtures(OdooClient(args.host, args.db, args.user, args.password))
+    except (ConnectionError, LookupError, xmlrpc.client.Error, OSError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    restored_before = None
+    if args.metrics_token:
+        restored_before = scrape_counter(args.host, args.metrics_token, TAXES_RESTORED_METRIC)
+
+    load = f"{args.duration:g} s" if args.duration else f"{args.iterations} iteraciones/hilo"
+    print(f"Escenarios={','.join(args.scenario)}  hilos={args.threads}  {load}  líneas/pedido={args.lines}")
+    runner = LoadRunner(args, fixtures)
+    elapsed = runner.run()
+
+    restored_delta = None
+    if restored_before is not None:
+        time.sleep(args.metrics_settle)
+        restored_after = scrape_counter(args.host, args.metrics_token, TAXES_RESTORED_METRIC)
+        if restored_after is not None:
+            restored_delta = restored_after - restored_before
+
+    print_report(runner.stats, elapsed, restored_delta)
+    sys.exit(0 if not runner.stats.failed_scenarios else 1)
+
+
+if __name__ == "__main__":
+    main()
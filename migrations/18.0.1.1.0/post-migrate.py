@@ -0,0 +1,8 @@
+from odoo import api, SUPERUSER_ID
+
+from odoo.addons.modulo_rg5329.hooks import _resync_rg5329_threshold_amounts
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    _resync_rg5329_threshold_amounts(env)
@@ -3,5 +3,8 @@ from . import res_partner
 from . import account_move
 from . import account_tax
 from . import account_setup
+from . import rg5329_order_mixin
 from . import sale_order  # UNIFIED SINGLE SOURCE OF TRUTH
 from . import purchase_order  # RG5329 for purchase orders
+from . import rg5329_recalc_job
+from . import rg5329_profile_trace
@@ -3,10 +3,15 @@ import time
 from odoo import models, fields, api, _
 import logging
 
+from ..utils import profiling
 from ..utils import telemetry as otel
 
 _logger = logging.getLogger(__name__)
 
+# Alícuota de percepción según alícuota de IVA de la línea (3% por defecto)
+_PERCEPTION_RATES = {21.0: 3.0, 10.5: 1.5}
+
+
 class AccountMove(models.Model):
     _inherit = 'account.move'
 
@@ -30,136 +35,120 @@ class AccountMove(models.Model):
         'invoice_line_ids.product_id'
     )
     def _compute_rg5329_perception(self):
+        """
+        Agregado de solo lectura: base y percepción RG 5329 por factura.
+        No modifica impuestos (ver _auto_apply_rg5329_taxes), por lo que
+        recalcularlo no vuelve a disparar sus propias dependencias.
+        """
         _t0 = time.monotonic()
-        for move in self:
-            with otel.start_span("rg5329.invoice.compute_perception") as span:
-                span.set_attribute("move.id", move.id or 0)
-                span.set_attribute("move.type", move.move_type or "")
-                span.set_attribute("partner.id", move.partner_id.id if move.partner_id else 0)
-                try:
-                    if move.move_type not in ['out_invoice', 'out_refund'] or move.partner_id.rg5329_exempt:
-                        move.rg5329_perception_amount = 0
-                        move.rg5329_base_amount = 0
-                        span.set_attribute("skipped", True)
-                        span.set_attribute("skip_reason", "wrong_type_or_exempt")
-                        continue
-
-                    # Verificar categoría fiscal del cliente (solo Responsables Inscriptos)
-                    if not move._is_customer_eligible_for_rg5329():
+        with otel.start_span("rg5329.invoice.compute_perception") as span:
+            span.set_attribute("move.count", len(self))
+            try:
+                profiler = profiling.get_profiler(self.env, "invoice.compute_perception", span)
+                skip_reasons = self.partner_id._rg5329_skip_reasons()
+                otel.add_eligibility_events(span, skip_reasons)
+                eligible_moves = []
+                for move in self:
+                    skip_reason = skip_reasons.get(move.partner_id.id, 'not_eligible')
+                    if move.move_type not in ['out_invoice', 'out_refund'] or skip_reason:
+                        # Tipo de comprobante, cliente exento o no Responsable Inscripto
                         move.rg5329_perception_amount = 0
                         move.rg5329_base_amount = 0
-                        span.set_attribute("skipped", True)
-                        span.set_attribute("skip_reason", "not_eligible")
                         continue
+                    eligible_moves.append(move)
 
-                    # Aplicar automáticamente impuestos RG 5329 si corresponde
-                    move._auto_apply_rg5329_taxes()
-
-                    base_amount = 0
-                    perception_amount = 0
-
-                    # Calcular base imponible para productos RG 5329
-                    for line in move.invoice_line_ids:
-                        if line.product_id and line.product_id.apply_rg5329:
-                            base_amount += line.price_subtotal
+                span.set_attribute("move.eligible_count", len(eligible_moves))
+                profiler.lap("eligibility")
+                if not eligible_moves:
+                    return
 
+                # Una sola pasada sobre todas las líneas de todos los moves,
+                # acumulando base y percepción por move en el orden de las
+                # líneas (mismas sumas que el cálculo línea por línea). La
+                # alícuota se resuelve una vez por conjunto de impuestos.
+                moves = self.browse().concat(*eligible_moves)
+                move_index = {move.id: index for index, move in enumerate(eligible_moves)}
+                base_amounts = [0] * len(eligible_moves)
+                perception_amounts = [0] * len(eligible_moves)
+                perception_rate_by_taxes = {}
+                fallback_counts = [0] * len(eligible_moves)
+                line_count = 0
+                for line in moves.invoice_line_ids:
+                    if not (line.product_id and line.product_id.apply_rg5329):
+                        continue
+                    index = move_index[line.move_id.id]
+                    # Determinar alícuota según IVA del producto (una vez por conjunto de impuestos)
+                    taxes_key = line.tax_ids._ids
+                    rate_info = perception_rate_by_taxes.get(taxes_key)
+                    if rate_info is None:
+                        iva_rate = self._get_line_iva_rate(line)
+                        # FALLBACK: Si no detectamos IVA específico, aplicar 3% por defecto
+                        rate_info = perception_rate_by_taxes[taxes_key] = (
+                            _PERCEPTION_RATES.get(iva_rate, 3.0),
+                            iva_rate not in _PERCEPTION_RATES,
+                        )
+                    perception_rate, is_fallback = rate_info
+                    if is_fallback:
+                        fallback_counts[index] += 1
+                    subtotal = line.price_subtotal
+                    base_amounts[index] += subtotal
+                    perception_amounts[index] += subtotal * (perception_rate / 100)
+                    line_count += 1
+
+                profiler.lap("line_scan")
+
+                for index, move in enumerate(eligible_moves):
+                    base_amount = base_amounts[index]
                     move.rg5329_base_amount = base_amount
 
                     # NORMATIVA: Mínimo sobre TOTAL de factura ($10.000.000 según RG 5329)
                     total_invoice = move.amount_untaxed or 0
-                    span.set_attribute("invoice.total_untaxed", float(total_invoice))
-                    span.set_attribute("invoice.base_amount", float(base_amount))
-
                     if total_invoice >= 10000000 and base_amount > 0:
-                        for line in move.invoice_line_ids:
-                            if line.product_id and line.product_id.apply_rg5329:
-                                # Determinar alícuota según IVA del producto
-                                iva_rate = move._get_line_iva_rate(line)
-                                if iva_rate == 21.0:
-                                    perception_rate = 3.0  # 3%
-                                elif iva_rate == 10.5:
-                                    perception_rate = 1.5  # 1,5%
-                                else:
-                                    # FALLBACK: Si no detectamos IVA específico, aplicar 3% por defecto
-                                    perception_rate = 3.0
-                                    _logger.info("RG 5329: Aplicando 3%% por defecto para producto %s (IVA no detectado: %s)",
-                                               line.product_id.name, iva_rate)
-
-                                if perception_rate > 0:
-                                    line_perception = line.price_subtotal * (perception_rate / 100)
-                                    perception_amount += line_perception
-
-                    move.rg5329_perception_amount = perception_amount
-                    span.set_attribute("perception_amount", float(perception_amount))
-
-                except Exception as e:
-                    span.record_exception(e)
-                    otel.record_error("AccountMove._compute_rg5329_perception")
-                    raise
-
-        otel.record_processing_duration(
-            (time.monotonic() - _t0) * 1000,
-            order_type="invoice",
-        )
+                        move.rg5329_perception_amount = perception_amounts[index]
+                        if fallback_counts[index]:
+                            _logger.info("RG 5329: Aplicando 3%% por defecto en %d líneas de %s (IVA no detectado)",
+                                         fallback_counts[index], move.name)
+                    else:
+                        move.rg5329_perception_amount = 0
+                profiler.lap("assign")
+                profiler.save(moves, line_count=line_count)
+
+            except Exception as e:
+                span.record_exception(e)
+                otel.record_error("AccountMove._compute_rg5329_perception")
+                raise
+            finally:
+                otel.record_processing_duration(
+                    (time.monotonic() - _t0) * 1000,
+                    order_type="invoice",
+                )
+
+    @api.model
+    def _rg5329_recompute_perception_range(self, min_id, max_id):
+        """
+        Recalcula y guarda rg5329_perception_amount / rg5329_base_amount de
+        las facturas y notas de crédito de cliente con id en [min_id, max_id].
+        Usado por el comando ``rg5329_recompute``; devuelve la cantidad de moves.
+        """
+        moves = self.search([
+            ('id', '>=', min_id),
+            ('id', '<=', max_id),
+            ('move_type', 'in', ['out_invoice', 'out_refund']),
+        ])
+        fnames = ['rg5329_perception_amount', 'rg5329_base_amount']
+        for fname in fnames:
+            self.env.add_to_compute(self._fields[fname], moves)
+        moves.flush_recordset(fnames)
+        return len(moves)
 
     def _is_customer_eligible_for_rg5329(self):
         """
         Verifica si el cliente es elegible para RG 5329 según normativa AFIP
-        Solo aplica a Responsables Inscriptos en IVA
-        Robusto para entornos de producción y testing
+        Solo aplica a Responsables Inscriptos en IVA no marcados como exentos.
+        La decisión proviene del servicio de elegibilidad de res.partner.
         """
-        with otel.start_span("rg5329.invoice.eligibility_check") as span:
-            span.set_attribute("partner.id", self.partner_id.id if self.partner_id else 0)
-            span.set_attribute("partner.name", self.partner_id.name or "")
-            try:
-                partner = self.partner_id
-
-                # Verificar si existe el campo de responsabilidad fiscal (compatibilidad)
-                if not hasattr(partner, 'l10n_ar_afip_responsibility_type_id'):
-                    _logger.warning(
-                        "Campo l10n_ar_afip_responsibility_type_id no encontrado "
-                        "en partner %s. Asumiendo NO elegible para RG 5329 "
-                        "(BD sin localización argentina completa).",
-                        partner.name
-                    )
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_afip_field")
-                    return False
-
-                # Verificar si tiene responsabilidad fiscal configurada
-                if not partner.l10n_ar_afip_responsibility_type_id:
-                    _logger.debug(
-                        "Partner %s sin responsabilidad fiscal configurada, "
-                        "asumiendo NO elegible para RG 5329",
-                        partner.name
-                    )
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_responsibility_configured")
-                    return False
-
-                # Solo aplicar a Responsables Inscriptos (código IVA_RI)
-                responsibility_code = partner.l10n_ar_afip_responsibility_type_id.code
-                is_eligible = responsibility_code == '1'
-
-                span.set_attribute("partner.afip_code", responsibility_code or "")
-                span.set_attribute("eligible", is_eligible)
-
-                if not is_eligible:
-                    _logger.debug("Partner %s con código %s no elegible para RG 5329",
-                                partner.name, responsibility_code)
-
-                return is_eligible
-
-            except Exception as e:
-                span.record_exception(e)
-                otel.record_error("AccountMove._is_customer_eligible_for_rg5329")
-                _logger.error(
-                    "Error inesperado verificando elegibilidad RG 5329 "
-                    "para partner %s: %s. Asumiendo NO elegible.",
-                    self.partner_id.name if self.partner_id else 'Unknown',
-                    str(e)
-                )
-                return False
+        self.ensure_one()
+        return not self.partner_id._rg5329_skip_reasons().get(self.partner_id.id, 'not_eligible')
 
     def _get_line_iva_rate(self, line):
         """Obtiene la alícuota de IVA de una línea"""
@@ -168,91 +157,96 @@ class AccountMove(models.Model):
                 return tax.amount
         return 0.0
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Ajusta los impuestos RG 5329 de las facturas creadas fuera del formulario (RPC, _create_invoices)"""
+        moves = super().create(vals_list)
+        moves.filtered(lambda m: m.state == 'draft')._auto_apply_rg5329_taxes()
+        return moves
+
+    @api.onchange('partner_id', 'invoice_line_ids')
+    def _onchange_rg5329_taxes(self):
+        """Ajusta los impuestos RG 5329 al editar la factura"""
+        self._auto_apply_rg5329_taxes()
+
+    def _post(self, soft=True):
+        """Ajusta los impuestos RG 5329 de todas las facturas antes de publicarlas"""
+        self.filtered(lambda m: m.state == 'draft')._auto_apply_rg5329_taxes()
+        return super()._post(soft=soft)
+
     def _auto_apply_rg5329_taxes(self):
-        """Aplica automáticamente los impuestos RG 5329 según normativa AFIP"""
+        """
+        Aplica automáticamente los impuestos RG 5329 según normativa AFIP
+
+        Es una etapa explícita (onchange, alta y previa a la publicación) que procesa
+        todas las facturas del recordset; el cálculo almacenado
+        _compute_rg5329_perception es de solo lectura y no modifica impuestos.
+        """
+        moves = self.filtered(lambda m: m.move_type in ['out_invoice', 'out_refund'])
+        if not moves:
+            return
         with otel.start_span("rg5329.invoice.auto_apply_taxes") as span:
-            span.set_attribute("move.id", self.id or 0)
-            span.set_attribute("move.type", self.move_type or "")
-            span.set_attribute("partner.id", self.partner_id.id if self.partner_id else 0)
+            span.set_attribute("move.count", len(moves))
             try:
-                # Verificar si el cliente está exento
-                if self.partner_id.rg5329_exempt:
-                    # Remover cualquier impuesto RG 5329 existente para clientes exentos
-                    for line in self.invoice_line_ids:
-                        rg5329_taxes = line.tax_ids.filtered('is_rg5329_perception')
-                        if rg5329_taxes:
-                            for tax in rg5329_taxes:
-                                line.tax_ids = [(3, tax.id)]
-                    otel.record_perception_skipped(order_type="invoice", reason="customer_exempt")
-                    return
-
-                # Verificar categoría fiscal del cliente
-                if not self._is_customer_eligible_for_rg5329():
-                    # Remover impuestos RG 5329 si no es elegible
-                    for line in self.invoice_line_ids:
-                        rg5329_taxes = line.tax_ids.filtered('is_rg5329_perception')
-                        if rg5329_taxes:
-                            for tax in rg5329_taxes:
-                                line.tax_ids = [(3, tax.id)]
-                    otel.record_perception_skipped(order_type="invoice", reason="not_eligible")
-                    return
-
-                # Buscar impuestos RG 5329 de forma más precisa para Odoo 18
-                try:
-                    tax_3_percent = self.env['account.tax'].search([
-                        ('is_rg5329_perception', '=', True),
-                        ('amount', '=', 3.0),
-                        ('type_tax_use', '=', 'sale')
-                    ], limit=1)
+                profiler = profiling.get_profiler(self.env, "invoice.auto_apply_taxes", span)
+                AccountTax = self.env['account.tax']
+                skip_reasons = moves.partner_id._rg5329_skip_reasons()
+                otel.add_eligibility_events(span, skip_reasons)
+                profiler.lap("eligibility")
+                for move in moves:
+                    # Nuevo conjunto de impuestos por línea, calculado en memoria
+                    new_taxes_by_line = {}
+
+                    # Verificar si el cliente está exento o no es Responsable Inscripto
+                    skip_reason = skip_reasons.get(move.partner_id.id, 'not_eligible')
+                    if skip_reason:
+                        # Remover cualquier impuesto RG 5329 existente
+                        for line in move.invoice_line_ids:
+                            rg5329_taxes = line.tax_ids.filtered('is_rg5329_perception')
+                            if rg5329_taxes:
+                                new_taxes_by_line[line] = line.tax_ids - rg5329_taxes
+                        move._write_rg5329_line_taxes(new_taxes_by_line)
+                        otel.record_perception_skipped(order_type="invoice", reason=skip_reason)
+                        profiler.lap("line_writes")
+                        continue
 
-                    tax_1_5_percent = self.env['account.tax'].search([
-                        ('is_rg5329_perception', '=', True),
-                        ('amount', '=', 1.5),
-                        ('type_tax_use', '=', 'sale')
-                    ], limit=1)
+                    tax_3_percent = AccountTax._get_rg5329_tax('sale', 3.0, move.company_id)
+                    tax_1_5_percent = AccountTax._get_rg5329_tax('sale', 1.5, move.company_id)
+                    profiler.lap("tax_search")
 
                     if not tax_3_percent or not tax_1_5_percent:
                         _logger.warning("Impuestos RG 5329 no encontrados. "
                                       "3%%: %s, 1.5%%: %s", bool(tax_3_percent), bool(tax_1_5_percent))
                         otel.record_perception_skipped(order_type="invoice", reason="no_tax_found")
-                        return
+                        continue
 
-                except Exception as e:
-                    span.record_exception(e)
-                    otel.record_error("AccountMove._auto_apply_rg5329_taxes")
-                    _logger.error("Error buscando impuestos RG 5329: %s", str(e))
-                    return
+                    # NORMATIVA: Verificar mínimo sobre TOTAL de factura
+                    total_invoice = move.amount_untaxed or 0
 
-                # NORMATIVA: Verificar mínimo sobre TOTAL de factura
-                total_invoice = self.amount_untaxed or 0
-                span.set_attribute("invoice.total_untaxed", float(total_invoice))
+                    for line in move.invoice_line_ids:
+                        if line.product_id and line.product_id.apply_rg5329:
+                            # Determinar qué impuesto aplicar según IVA
+                            iva_rate = move._get_line_iva_rate(line)
+
+                            if iva_rate == 21.0:
+                                target_tax = tax_3_percent
+                                perception_rate = 3.0
+                            elif iva_rate == 10.5:
+                                target_tax = tax_1_5_percent
+                                perception_rate = 1.5
+                            else:
+                                # FALLBACK: Si no detectamos IVA específico, usar 3% por defecto
+                                # Esto maneja casos con BD limpias sin estructura fiscal argentina
+                                target_tax = tax_3_percent
+                                perception_rate = 3.0
+                                _logger.info("RG 5329: Aplicando impuesto 3%% por defecto para producto %s (IVA no detectado: %s)",
+                                           line.product_id.name, iva_rate)
 
-                for line in self.invoice_line_ids:
-                    if line.product_id and line.product_id.apply_rg5329:
-                        # Determinar qué impuesto aplicar según IVA
-                        iva_rate = self._get_line_iva_rate(line)
-                        target_tax = None
-
-                        if iva_rate == 21.0 and tax_3_percent:
-                            target_tax = tax_3_percent
-                            perception_rate = 3.0
-                        elif iva_rate == 10.5 and tax_1_5_percent:
-                            target_tax = tax_1_5_percent
-                            perception_rate = 1.5
-                        else:
-                            # FALLBACK: Si no detectamos IVA específico, usar 3% por defecto
-                            # Esto maneja casos con BD limpias sin estructura fiscal argentina
-                            target_tax = tax_3_percent
-                            perception_rate = 3.0
-                            _logger.info("RG 5329: Aplicando impuesto 3%% por defecto para producto %s (IVA no detectado: %s)",
-                                       line.product_id.name, iva_rate)
-
-                        if target_tax:
                             # NORMATIVA: Solo aplicar si factura total >= $10.000.000 (RG 5329)
                             if total_invoice >= 10000000:
                                 # Agregar el impuesto si no está ya presente
                                 if target_tax not in line.tax_ids:
-                                    line.tax_ids = [(4, target_tax.id)]
+                                    new_taxes_by_line[line] = line.tax_ids | target_tax
                                     otel.record_perception_applied(
                                         order_type="invoice",
                                         rate=perception_rate,
@@ -261,23 +255,50 @@ class AccountMove(models.Model):
                             else:
                                 # Remover el impuesto si no cumple el mínimo
                                 if target_tax in line.tax_ids:
-                                    line.tax_ids = [(3, target_tax.id)]
+                                    new_taxes_by_line[line] = line.tax_ids - target_tax
                                     otel.record_perception_skipped(
                                         order_type="invoice",
                                         reason="below_threshold",
                                     )
+                    profiler.lap("decision")
+
+                    move._write_rg5329_line_taxes(new_taxes_by_line)
+                    profiler.lap("line_writes")
+                profiler.save(moves, line_count=len(moves.invoice_line_ids))
             except Exception as e:
                 span.record_exception(e)
                 otel.record_error("AccountMove._auto_apply_rg5329_taxes")
                 raise
 
+    def _write_rg5329_line_taxes(self, new_taxes_by_line):
+        """
+        Aplica los nuevos impuestos de las líneas de la factura con una única
+        escritura sobre el move (un comando por línea), de modo que las líneas
+        de impuestos se recalculan una sola vez y no una vez por línea.
+        """
+        self.ensure_one()
+        if not new_taxes_by_line:
+            return
+        if not self.id:
+            # Registros nuevos (onchange): solo se actualiza el cache
+            for line, taxes in new_taxes_by_line.items():
+                line.tax_ids = taxes
+            return
+        self.write({
+            'invoice_line_ids': [
+                (1, line.id, {'tax_ids': [(6, 0, taxes.ids)]})
+                for line, taxes in new_taxes_by_line.items()
+            ],
+        })
+
     def wsfe_get_cae_request(self, client=None):
         """Override para inyectar CondicionIVAReceptorId requerido por RG 5616."""
         with otel.start_span("rg5329.invoice.wsfe_cae_request") as span:
-            span.set_attribute("move.id", self.id or 0)
-            span.set_attribute("move.name", self.name or "")
-            span.set_attribute("move.type", self.move_type or "")
-            span.set_attribute("partner.id", self.commercial_partner_id.id if self.commercial_partner_id else 0)
+            if span.is_recording():
+                span.set_attribute("move.id", self.id or 0)
+                span.set_attribute("move.name", self.name or "")
+                span.set_attribute("move.type", self.move_type or "")
+                span.set_attribute("partner.id", self.commercial_partner_id.id if self.commercial_partner_id else 0)
             try:
                 res = super().wsfe_get_cae_request(client=client)
                 partner = self.commercial_partner_id
@@ -1,4 +1,12 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+
+# Tax fields that change the outcome of the RG 5329 engines
+_RG5329_TAX_FIELDS = {
+    'is_rg5329_perception', 'amount', 'amount_type', 'type_tax_use',
+    'price_include_override', 'active', 'company_id',
+}
+# Tax fields read by the _get_rg5329_tax_ids cache
+_RG5329_CACHE_FIELDS = {'is_rg5329_perception', 'amount', 'type_tax_use', 'active', 'company_id'}
 
 
 class AccountTax(models.Model):
@@ -10,6 +18,89 @@ class AccountTax(models.Model):
         help='Marque si este impuesto es una percepción RG 5329'
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        taxes = super().create(vals_list)
+        if any(vals.get('is_rg5329_perception') for vals in vals_list):
+            self.env.registry.clear_cache()
+            self.env['rg5329.recalc.job']._enqueue_affected_orders(
+                companies=taxes.filtered('is_rg5329_perception').company_id
+            )
+        return taxes
+
+    def write(self, vals):
+        rg5329_taxes = self.filtered('is_rg5329_perception')
+        companies = rg5329_taxes.company_id
+        result = super().write(vals)
+        if rg5329_taxes or vals.get('is_rg5329_perception'):
+            if not _RG5329_CACHE_FIELDS.isdisjoint(vals):
+                self.env.registry.clear_cache()
+            if not _RG5329_TAX_FIELDS.isdisjoint(vals):
+                self.env['rg5329.recalc.job']._enqueue_affected_orders(
+                    companies=companies | self.filtered('is_rg5329_perception').company_id
+                )
+        return result
+
+    def unlink(self):
+        companies = self.filtered('is_rg5329_perception').company_id
+        result = super().unlink()
+        if companies:
+            self.env.registry.clear_cache()
+            self.env['rg5329.recalc.job']._enqueue_affected_orders(companies=companies)
+        return result
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_rg5329_tax_ids(self, company_id):
+        """
+        Resuelve una sola vez por compañía (y por registry) los impuestos RG 5329.
+
+        Devuelve un dict {(type_tax_use, amount): tax_id}. Si hay más de un
+        impuesto para la misma clave se conserva el primero según el orden
+        del modelo, igual que el antiguo ``search(..., limit=1)``.
+        El cache se limpia al crear o borrar un impuesto RG 5329, o al modificar
+        alguno de los campos que lee (_RG5329_CACHE_FIELDS).
+        """
+        company = self.env['res.company'].browse(company_id)
+        taxes = self.sudo().search([
+            *self._check_company_domain(company),
+            ('is_rg5329_perception', '=', True),
+        ])
+        tax_ids = {}
+        for tax in taxes:
+            tax_ids.setdefault((tax.type_tax_use, tax.amount), tax.id)
+        return tax_ids
+
+    @api.model
+    def _get_rg5329_tax(self, type_tax_use, amount=3.0, company=None):
+        """Devuelve el impuesto RG 5329 (sudo) para el uso y alícuota dados, o un recordset vacío"""
+        company = company or self.env.company
+        tax_id = self._get_rg5329_tax_ids(company.id).get((type_tax_use, amount))
+        return self.sudo().browse(tax_id or [])
+
+    def _rg5329_compute_perception(self, price_unit, quantity=1.0, currency=None, product=None, partner=None):
+        """
+        Monto de percepción RG 5329 de cada impuesto de ``self`` sumado.
+
+        Camino rápido para el caso habitual (impuesto porcentual, sin precio
+        incluido y redondeo por línea): precio × cantidad × alícuota con el
+        redondeo de la moneda, sin pasar por compute_all. Cualquier otro caso
+        usa compute_all y devuelve total_included - total_excluded.
+        """
+        amount = 0
+        for tax in self:
+            tax_currency = currency or tax.company_id.currency_id
+            if (
+                tax.amount_type == 'percent'
+                and not tax.price_include
+                and tax.company_id.tax_calculation_rounding_method == 'round_per_line'
+            ):
+                amount += tax_currency.round(price_unit * quantity * tax.amount / 100)
+            else:
+                tax_result = tax.compute_all(price_unit, currency, quantity, product, partner)
+                amount += tax_result['total_included'] - tax_result['total_excluded']
+        return amount
+
     def compute_all(
         self, price_unit, currency=None, quantity=1.0, product=None,
         partner=None, is_refund=False, handle_price_include=True,
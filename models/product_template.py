@@ -10,6 +10,17 @@ class ProductTemplate(models.Model):
         help='Marque si este producto está sujeto a la percepción RG 5329'
     )
 
+    def write(self, vals):
+        if 'apply_rg5329' not in vals:
+            return super().write(vals)
+        changed = self.filtered(lambda template: template.apply_rg5329 != bool(vals['apply_rg5329']))
+        result = super().write(vals)
+        if changed:
+            # Re-evaluate the open orders that sell or buy these products
+            self.env['rg5329.recalc.job']._enqueue_affected_orders(
+                products=changed.with_context(active_test=False).product_variant_ids
+            )
+        return result
 
 
 class ProductProduct(models.Model):
@@ -18,5 +29,6 @@ class ProductProduct(models.Model):
     apply_rg5329 = fields.Boolean(
         related='product_tmpl_id.apply_rg5329',
         readonly=False,
-        store=True
+        store=True,
+        index=True,
     )
@@ -1,18 +1,39 @@
 import time
 
 from odoo import models, fields, api
+from odoo.tools import frozendict
 import logging
 
+from ..utils import profiling
 from ..utils import telemetry as otel
 
 _logger = logging.getLogger(__name__)
 
+
 class PurchaseOrder(models.Model):
-    _inherit = 'purchase.order'
+    _name = 'purchase.order'
+    _inherit = ['purchase.order', 'rg5329.order.mixin']
+
+    _rg5329_line_tax_field = 'taxes_id'
+
+    rg5329_threshold_amount = fields.Monetary(
+        string='Monto umbral RG 5329',
+        compute='_compute_rg5329_threshold_amount',
+        store=True,
+        help='Total con IVA pero sin la percepción RG 5329, comparado contra el '
+             'mínimo de $10.000.000. Se recalcula desde las líneas.'
+    )
+
+    @api.depends('order_line.price_total', 'order_line.taxes_id')
+    def _compute_rg5329_threshold_amount(self):
+        super()._compute_rg5329_threshold_amount()
+
+    def _rg5329_recompute_amounts(self):
+        self._amount_all()
 
     def apply_rg5329_logic_manual(self):
         """Public method to manually trigger RG5329 logic"""
-        self._apply_rg5329_logic()
+        self.with_context(rg5329_sync=True)._apply_rg5329_logic()
         return True
 
     def apply_rg5329_manual_button(self):
@@ -21,11 +42,11 @@ class PurchaseOrder(models.Model):
             _logger.info("RG5329 BUTTON: Manual button clicked for purchase order %s", self.name)
 
             # Apply the logic
-            self._apply_rg5329_logic()
+            self.with_context(rg5329_sync=True)._apply_rg5329_logic()
 
             # Force UI refresh
             self.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
-            self._amount_all()
+            self.with_context(applying_rg5329=True)._amount_all()
 
             # Show success message to user
             return {
@@ -56,27 +77,29 @@ class PurchaseOrder(models.Model):
         """Override button_confirm to ensure RG5329 taxes are applied and preserved"""
         with otel.start_span("rg5329.purchase.button_confirm") as span:
             span.set_attribute("order.count", len(self))
-            span.set_attribute("order.names", ", ".join(o.name or "New" for o in self))
+            if span.is_recording():
+                span.set_attribute("order.names", ", ".join(o.name or "New" for o in self))
             try:
-                # STEP 1: Apply RG5329 logic one last time before confirming
-                for order in self:
-                    if not self.env.context.get('skip_rg5329_confirm'):
-                        _logger.info("RG5329: Applying logic before confirming order %s (state: %s)", order.name, order.state)
-                        if order.state in ['draft', 'sent']:
-                            order._apply_rg5329_logic()
-                            order._amount_all()
-                            _logger.debug("RG5329: After applying logic - Total: %s, Tax: %s", order.amount_total, order.amount_tax)
+                if self.env.context.get('skip_rg5329_confirm'):
+                    return super().button_confirm()
+
+                # STEP 1: Apply RG5329 logic one last time before confirming (whole batch)
+                to_confirm = self.filtered(lambda o: o.state in ['draft', 'sent'])
+                if to_confirm:
+                    _logger.info("RG5329: Applying logic before confirming orders %s", to_confirm.mapped('name'))
+                    # Pending async recalculations are done now, synchronously
+                    self.env['rg5329.recalc.job']._dequeue(to_confirm)
+                    to_confirm.with_context(rg5329_sync=True)._apply_rg5329_logic()
+                    to_confirm._amount_all()
 
-                            # STEP 2: Store RG5329 tax info BEFORE confirmation to prevent loss
-                            order._store_rg5329_taxes_before_confirm()
+                # STEP 2: Take the RG5329 decision snapshot once, BEFORE confirmation
+                snapshot = to_confirm._rg5329_confirm_snapshot()
 
-                # STEP 3: Call super to continue with normal confirmation
-                result = super().button_confirm()
+                # STEP 3: Call super, carrying the snapshot into picking creation
+                result = super(PurchaseOrder, self.with_context(rg5329_confirm_snapshot=snapshot)).button_confirm()
 
                 # STEP 4: CRITICAL - Restore RG5329 taxes AFTER confirmation if they were removed
-                for order in self:
-                    if not self.env.context.get('skip_rg5329_confirm'):
-                        order._restore_rg5329_taxes_after_confirm()
+                to_confirm._restore_rg5329_taxes_after_confirm(snapshot)
 
                 return result
             except Exception as e:
@@ -84,74 +107,50 @@ class PurchaseOrder(models.Model):
                 otel.record_error("PurchaseOrder.button_confirm")
                 raise
 
-    def _store_rg5329_taxes_before_confirm(self):
+    def _rg5329_confirm_snapshot(self):
         """
-        Store which lines have RG5329 taxes BEFORE confirmation
-        This allows us to restore them if they get removed during confirmation
+        RG5329 decision of every order, taken once at confirm time.
+        Returns an immutable {order_id: (rg5329_tax_id, line_ids)} with the
+        lines that carry the RG5329 tax; it is passed explicitly to picking
+        creation and to _restore_rg5329_taxes_after_confirm.
         """
-        rg5329_tax = self.env['account.tax'].sudo().search([
-            ('is_rg5329_perception', '=', True),
-            ('amount', '=', 3.0),
-            ('type_tax_use', '=', 'purchase')
-        ], limit=1)
-
-        if not rg5329_tax:
-            return
-
-        # Store line IDs that should have RG5329 tax
-        lines_with_rg5329 = []
-        for line in self.order_line:
-            if rg5329_tax.id in line.taxes_id.ids:
-                lines_with_rg5329.append(line.id)
-                _logger.debug("RG5329 STORE: Line %s (product: %s) has RG5329 tax before confirmation",
-                           line.id, line.product_id.name if line.product_id else 'No product')
-
-        # Store in context for later retrieval
-        self.env.context = dict(self.env.context, rg5329_lines_before_confirm=lines_with_rg5329)
-        _logger.debug("RG5329 STORE: Stored %d lines with RG5329 tax", len(lines_with_rg5329))
-
-    def _restore_rg5329_taxes_after_confirm(self):
+        snapshot = {}
+        for order in self:
+            rg5329_tax = self.env['account.tax']._get_rg5329_tax('purchase', 3.0, order.company_id)
+            if not rg5329_tax:
+                continue
+            line_ids = tuple(line.id for line in order.order_line if rg5329_tax.id in line.taxes_id.ids)
+            if line_ids:
+                snapshot[order.id] = (rg5329_tax.id, line_ids)
+        _logger.debug("RG5329 STORE: Snapshot of %d lines with RG5329 tax in %d orders",
+                      sum(len(line_ids) for tax_id, line_ids in snapshot.values()), len(snapshot))
+        return frozendict(snapshot)
+
+    def _restore_rg5329_taxes_after_confirm(self, snapshot):
         """
         Restore RG5329 taxes AFTER confirmation if they were removed
         This is the critical fix for the disappearing tax issue
+
+        :param snapshot: the decision returned by _rg5329_confirm_snapshot();
+            missing taxes are added back with one grouped write.
         """
-        # Get stored line IDs from context
-        lines_with_rg5329 = self.env.context.get('rg5329_lines_before_confirm', [])
-        if not lines_with_rg5329:
-            _logger.debug("RG5329 RESTORE: No lines to restore")
-            return
-
-        rg5329_tax = self.env['account.tax'].sudo().search([
-            ('is_rg5329_perception', '=', True),
-            ('amount', '=', 3.0),
-            ('type_tax_use', '=', 'purchase')
-        ], limit=1)
-
-        if not rg5329_tax:
-            _logger.warning("RG5329 RESTORE: RG5329 tax not found!")
-            return
-
-        restored_count = 0
-        for line in self.order_line:
-            if line.id in lines_with_rg5329:
-                # Check if tax is missing
-                if rg5329_tax.id not in line.taxes_id.ids:
+        new_taxes_by_line = {}
+        for order in self:
+            if order.id not in snapshot:
+                continue
+            tax_id, line_ids = snapshot[order.id]
+            for line in order.order_line:
+                if line.id in line_ids and tax_id not in line.taxes_id.ids:
                     _logger.warning("RG5329 RESTORE: Tax missing from line %s (product: %s) - RESTORING",
                                   line.id, line.product_id.name if line.product_id else 'No product')
+                    new_taxes_by_line[line] = line.taxes_id | line.taxes_id.browse(tax_id)
 
-                    # Restore the tax
-                    current_tax_ids = list(line.taxes_id.ids)
-                    current_tax_ids.append(rg5329_tax.id)
-                    line.write({'taxes_id': [(6, 0, current_tax_ids)]})
-                    restored_count += 1
-                else:
-                    _logger.debug("RG5329 RESTORE: Tax still present on line %s - OK", line.id)
-
-        if restored_count > 0:
-            _logger.info("RG5329 RESTORE: ✅ Restored RG5329 tax to %d lines", restored_count)
-            otel.record_taxes_restored(restored_count, order_type="purchase")
+        if new_taxes_by_line:
+            restored_lines = self._write_rg5329_line_taxes(new_taxes_by_line)
+            _logger.info("RG5329 RESTORE: ✅ Restored RG5329 tax to %d lines", len(restored_lines))
+            otel.record_taxes_restored(len(restored_lines), order_type="purchase")
             # Force recalculation of totals
-            self._amount_all()
+            restored_lines.order_id._amount_all()
         else:
             _logger.debug("RG5329 RESTORE: All taxes preserved correctly")
 
@@ -162,132 +161,132 @@ class PurchaseOrder(models.Model):
         1. Supplier is IVA Responsable Inscripto (code '1')
         2. Product has apply_rg5329 = True
         3. Order total >= $10,000,000 (TOTAL CON IVA, no subtotal)
+
+        Works on any recordset of orders: partners, products and line taxes
+        are prefetched once for the whole batch and the resulting tax changes
+        are written grouped by target tax set instead of line by line.
         """
         _t0 = time.monotonic()
         with otel.start_span("rg5329.purchase.apply_logic") as span:
-            span.set_attribute("order.name", self.name or "New")
-            span.set_attribute("order.state", self.state or "")
+            span.set_attribute("order.count", len(self))
+            if span.is_recording():
+                span.set_attribute("order.name", ", ".join(o.name or "New" for o in self))
             try:
-                if self.state not in ['draft', 'sent'] or self.env.context.get('applying_rg5329'):
+                if self.env.context.get('applying_rg5329'):
                     return True
 
-                # Force recalculation of totals first
-                self.with_context(applying_rg5329=True)._amount_all()
-
-                # IMPORTANTE: Calculamos el total SIN el impuesto RG5329 para evitar recursión
-                # El mínimo de $10M se refiere al total con IVA pero SIN la percepción RG5329
-                rg5329_tax_amount = 0
-                for line in self.order_line:
-                    for tax in line.taxes_id:
-                        if tax.is_rg5329_perception:
-                            # Calcular cuánto es el impuesto RG5329 en esta línea
-                            tax_result = tax.compute_all(
-                                line.price_unit,
-                                self.currency_id,
-                                line.product_qty,
-                                line.product_id,
-                                self.partner_id
-                            )
-                            rg5329_tax_amount += tax_result['total_included'] - tax_result['total_excluded']
-
-                # Total con IVA pero SIN percepción RG5329
-                total = (self.amount_total or 0) - rg5329_tax_amount
-                span.set_attribute("order.total_without_rg5329", float(total))
-                span.set_attribute("order.line_count", len(self.order_line))
-                _logger.debug("=== RG5329 UNIFIED: Processing purchase order %s with total $%s (with VAT, without RG5329) ===",
-                            self.name or 'New', total)
-
-                # Find RG5329 tax for purchases
-                rg5329_tax = self.env['account.tax'].sudo().search([
-                    ('is_rg5329_perception', '=', True),
-                    ('amount', '=', 3.0),
-                    ('type_tax_use', '=', 'purchase')
-                ], limit=1)
-
-                if not rg5329_tax:
-                    _logger.warning("RG5329 UNIFIED: No RG5329 purchase tax found!")
-                    otel.record_perception_skipped(order_type="purchase", reason="no_tax_found")
-                    return False
-
-                _logger.debug("RG5329 UNIFIED: Found RG5329 tax: %s (ID: %s)", rg5329_tax.name, rg5329_tax.id)
-
-                # Debug order line info
-                _logger.debug("RG5329 DEBUG: Purchase order has %d lines", len(self.order_line))
-                _logger.debug("RG5329 DEBUG: Purchase order line IDs: %s", [line.id for line in self.order_line])
-
-                # Process all lines at once
-                line_count = 0
-                for line in self.order_line:
-                    line_count += 1
-                    _logger.debug("RG5329 DEBUG: Processing line with product: %s",
-                                line.product_id.name if line.product_id else 'No product')
-
-                    # Only process products marked for RG5329
-                    if not (line.product_id and line.product_id.apply_rg5329):
-                        _logger.debug("RG5329 DEBUG: Skipping line - product not marked for RG5329")
-                        continue
+                orders = self.filtered(lambda o: o.state in ['draft', 'sent'])
+                if not orders:
+                    return True
 
-                    _logger.debug("RG5329 DEBUG: Line has RG5329 product, checking supplier conditions...")
-
-                    # Skip if supplier is exempt
-                    if self.partner_id and self.partner_id.rg5329_exempt:
-                        _logger.debug("RG5329 DEBUG: Supplier is exempt")
-                        # Remove tax if supplier is exempt
-                        if rg5329_tax.id in line.taxes_id.ids:
-                            new_taxes = line.taxes_id.filtered(lambda t: t.id != rg5329_tax.id)
-                            line.write({'taxes_id': [(6, 0, new_taxes.ids)]})
-                            _logger.info("RG5329 UNIFIED: Removed tax - supplier exempt")
-                        otel.record_perception_skipped(order_type="purchase", reason="customer_exempt")
-                        continue
+                # Async mode: large orders are recalculated by the RG5329 cron worker
+                orders = self.env['rg5329.recalc.job']._defer_large_orders(orders)
+                if not orders:
+                    return True
 
-                    _logger.debug("RG5329 DEBUG: Supplier not exempt, checking eligibility...")
-
-                    # Check if supplier is eligible (only Responsable Inscripto)
-                    if not self._is_partner_eligible_for_rg5329():
-                        _logger.debug("RG5329 DEBUG: Supplier not eligible for RG5329")
-                        # Remove tax if supplier not eligible
-                        if rg5329_tax.id in line.taxes_id.ids:
-                            new_taxes = line.taxes_id.filtered(lambda t: t.id != rg5329_tax.id)
-                            line.write({'taxes_id': [(6, 0, new_taxes.ids)]})
-                            _logger.info("RG5329 UNIFIED: Removed tax - supplier not eligible")
-                        otel.record_perception_skipped(order_type="purchase", reason="not_eligible")
+                # Per-phase timings and SQL counts (profiling mode only)
+                profiler = profiling.get_profiler(self.env, "purchase.apply_logic", span)
+
+                # Prefetch everything the line loop reads in a few grouped queries
+                lines = orders.order_line
+                lines.mapped('taxes_id')
+                lines.product_id.mapped('apply_rg5329')
+                span.set_attribute("order.line_count", len(lines))
+                profiler.lap("prefetch")
+
+                skip_reasons = orders.partner_id._rg5329_skip_reasons()
+                otel.add_eligibility_events(span, skip_reasons)
+                profiler.lap("eligibility")
+
+                # Line-level detail only when debugging: logger at DEBUG, or
+                # the rg5329_debug context flag (logged at INFO)
+                line_log_level = logging.INFO if self.env.context.get('rg5329_debug') else logging.DEBUG
+                log_lines = _logger.isEnabledFor(line_log_level)
+
+                result = True
+                new_taxes_by_line = {}
+                for order in orders:
+                    # Total con IVA pero SIN percepción RG5329 (mantenido incrementalmente)
+                    total = order._rg5329_get_threshold_amount()
+                    profiler.lap("threshold")
+
+                    # Find RG5329 tax
+                    rg5329_tax = self.env['account.tax']._get_rg5329_tax('purchase', 3.0, order.company_id)
+                    profiler.lap("tax_search")
+
+                    if not rg5329_tax:
+                        _logger.warning("RG5329 UNIFIED: No RG5329 purchase tax found!")
+                        otel.record_perception_skipped(order_type="purchase", reason="no_tax_found")
+                        result = False
                         continue
 
-                    _logger.debug("RG5329 DEBUG: Supplier eligible! Proceeding with tax logic...")
-
-                    has_tax = rg5329_tax.id in line.taxes_id.ids
-
-                    if total >= 10000000:
-                        # ADD tax if not present
-                        if not has_tax:
-                            current_tax_ids = list(line.taxes_id.ids)  # Convert to list to avoid issues
-                            if rg5329_tax.id not in current_tax_ids:  # Double check
-                                current_tax_ids.append(rg5329_tax.id)
-                                line.with_context(skip_onchange=True).write({'taxes_id': [(6, 0, current_tax_ids)]})
-                                _logger.info("RG5329 UNIFIED: ✅ ADDED tax - total $%s >= $10M", total)
+                    # Supplier conditions are the same for every line of the order
+                    skip_reason = skip_reasons.get(order.partner_id.id, 'not_eligible')
+                    if skip_reason:
+                        decision = skip_reason
+                    elif total >= 10000000:
+                        decision = 'apply'
+                    else:
+                        decision = 'below_threshold'
+
+                    counts = dict.fromkeys(('added', 'removed', 'present', 'absent', 'not_rg5329'), 0)
+                    for line in order.order_line:
+                        # Only process products marked for RG5329
+                        if not (line.product_id and line.product_id.apply_rg5329):
+                            counts['not_rg5329'] += 1
+                            continue
+
+                        has_tax = rg5329_tax.id in line.taxes_id.ids
+
+                        if decision == 'apply':
+                            # ADD tax if not present
+                            if not has_tax:
+                                new_taxes_by_line[line] = line.taxes_id | rg5329_tax
+                                action = 'added'
                                 otel.record_perception_applied(
                                     order_type="purchase",
                                     rate=3.0,
                                     base_amount=float(line.price_subtotal),
                                 )
-                                # Force UI refresh
-                                self._force_ui_refresh()
+                            else:
+                                action = 'present'
                         else:
-                            _logger.info("RG5329 UNIFIED: ✅ Tax already present - total $%s >= $10M", total)
-                    else:
-                        # REMOVE tax if present
-                        if has_tax:
-                            current_tax_ids = [t_id for t_id in line.taxes_id.ids if t_id != rg5329_tax.id]
-                            line.with_context(skip_onchange=True).write({'taxes_id': [(6, 0, current_tax_ids)]})
-                            _logger.info("RG5329 UNIFIED: ❌ REMOVED tax - total $%s < $10M", total)
-                            otel.record_perception_skipped(order_type="purchase", reason="below_threshold")
-                            # Force UI refresh
-                            self._force_ui_refresh()
-                        else:
-                            _logger.info("RG5329 UNIFIED: ❌ Tax already not present - total $%s < $10M", total)
-
-                _logger.debug("RG5329 DEBUG: Processed %d lines total", line_count)
-                return True
+                            # REMOVE tax if present (supplier exempt/not eligible or total < $10M)
+                            if has_tax:
+                                new_taxes_by_line[line] = line.taxes_id - rg5329_tax
+                                action = 'removed'
+                            else:
+                                action = 'absent'
+                            if skip_reason or has_tax:
+                                otel.record_perception_skipped(order_type="purchase", reason=decision)
+                        counts[action] += 1
+
+                        if log_lines:
+                            _logger.log(line_log_level, "RG5329 LINE: %s line %s (%s): %s",
+                                        order.name or 'New', line.id, line.product_id.display_name, action)
+
+                    # One structured summary record per order; INFO only when taxes changed
+                    _logger.log(
+                        logging.INFO if counts['added'] or counts['removed'] else logging.DEBUG,
+                        "RG5329 UNIFIED: %s order %s total $%s -> %s (added=%d removed=%d present=%d absent=%d not_rg5329=%d)",
+                        "Purchase", order.name or 'New', total, decision, counts['added'], counts['removed'],
+                        counts['present'], counts['absent'], counts['not_rg5329'],
+                        extra={'rg5329': dict(counts, order_type="purchase", order=order.name, total=total, decision=decision)},
+                    )
+                    profiler.lap("decision")
+
+                changed_lines = self._write_rg5329_line_taxes(new_taxes_by_line)
+                profiler.lap("line_writes")
+                if changed_lines:
+                    # Queue the UI refresh, then flush it once per order
+                    changed_lines.order_id._force_ui_refresh()
+                    profiler.lap("ui_refresh")
+                    orders._flush_rg5329_dirty_orders()
+                    profiler.lap("compute_amounts")
+
+                _logger.debug("RG5329 DEBUG: Processed %d purchase orders, %d lines updated", len(orders), len(changed_lines))
+                profiler.save(orders, line_count=len(lines))
+                return result
             except Exception as e:
                 span.record_exception(e)
                 otel.record_error("PurchaseOrder._apply_rg5329_logic")
@@ -301,63 +300,11 @@ class PurchaseOrder(models.Model):
     def _is_partner_eligible_for_rg5329(self):
         """
         Check if supplier is eligible for RG 5329
-        Only applies to IVA Responsable Inscripto (code '1')
+        Only applies to IVA Responsable Inscripto (code '1') not marked as exempt.
+        The decision comes from the shared res.partner eligibility service.
         """
-        with otel.start_span("rg5329.purchase.eligibility_check") as span:
-            span.set_attribute("partner.id", self.partner_id.id if self.partner_id else 0)
-            span.set_attribute("partner.name", self.partner_id.name or "")
-            try:
-                partner = self.partner_id
-
-                if not hasattr(partner, 'l10n_ar_afip_responsibility_type_id'):
-                    _logger.warning("RG5329 UNIFIED: No AFIP responsibility field found")
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_afip_field")
-                    return False
-
-                if not partner.l10n_ar_afip_responsibility_type_id:
-                    _logger.debug("RG5329 UNIFIED: Partner %s - no fiscal responsibility configured", partner.name)
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_responsibility_configured")
-                    return False
-
-                responsibility_code = partner.l10n_ar_afip_responsibility_type_id.code
-                is_eligible = responsibility_code == '1'  # IVA Responsable Inscripto
-
-                span.set_attribute("partner.afip_code", responsibility_code or "")
-                span.set_attribute("eligible", is_eligible)
-                _logger.debug("RG5329 UNIFIED: Partner %s - code %s - eligible: %s",
-                            partner.name, responsibility_code, is_eligible)
-
-                return is_eligible
-
-            except Exception as e:
-                span.record_exception(e)
-                otel.record_error("PurchaseOrder._is_partner_eligible_for_rg5329")
-                _logger.error("RG5329 UNIFIED: Error checking eligibility: %s", str(e))
-                return False
-
-    def _force_ui_refresh(self):
-        """Force UI refresh after tax changes"""
-        try:
-            # Invalidate computed fields cache
-            self.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
-
-            # Force recomputation
-            self._amount_all()
-
-            # Notify UI of changes
-            if hasattr(self.env['bus.bus'], '_sendone'):
-                self.env['bus.bus']._sendone(
-                    self.env.user.partner_id,
-                    'purchase_order/rg5329_updated',
-                    {'order_id': self.id}
-                )
-
-            _logger.debug("RG5329 UNIFIED: UI refresh triggered")
-
-        except Exception as e:
-            _logger.error("RG5329 UNIFIED: Error forcing UI refresh: %s", str(e))
+        self.ensure_one()
+        return not self.partner_id._rg5329_skip_reasons().get(self.partner_id.id, 'not_eligible')
 
     @api.onchange('partner_id')
     def _onchange_partner_rg5329_unified(self):
@@ -369,63 +316,64 @@ class PurchaseOrder(models.Model):
     def _amount_all(self):
         """Override _amount_all to trigger RG5329 logic after totals are calculated"""
         result = super()._amount_all()
-
-        # Trigger RG5329 logic after amounts are computed (but avoid infinite loops)
-        if (not self.env.context.get('applying_rg5329') and
-            not self.env.context.get('skip_rg5329_auto')):
-
-            for order in self:
-                if order.state in ['draft', 'sent']:
-                    # Only trigger if there are RG5329 products
-                    has_rg5329_products = any(
-                        line.product_id and line.product_id.apply_rg5329
-                        for line in order.order_line
-                    )
-                    if has_rg5329_products:
-                        _logger.debug("RG5329 UNIFIED: Amounts computed, checking RG5329 logic...")
-                        order.with_context(skip_rg5329_auto=True)._apply_rg5329_logic()
-
+        # Same pre-check as line writes, then the engine on the orders that need it
+        self._rg5329_apply_after_amounts()
         return result
 
 class PurchaseOrderLine(models.Model):
     _inherit = 'purchase.order.line'
 
+    def _rg5329_perception_amount(self):
+        """Monto de percepción RG 5329 incluido en el total de la línea"""
+        self.ensure_one()
+        return self.taxes_id.filtered('is_rg5329_perception')._rg5329_compute_perception(
+            self.price_unit,
+            self.product_qty,
+            self.order_id.currency_id,
+            self.product_id,
+            self.order_id.partner_id
+        )
+
+    def _rg5329_threshold_contributions(self):
+        """{line_id: amount} each line adds to the order's RG5329 threshold amount"""
+        return {line.id: line.price_total - line._rg5329_perception_amount() for line in self}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        # New lines may need the RG5329 tax: checked by the amounts computation
+        lines.order_id._rg5329_mark_touched()
+        return lines
+
     def _get_stock_move_price_unit(self):
         """
         Override to ensure RG5329 taxes are properly included in stock move price calculation.
         This prevents the tax from disappearing during confirmation.
         """
-        # Find RG5329 tax
-        rg5329_tax = self.env['account.tax'].sudo().search([
-            ('is_rg5329_perception', '=', True),
-            ('amount', '=', 3.0),
-            ('type_tax_use', '=', 'purchase')
-        ], limit=1)
-
-        # Check if this line SHOULD have RG5329 tax
-        # IMPORTANTE: Calcular total sin el impuesto RG5329 para evitar recursión
-        if self.order_id:
-            rg5329_tax_amount = 0
-            for line in self.order_id.order_line:
-                for tax in line.taxes_id:
-                    if tax.is_rg5329_perception:
-                        tax_result = tax.compute_all(
-                            line.price_unit, self.order_id.currency_id,
-                            line.product_qty, line.product_id, self.order_id.partner_id
-                        )
-                        rg5329_tax_amount += tax_result['total_included'] - tax_result['total_excluded']
-            order_total_without_rg5329 = (self.order_id.amount_total or 0) - rg5329_tax_amount
+        snapshot = self.env.context.get('rg5329_confirm_snapshot')
+        if snapshot is not None:
+            # Confirm-time decision taken once per order by button_confirm
+            rg5329_tax_id, line_ids = snapshot.get(self.order_id.id, (None, ()))
+            rg5329_tax = self.env['account.tax'].browse(rg5329_tax_id or [])
+            should_have_rg5329 = self.id in line_ids
         else:
-            order_total_without_rg5329 = 0
-
-        should_have_rg5329 = (
-            rg5329_tax and
-            self.product_id and
-            self.product_id.apply_rg5329 and
-            self.order_id and
-            order_total_without_rg5329 >= 10000000 and
-            not (self.order_id.partner_id and self.order_id.partner_id.rg5329_exempt)
-        )
+            # Find RG5329 tax
+            rg5329_tax = self.env['account.tax']._get_rg5329_tax('purchase', 3.0, self.company_id)
+
+            # Check if this line SHOULD have RG5329 tax
+            # IMPORTANTE: Total sin el impuesto RG5329 para evitar recursión; se lee del
+            # monto de umbral almacenado por orden (prefetch de todas las órdenes), no se
+            # recalcula recorriendo las líneas de la orden por cada línea
+            order_total_without_rg5329 = self.order_id._rg5329_get_threshold_amount() if self.order_id else 0
+
+            should_have_rg5329 = (
+                rg5329_tax and
+                self.product_id and
+                self.product_id.apply_rg5329 and
+                self.order_id and
+                order_total_without_rg5329 >= 10000000 and
+                self.order_id.partner_id.commercial_partner_id.rg5329_eligible
+            )
 
         if should_have_rg5329 and rg5329_tax.id not in self.taxes_id.ids:
             _logger.warning("RG5329: Line missing RG5329 tax during stock move creation - ADDING IT")
@@ -458,6 +406,12 @@ class PurchaseOrderLine(models.Model):
         """Override write to trigger RG5329 recalculation when line changes"""
         result = super().write(vals)
 
+        # Orders whose outcome may have changed are queued for the amounts
+        # computation pre-check (threshold crossings are queued by
+        # _compute_rg5329_threshold_amount), unless evaluated right below
+        if not self.env.context.get('rg5329_tax_update') and ('product_id' in vals or 'taxes_id' in vals):
+            self.order_id._rg5329_mark_touched()
+
         # Only trigger for critical changes and avoid loops
         critical_fields = ['product_qty', 'price_unit', 'product_id']
         if (not self.env.context.get('applying_rg5329') and
@@ -465,15 +419,21 @@ class PurchaseOrderLine(models.Model):
             any(field in vals for field in critical_fields) and
             'taxes_id' not in vals):  # Don't trigger if we're updating taxes
 
-            orders_to_recalc = set()
-            for line in self:
-                if line.order_id and line.order_id.state in ['draft', 'sent']:
-                    orders_to_recalc.add(line.order_id.id)
-
-            # Trigger for all affected orders with context to prevent loops
-            for order_id in orders_to_recalc:
-                order = self.env['purchase.order'].browse(order_id)
-                _logger.debug("RG5329 UNIFIED: Line write triggered for purchase order %s", order.name)
-                order.with_context(skip_onchange=True)._apply_rg5329_logic()
+            orders = self.order_id.filtered(lambda order: order.state in ['draft', 'sent'])
+
+            # Skip orders whose threshold side did not change and whose
+            # product did not change, or that have no RG5329 product at all
+            evaluated = orders._rg5329_filter_needs_logic()
+            otel.record_write_precheck(
+                order_type="purchase",
+                skipped=len(orders) - len(evaluated),
+                evaluated=len(evaluated),
+            )
+            orders = evaluated
+
+            # Trigger once for all affected orders with context to prevent loops
+            if orders:
+                _logger.debug("RG5329 UNIFIED: Line write triggered for purchase orders %s", orders.ids)
+                orders.with_context(skip_onchange=True)._apply_rg5329_logic()
 
         return result
@@ -1,5 +1,6 @@
 from odoo import models, fields, api
 
+
 class ResPartner(models.Model):
     _inherit = 'res.partner'
 
@@ -8,3 +9,58 @@ class ResPartner(models.Model):
         help='Indica si el cliente está exento del régimen de percepción RG 5329',
         default=False
     )
+
+    rg5329_eligible = fields.Boolean(
+        string='Elegible RG 5329',
+        compute='_compute_rg5329_eligible',
+        store=True,
+        index=True,
+        help='IVA Responsable Inscripto no exento: sujeto a la percepción RG 5329'
+    )
+
+    @api.depends('rg5329_exempt', 'l10n_ar_afip_responsibility_type_id.code')
+    def _compute_rg5329_eligible(self):
+        for partner in self:
+            partner.rg5329_eligible = (
+                not partner.rg5329_exempt
+                and partner.l10n_ar_afip_responsibility_type_id.code == '1'  # IVA Responsable Inscripto
+            )
+
+    def write(self, vals):
+        if 'rg5329_exempt' not in vals and 'l10n_ar_afip_responsibility_type_id' not in vals:
+            return super().write(vals)
+        was_eligible = {partner.id: partner.rg5329_eligible for partner in self}
+        result = super().write(vals)
+        changed = self.filtered(lambda partner: partner.rg5329_eligible != was_eligible[partner.id])
+        if changed:
+            # Re-evaluate the open orders of partners whose eligibility changed
+            self.env['rg5329.recalc.job']._enqueue_affected_orders(partners=changed)
+        return result
+
+    def _rg5329_skip_reasons(self):
+        """
+        Decisión de elegibilidad RG 5329 para cada partner del recordset.
+
+        Devuelve {partner_id: motivo}, donde motivo es False si el partner es
+        elegible, 'customer_exempt' si está marcado como exento o
+        'not_eligible' si no es IVA Responsable Inscripto (código '1').
+        Se decide una vez por entidad comercial (commercial_partner_id): los
+        contactos de entrega o facturación de una empresa comparten su
+        decisión. Se basa en el campo almacenado rg5329_eligible, leído en bloque.
+        """
+        reasons = {}
+        for partner in self:
+            commercial = partner.commercial_partner_id
+            reasons[partner.id] = False if commercial.rg5329_eligible else (
+                'customer_exempt' if commercial.rg5329_exempt else 'not_eligible'
+            )
+        return reasons
+
+    @api.model
+    def rg5329_eligibility_for(self, partner_ids):
+        """
+        API masiva para procesos batch: {partner_id: elegible} para los
+        partners dados, resuelta en una sola pasada.
+        """
+        skip_reasons = self.browse(partner_ids)._rg5329_skip_reasons()
+        return {partner_id: not reason for partner_id, reason in skip_reasons.items()}
@@ -0,0 +1,209 @@
+from collections import defaultdict
+
+from odoo import models, fields
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class Rg5329OrderMixin(models.AbstractModel):
+    """
+    Mecanismo RG 5329 compartido por pedidos de venta y de compra.
+
+    Cada modelo concreto declara ``rg5329_threshold_amount`` con sus
+    dependencias y aporta los puntos de extensión:
+
+    - ``_rg5329_line_tax_field``: campo de impuestos de la línea
+      (``tax_id`` en venta, ``taxes_id`` en compra);
+    - ``_rg5329_recompute_amounts()``: cálculo de totales del pedido
+      (``_compute_amounts`` / ``_amount_all``);
+    - ``_apply_rg5329_logic()``: el motor RG 5329 del pedido.
+    """
+    _name = 'rg5329.order.mixin'
+    _description = 'RG 5329 Order Mixin'
+
+    _rg5329_line_tax_field = None
+
+    rg5329_pending = fields.Boolean(
+        string='RG 5329 pendiente',
+        compute='_compute_rg5329_pending',
+        help='El recálculo RG 5329 de este pedido está encolado y se ejecutará en segundo plano.'
+    )
+
+    def _compute_rg5329_pending(self):
+        pending_ids = self.env['rg5329.recalc.job']._get_pending_ids(self)
+        for order in self:
+            order.rg5329_pending = order._origin.id in pending_ids
+
+    def _compute_rg5329_threshold_amount(self):
+        """
+        Sum of the line contributions. Saved orders whose amount crosses the
+        $10M threshold (either way) are queued for the pre-check of the next
+        amounts computation. The concrete models declare the dependencies.
+        """
+        crossed_ids = []
+        for order in self:
+            # Old stored value, read before assigning the new one
+            previous = order.rg5329_threshold_amount if order.id else 0.0
+            amount = sum(order.order_line._rg5329_threshold_contributions().values())
+            order.rg5329_threshold_amount = amount
+            if order.id and (previous >= 10000000) != (amount >= 10000000):
+                crossed_ids.append(order.id)
+        self.browse(crossed_ids)._rg5329_mark_touched()
+
+    def _rg5329_recompute_amounts(self):
+        """Recompute the order totals (hook of the concrete order models)"""
+        raise NotImplementedError()
+
+    def _rg5329_get_threshold_amount(self):
+        """Amount compared against the $10M threshold (stored, also computed on onchange records)"""
+        self.ensure_one()
+        return self.rg5329_threshold_amount
+
+    def _write_rg5329_line_taxes(self, new_taxes_by_line):
+        """
+        Write the computed tax sets grouped by target set: one write per
+        distinct set of taxes instead of one write per line.
+        Returns the lines that were updated.
+        """
+        tax_field = self._rg5329_line_tax_field
+        line_ids_by_taxes = defaultdict(list)
+        for line, taxes in new_taxes_by_line.items():
+            if line.id:
+                line_ids_by_taxes[tuple(sorted(taxes.ids))].append(line.id)
+            else:
+                # New records (onchange): only the cache needs updating
+                line[tax_field] = taxes
+
+        Line = self.env[self._fields['order_line'].comodel_name]
+        TaxUpdate = Line.with_context(skip_onchange=True, rg5329_tax_update=True)
+        for tax_ids, line_ids in line_ids_by_taxes.items():
+            TaxUpdate.browse(line_ids).write({tax_field: [(6, 0, list(tax_ids))]})
+        return Line.concat(*new_taxes_by_line)
+
+    # ------------------------------------------------------------------
+    # Pre-check: orders whose RG5329 outcome may have changed
+    # ------------------------------------------------------------------
+    def _rg5329_touched_key(self):
+        return 'rg5329.%s.touched_order_ids' % self._name
+
+    def _rg5329_mark_touched(self):
+        """Queue the orders for the pre-check of the next amounts computation"""
+        order_ids = set(self.ids)
+        if order_ids:
+            self.env.cr.precommit.data.setdefault(self._rg5329_touched_key(), set()).update(order_ids)
+
+    def _rg5329_pop_touched(self):
+        """Ids of the orders of ``self`` queued by _rg5329_mark_touched, unqueued"""
+        touched = self.env.cr.precommit.data.get(self._rg5329_touched_key())
+        if not touched:
+            return set()
+        order_ids = touched & set(self.ids)
+        touched -= order_ids
+        return order_ids
+
+    def _rg5329_write_needs_logic(self, touched):
+        """
+        Cheap pre-check for line writes and amount computations: False when
+        _apply_rg5329_logic() would be a no-op for this order, i.e. it was
+        not touched (threshold crossed, product or taxes changed, new lines),
+        or it has no RG5329 product. Reads the cache only: lines or products
+        that are not loaded count as RG5329 ones (the engine loads them anyway).
+        """
+        self.ensure_one()
+        if not touched:
+            return False
+        cache = self.env.cache
+        if not cache.contains(self, self._fields['order_line']):
+            return True
+        line_product_field = self.order_line._fields['product_id']
+        apply_rg5329_field = self.env['product.product']._fields['apply_rg5329']
+        for line in self.order_line:
+            if not cache.contains(line, line_product_field):
+                return True
+            product = line.product_id
+            if product and (not cache.contains(product, apply_rg5329_field) or product.apply_rg5329):
+                return True
+        return False
+
+    def _rg5329_filter_needs_logic(self):
+        """
+        Open orders of ``self`` that pass the pre-check. Recomputing the
+        threshold amount first queues the orders that crossed it; new
+        (onchange) records are always evaluated.
+        """
+        orders = self.filtered(lambda order: order.state in ['draft', 'sent'])
+        orders.mapped('rg5329_threshold_amount')
+        touched_ids = orders._rg5329_pop_touched()
+        return orders.filtered(lambda order: order._rg5329_write_needs_logic(
+            not order.id or order.id in touched_ids
+        ))
+
+    def _rg5329_apply_after_amounts(self):
+        """Run the engine after the amounts computation, on the orders that need it"""
+        # Avoid infinite loops: the engine recomputes the amounts itself
+        if self.env.context.get('applying_rg5329') or self.env.context.get('skip_rg5329_auto'):
+            return
+        orders = self._rg5329_filter_needs_logic()
+        if orders:
+            _logger.debug("RG5329 UNIFIED: Amounts computed, checking RG5329 logic...")
+            orders.with_context(skip_rg5329_auto=True)._apply_rg5329_logic()
+
+    # ------------------------------------------------------------------
+    # UI refresh: once per order and transaction
+    # ------------------------------------------------------------------
+    def _rg5329_dirty_key(self):
+        return 'rg5329.%s.dirty_order_ids' % self._name
+
+    def _force_ui_refresh(self):
+        """
+        Force UI refresh after tax changes
+
+        The orders are only queued in a per-transaction "dirty" set; totals
+        are recomputed and the UI notified once per order by
+        _flush_rg5329_dirty_orders, either at the end of the RG5329 run or
+        at precommit time.
+        """
+        orders = self.filtered('id')
+        if not orders:
+            return
+        data = self.env.cr.precommit.data
+        key = self._rg5329_dirty_key()
+        if key not in data:
+            self.env.cr.precommit.add(self.browse()._flush_rg5329_dirty_orders)
+        data.setdefault(key, set()).update(orders.ids)
+
+    def _flush_rg5329_dirty_orders(self):
+        """
+        Recompute totals and notify the UI exactly once per dirty order.
+        Flushes the orders of ``self`` or, on an empty recordset, every
+        queued order.
+        """
+        dirty = self.env.cr.precommit.data.get(self._rg5329_dirty_key())
+        if not dirty:
+            return
+        order_ids = dirty & set(self.ids) if self else set(dirty)
+        dirty -= order_ids
+        orders = self.browse(order_ids).exists()
+        if not orders:
+            return
+        try:
+            # Invalidate computed fields cache
+            orders.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
+
+            # Force recomputation without re-entering the RG5329 logic
+            orders.with_context(applying_rg5329=True)._rg5329_recompute_amounts()
+
+            # Notify UI of changes
+            if hasattr(self.env['bus.bus'], '_sendone'):
+                for order in orders:
+                    self.env['bus.bus']._sendone(
+                        self.env.user.partner_id,
+                        '%s/rg5329_updated' % self._table,
+                        {'order_id': order.id}
+                    )
+
+            _logger.debug("RG5329 UNIFIED: UI refresh triggered for %d orders", len(orders))
+
+        except Exception as e:
+            _logger.error("RG5329 UNIFIED: Error forcing UI refresh: %s", str(e))
@@ -0,0 +1,93 @@
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+# Cantidad de trazas conservadas en el buffer circular
+BUFFER_SIZE_PARAM = 'modulo_rg5329.profile_buffer_size'
+# Trazas de la transacción, creadas en precommit (ver _record)
+_PENDING_KEY = 'rg5329.profile.trace.pending'
+
+
+class Rg5329ProfileTrace(models.Model):
+    """
+    Buffer circular de trazas de perfilado de los motores RG 5329.
+
+    Una fila por pedido o factura y llamada al motor; en llamadas por lote
+    todas las filas comparten las mismas fases (ver ``batch_size``). Solo
+    se conservan las últimas ``modulo_rg5329.profile_buffer_size`` filas.
+    """
+    _name = 'rg5329.profile.trace'
+    _description = 'RG 5329 Profiling Trace'
+    _order = 'id desc'
+
+    engine = fields.Char(string='Motor', required=True, readonly=True)
+    res_model = fields.Char(string='Modelo', required=True, readonly=True, index=True)
+    res_id = fields.Integer(string='ID', required=True, readonly=True, index=True)
+    res_name = fields.Char(string='Documento', readonly=True)
+    batch_size = fields.Integer(string='Documentos en la llamada', readonly=True)
+    line_count = fields.Integer(string='Líneas', readonly=True)
+    duration_ms = fields.Float(string='Duración (ms)', readonly=True, digits=(16, 2))
+    query_count = fields.Integer(string='Consultas SQL', readonly=True)
+    phases = fields.Json(string='Fases', readonly=True)
+    phases_display = fields.Text(string='Desglose', compute='_compute_phases_display')
+
+    @api.depends('phases')
+    def _compute_phases_display(self):
+        for trace in self:
+            rows = [
+                "%-18s %10.2f ms %6d consultas" % (name, duration_ms, query_count)
+                for name, (duration_ms, query_count) in (trace.phases or {}).items()
+            ]
+            trace.phases_display = "\n".join(rows)
+
+    @api.model
+    def _record(self, engine, records, phases, duration_ms, query_count, line_count=0):
+        """
+        Agrega una traza por registro de ``records`` al lote de la transacción.
+        Los motores corren dentro de cómputos almacenados: las filas se crean
+        y el buffer se recorta una sola vez, al confirmar (ver _flush_pending).
+        """
+        records = records.filtered('id')
+        if not records:
+            return
+        data = self.env.cr.precommit.data
+        if _PENDING_KEY not in data:
+            self.env.cr.precommit.add(self._flush_pending)
+        data.setdefault(_PENDING_KEY, []).append({
+            'engine': engine,
+            'res_model': records._name,
+            'res_ids': records.ids,
+            'line_count': line_count,
+            'duration_ms': duration_ms,
+            'query_count': query_count,
+            'phases': dict(phases),
+        })
+
+    @api.model
+    def _flush_pending(self):
+        """Precommit: crea las trazas acumuladas y recorta el buffer"""
+        pending = self.env.cr.precommit.data.pop(_PENDING_KEY, None)
+        if not pending:
+            return
+        vals_list = []
+        for sample in pending:
+            res_ids = sample.pop('res_ids')
+            records = self.env[sample['res_model']].browse(res_ids).exists()
+            vals_list += [{
+                **sample,
+                'res_id': record.id,
+                'res_name': record.display_name,
+                'batch_size': len(res_ids),
+            } for record in records]
+        self.create(vals_list)
+        buffer_size = int(self.env['ir.config_parameter'].sudo().get_param(BUFFER_SIZE_PARAM, 500))
+        self.env.cr.execute(SQL(
+            "DELETE FROM rg5329_profile_trace WHERE id <= (SELECT MAX(id) FROM rg5329_profile_trace) - %s",
+            buffer_size,
+        ))
+
+    @api.model
+    def _action_view_for(self, records):
+        """Acción con las trazas de los documentos dados (menú de modo desarrollador)"""
+        action = self.env['ir.actions.act_window']._for_xml_id('modulo_rg5329.action_rg5329_profile_trace')
+        action['domain'] = [('res_model', '=', records._name), ('res_id', 'in', records.ids)]
+        return action
@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import defaultdict
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+import logging
+
+from ..utils import telemetry as otel
+
+_logger = logging.getLogger(__name__)
+
+# Pedidos con más líneas que este valor se recalculan en segundo plano (0 = desactivado)
+ASYNC_LINE_THRESHOLD_PARAM = 'modulo_rg5329.async_line_threshold'
+# Pedidos recalculados por lote del cron entre commits
+CHUNK_SIZE_PARAM = 'modulo_rg5329.recalc_chunk_size'
+
+_ORDER_TYPES = {'sale.order': 'sale', 'purchase.order': 'purchase'}
+
+# {res_model: set(ids)} encolados al confirmar la transacción (ver _enqueue_at_commit)
+_QUEUED_KEY = 'rg5329.recalc_job.queued'
+
+
+class Rg5329RecalcJob(models.Model):
+    """
+    Cola de recálculos RG 5329 pendientes, consumida por un ir.cron.
+
+    Hay como máximo una fila por pedido: varias ediciones seguidas de un
+    mismo pedido se fusionan en un único recálculo.
+    """
+    _name = 'rg5329.recalc.job'
+    _description = 'RG 5329 Recalculation Job'
+    _order = 'id'
+
+    res_model = fields.Selection([
+        ('sale.order', 'Sale Order'),
+        ('purchase.order', 'Purchase Order'),
+    ], string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', required=True, readonly=True)
+
+    _sql_constraints = [
+        ('record_uniq', 'unique(res_model, res_id)', 'Only one RG 5329 job per order.'),
+    ]
+
+    @api.model
+    def _get_async_line_threshold(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(ASYNC_LINE_THRESHOLD_PARAM, 0))
+
+    @api.model
+    def _defer_large_orders(self, orders):
+        """
+        Modo asíncrono: encola los pedidos guardados con más líneas que el
+        umbral configurado y devuelve los que deben procesarse en el momento.
+        Los registros de onchange de pedidos grandes se omiten: al guardar,
+        el write los encola.
+        """
+        threshold = self._get_async_line_threshold()
+        if not threshold or self.env.context.get('rg5329_sync'):
+            return orders
+        large = orders.filtered(lambda order: len(order.order_line) > threshold)
+        if large:
+            self._enqueue_at_commit(large.filtered('id'))
+        return orders - large
+
+    @api.model
+    def _enqueue_at_commit(self, orders):
+        """
+        Encola los pedidos al confirmar la transacción. Se llama desde los
+        cómputos de totales, que corren en cada flush: acá solo se acumulan
+        ids y hay un único INSERT (y disparo del cron) por transacción.
+        """
+        if not orders:
+            return
+        data = self.env.cr.precommit.data
+        if _QUEUED_KEY not in data:
+            self.env.cr.precommit.add(self._flush_queued)
+        data.setdefault(_QUEUED_KEY, defaultdict(set))[orders._name].update(orders.ids)
+        orders.invalidate_recordset(['rg5329_pending'])
+
+    @api.model
+    def _flush_queued(self):
+        """Precommit: inserta los trabajos acumulados por _enqueue_at_commit"""
+        queued = self.env.cr.precommit.data.pop(_QUEUED_KEY, None) or {}
+        for res_model, ids in queued.items():
+            self._enqueue(self.env[res_model].browse(ids))
+
+    @api.model
+    def _enqueue(self, orders):
+        """Encola un recálculo por pedido (las filas existentes se reutilizan)"""
+        if not orders:
+            return
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO rg5329_recalc_job (res_model, res_id, create_uid, create_date, write_uid, write_date)
+            SELECT %(model)s, unnest(%(ids)s::int[]), %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+            ON CONFLICT (res_model, res_id) DO NOTHING
+            """,
+            model=orders._name, ids=orders.ids, uid=self.env.uid,
+        ))
+        queued = self.env.cr.rowcount
+        _logger.debug("RG5329 JOB: %d %s queued (%d new)", len(orders), orders._name, queued)
+        orders.invalidate_recordset(['rg5329_pending'])
+        if not queued:
+            # Todos ya estaban en la cola: el cron ya fue disparado
+            return
+        otel.record_recalc_jobs(_ORDER_TYPES[orders._name], queued=queued)
+        cron = self.env.ref('modulo_rg5329.ir_cron_rg5329_recalc_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _dequeue(self, orders):
+        """Quita de la cola los pedidos dados; devuelve los que tenían un recálculo pendiente"""
+        if not orders:
+            return orders
+        pending_ids = set()
+        queued = self.env.cr.precommit.data.get(_QUEUED_KEY)
+        if queued:
+            pending_ids = queued[orders._name] & set(orders.ids)
+            queued[orders._name] -= pending_ids
+        self.env.cr.execute(SQL(
+            "DELETE FROM rg5329_recalc_job WHERE res_model = %s AND res_id = ANY(%s) RETURNING res_id",
+            orders._name, orders.ids,
+        ))
+        pending_ids.update(res_id for res_id, in self.env.cr.fetchall())
+        orders.invalidate_recordset(['rg5329_pending'])
+        return orders.filtered(lambda order: order.id in pending_ids)
+
+    @api.model
+    def _get_pending_ids(self, orders):
+        """Set de ids de ``orders`` con un recálculo encolado"""
+        ids = [order_id for order_id in orders._origin.ids if order_id]
+        if not ids:
+            return set()
+        queued = self.env.cr.precommit.data.get(_QUEUED_KEY)
+        pending_ids = queued[orders._name] & set(ids) if queued else set()
+        self.env.cr.execute(SQL(
+            "SELECT res_id FROM rg5329_recalc_job WHERE res_model = %s AND res_id = ANY(%s)",
+            orders._name, ids,
+        ))
+        return pending_ids | {res_id for res_id, in self.env.cr.fetchall()}
+
+    @api.model
+    def _enqueue_affected_orders(self, products=None, partners=None, companies=None):
+        """
+        Encola los pedidos de venta y compra abiertos (borrador/enviado)
+        afectados por un cambio de configuración RG 5329: productos que
+        cambiaron apply_rg5329, partners que cambiaron de elegibilidad o
+        compañías cuyo impuesto RG 5329 fue modificado.
+        """
+        for model in ('sale.order', 'purchase.order'):
+            domain = [('state', 'in', ['draft', 'sent'])]
+            if products is not None:
+                domain.append(('order_line.product_id', 'in', products.ids))
+            if partners is not None:
+                # Contactos de la empresa incluidos: la decisión es por entidad comercial
+                domain.append(('partner_id.commercial_partner_id', 'in', partners.commercial_partner_id.ids))
+            if companies is not None:
+                domain += [
+                    ('company_id', 'in', companies.ids),
+                    ('order_line.product_id.apply_rg5329', '=', True),
+                ]
+            orders = self.env[model].sudo().search(domain)
+            _logger.info("RG5329 JOB: Configuration change affects %d open %s", len(orders), model)
+            self._enqueue(orders)
+
+    @api.model
+    def _get_chunk_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(CHUNK_SIZE_PARAM, 100)) or 100
+
+    @api.model
+    def _process_job_chunk(self, chunk_size):
+        """
+        Toma (y borra) hasta ``chunk_size`` trabajos y recalcula sus pedidos
+        en modo síncrono. Devuelve (trabajos tomados, pedidos recalculados).
+        """
+        self.env.cr.execute(SQL(
+            """
+            DELETE FROM rg5329_recalc_job WHERE id IN (
+                SELECT id FROM rg5329_recalc_job ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+            ) RETURNING res_model, res_id
+            """,
+            chunk_size,
+        ))
+        rows = self.env.cr.fetchall()
+        ids_by_model = defaultdict(list)
+        for res_model, res_id in rows:
+            ids_by_model[res_model].append(res_id)
+
+        done = 0
+        for res_model, ids in ids_by_model.items():
+            orders = self.env[res_model].with_context(rg5329_sync=True).browse(ids).exists()
+            try:
+                with self.env.cr.savepoint():
+                    self._recalculate(orders)
+            except Exception:
+                # Un pedido que falla no debe bloquear la cola: se reintenta
+                # pedido por pedido y los que fallan se descartan (ya borrados)
+                failed = orders.browse()
+                for order in orders:
+                    try:
+                        with self.env.cr.savepoint():
+                            self._recalculate(order)
+                    except Exception:
+                        _logger.exception("RG5329 JOB: Recalculation of %s %s failed, job dropped",
+                                          res_model, order.id)
+                        otel.record_error("Rg5329RecalcJob._process_job_chunk")
+                        failed |= order
+                orders -= failed
+            otel.record_recalc_jobs(_ORDER_TYPES[res_model], processed=len(orders))
+            done += len(orders)
+        return len(rows), done
+
+    @api.model
+    def _recalculate(self, orders):
+        """Recalcula ``orders`` (contexto rg5329_sync) y guarda los cambios"""
+        orders._apply_rg5329_logic()
+        # Recompute totals in the sync context so they do not re-queue the orders
+        orders.env.flush_all()
+
+    @api.model
+    def _cron_process_jobs(self):
+        """
+        Worker del ir.cron: vacía la cola en lotes de tamaño configurable,
+        confirmando la transacción entre lotes. La cola misma es el progreso:
+        si el cron se interrumpe, la siguiente ejecución sigue donde quedó.
+        """
+        chunk_size = self._get_chunk_size()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        with otel.start_span("rg5329.recalc_job.process") as span:
+            span.set_attribute("job.chunk_size", chunk_size)
+            t0 = time.monotonic()
+            done = 0
+            while True:
+                taken, recalculated = self._process_job_chunk(chunk_size)
+                if not taken:
+                    break
+                done += recalculated
+                if auto_commit:
+                    self.env.cr.commit()
+            elapsed = time.monotonic() - t0
+
+            self.env.cr.execute("SELECT COUNT(*) FROM rg5329_recalc_job")
+            remaining = self.env.cr.fetchone()[0]
+            span.set_attribute("job.processed", done)
+            span.set_attribute("job.remaining", remaining)
+            if done:
+                otel.record_recalc_throughput(done / elapsed if elapsed else 0.0)
+            _logger.info("RG5329 JOB: Recalculated %d orders in %.1fs (%.1f orders/s), %d jobs remaining",
+                         done, elapsed, done / elapsed if elapsed else 0.0, remaining)
+            self.env['ir.cron']._notify_progress(done=done, remaining=remaining)
@@ -3,27 +3,47 @@ import time
 from odoo import models, fields, api
 import logging
 
+from ..utils import profiling
 from ..utils import telemetry as otel
 
 _logger = logging.getLogger(__name__)
 
+
 class SaleOrder(models.Model):
-    _inherit = 'sale.order'
+    _name = 'sale.order'
+    _inherit = ['sale.order', 'rg5329.order.mixin']
+
+    _rg5329_line_tax_field = 'tax_id'
+
+    rg5329_threshold_amount = fields.Monetary(
+        string='Monto umbral RG 5329',
+        compute='_compute_rg5329_threshold_amount',
+        store=True,
+        help='Total sin impuestos comparado contra el mínimo de $10.000.000. '
+             'Se recalcula desde las líneas del pedido.'
+    )
+
+    @api.depends('order_line.price_subtotal')
+    def _compute_rg5329_threshold_amount(self):
+        super()._compute_rg5329_threshold_amount()
+
+    def _rg5329_recompute_amounts(self):
+        self._compute_amounts()
 
     def apply_rg5329_logic_manual(self):
         """Public method to manually trigger RG5329 logic"""
-        self._apply_rg5329_logic()
+        self.with_context(rg5329_sync=True)._apply_rg5329_logic()
         return True
 
     def apply_rg5329_via_js(self):
         """Public method for JavaScript to trigger RG5329 logic"""
         try:
             _logger.debug("RG5329 JS: JavaScript trigger called for order %s", self.name)
-            self._apply_rg5329_logic()
+            self.with_context(rg5329_sync=True)._apply_rg5329_logic()
 
             # Force UI refresh by invalidating cache
             self.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
-            self._compute_amounts()
+            self.with_context(applying_rg5329=True)._compute_amounts()
 
             # Return success response
             return {
@@ -44,11 +64,11 @@ class SaleOrder(models.Model):
             _logger.info("RG5329 BUTTON: Manual button clicked for order %s", self.name)
 
             # Apply the logic
-            self._apply_rg5329_logic()
+            self.with_context(rg5329_sync=True)._apply_rg5329_logic()
 
             # Force UI refresh
             self.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
-            self._compute_amounts()
+            self.with_context(applying_rg5329=True)._compute_amounts()
 
             # Show success message to user
             return {
@@ -75,6 +95,13 @@ class SaleOrder(models.Model):
                 }
             }
 
+    def action_confirm(self):
+        """Run pending async RG5329 recalculations before confirming"""
+        pending = self.env['rg5329.recalc.job']._dequeue(self.filtered(lambda o: o.state in ['draft', 'sent']))
+        if pending:
+            pending.with_context(rg5329_sync=True)._apply_rg5329_logic()
+        return super().action_confirm()
+
     def _apply_rg5329_logic(self):
         """
         UNIFIED RG5329 Logic - Single source of truth
@@ -82,113 +109,131 @@ class SaleOrder(models.Model):
         1. Customer is IVA Responsable Inscripto (code '1')
         2. Product has apply_rg5329 = True
         3. Order total >= $10,000,000
+
+        Works on any recordset of orders: partners, products and line taxes
+        are prefetched once for the whole batch and the resulting tax changes
+        are written grouped by target tax set instead of line by line.
         """
         _t0 = time.monotonic()
         with otel.start_span("rg5329.sale.apply_logic") as span:
-            span.set_attribute("order.name", self.name or "New")
-            span.set_attribute("order.state", self.state or "")
+            span.set_attribute("order.count", len(self))
+            if span.is_recording():
+                span.set_attribute("order.name", ", ".join(o.name or "New" for o in self))
             try:
-                if self.state not in ['draft', 'sent'] or self.env.context.get('applying_rg5329'):
+                if self.env.context.get('applying_rg5329'):
                     return True
 
-                # Force recalculation of totals first
-                self.with_context(applying_rg5329=True)._compute_amounts()
-                total = self.amount_untaxed or 0
-                span.set_attribute("order.total_untaxed", float(total))
-                span.set_attribute("order.line_count", len(self.order_line))
-                _logger.debug("=== RG5329 UNIFIED: Processing order %s with total $%s ===", self.name or 'New', total)
-
-                # Find RG5329 tax
-                rg5329_tax = self.env['account.tax'].sudo().search([
-                    ('is_rg5329_perception', '=', True),
-                    ('amount', '=', 3.0),
-                    ('type_tax_use', '=', 'sale')
-                ], limit=1)
-
-                if not rg5329_tax:
-                    _logger.warning("RG5329 UNIFIED: No RG5329 tax found!")
-                    otel.record_perception_skipped(order_type="sale", reason="no_tax_found")
-                    return False
-
-                _logger.debug("RG5329 UNIFIED: Found RG5329 tax: %s (ID: %s)", rg5329_tax.name, rg5329_tax.id)
-
-                # Debug order line info
-                _logger.debug("RG5329 DEBUG: Order has %d lines", len(self.order_line))
-                _logger.debug("RG5329 DEBUG: Order line IDs: %s", [line.id for line in self.order_line])
-
-                # Process all lines at once
-                line_count = 0
-                for line in self.order_line:
-                    line_count += 1
-                    _logger.debug("RG5329 DEBUG: Processing line with product: %s",
-                                line.product_id.name if line.product_id else 'No product')
-
-                    # Only process products marked for RG5329
-                    if not (line.product_id and line.product_id.apply_rg5329):
-                        _logger.debug("RG5329 DEBUG: Skipping line - product not marked for RG5329")
-                        continue
+                orders = self.filtered(lambda o: o.state in ['draft', 'sent'])
+                if not orders:
+                    return True
 
-                    _logger.debug("RG5329 DEBUG: Line has RG5329 product, checking customer conditions...")
-
-                    # Skip if customer is exempt
-                    if self.partner_id and self.partner_id.rg5329_exempt:
-                        _logger.debug("RG5329 DEBUG: Customer is exempt")
-                        # Remove tax if customer is exempt
-                        if rg5329_tax.id in line.tax_id.ids:
-                            new_taxes = line.tax_id.filtered(lambda t: t.id != rg5329_tax.id)
-                            line.write({'tax_id': [(6, 0, new_taxes.ids)]})
-                            _logger.info("RG5329 UNIFIED: Removed tax - customer exempt")
-                        otel.record_perception_skipped(order_type="sale", reason="customer_exempt")
-                        continue
+                # Async mode: large orders are recalculated by the RG5329 cron worker
+                orders = self.env['rg5329.recalc.job']._defer_large_orders(orders)
+                if not orders:
+                    return True
 
-                    _logger.debug("RG5329 DEBUG: Customer not exempt, checking eligibility...")
-
-                    # Check if customer is eligible (only Responsable Inscripto)
-                    if not self._is_customer_eligible_for_rg5329():
-                        _logger.debug("RG5329 DEBUG: Customer not eligible for RG5329")
-                        # Remove tax if customer not eligible
-                        if rg5329_tax.id in line.tax_id.ids:
-                            new_taxes = line.tax_id.filtered(lambda t: t.id != rg5329_tax.id)
-                            line.write({'tax_id': [(6, 0, new_taxes.ids)]})
-                            _logger.info("RG5329 UNIFIED: Removed tax - customer not eligible")
-                        otel.record_perception_skipped(order_type="sale", reason="not_eligible")
+                # Per-phase timings and SQL counts (profiling mode only)
+                profiler = profiling.get_profiler(self.env, "sale.apply_logic", span)
+
+                # Prefetch everything the line loop reads in a few grouped queries
+                lines = orders.order_line
+                lines.mapped('tax_id')
+                lines.product_id.mapped('apply_rg5329')
+                span.set_attribute("order.line_count", len(lines))
+                profiler.lap("prefetch")
+
+                skip_reasons = orders.partner_id._rg5329_skip_reasons()
+                otel.add_eligibility_events(span, skip_reasons)
+                profiler.lap("eligibility")
+
+                # Line-level detail only when debugging: logger at DEBUG, or
+                # the rg5329_debug context flag (logged at INFO)
+                line_log_level = logging.INFO if self.env.context.get('rg5329_debug') else logging.DEBUG
+                log_lines = _logger.isEnabledFor(line_log_level)
+
+                result = True
+                new_taxes_by_line = {}
+                for order in orders:
+                    total = order._rg5329_get_threshold_amount()
+                    profiler.lap("threshold")
+
+                    # Find RG5329 tax
+                    rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0, order.company_id)
+                    profiler.lap("tax_search")
+
+                    if not rg5329_tax:
+                        _logger.warning("RG5329 UNIFIED: No RG5329 tax found!")
+                        otel.record_perception_skipped(order_type="sale", reason="no_tax_found")
+                        result = False
                         continue
 
-                    _logger.debug("RG5329 DEBUG: Customer eligible! Proceeding with tax logic...")
-
-                    has_tax = rg5329_tax.id in line.tax_id.ids
-
-                    if total >= 10000000:
-                        # ADD tax if not present
-                        if not has_tax:
-                            current_tax_ids = list(line.tax_id.ids)  # Convert to list to avoid issues
-                            if rg5329_tax.id not in current_tax_ids:  # Double check
-                                current_tax_ids.append(rg5329_tax.id)
-                                line.with_context(skip_onchange=True).write({'tax_id': [(6, 0, current_tax_ids)]})
-                                _logger.info("RG5329 UNIFIED: ✅ ADDED tax - total $%s >= $10M", total)
+                    # Customer conditions are the same for every line of the order
+                    skip_reason = skip_reasons.get(order.partner_id.id, 'not_eligible')
+                    if skip_reason:
+                        decision = skip_reason
+                    elif total >= 10000000:
+                        decision = 'apply'
+                    else:
+                        decision = 'below_threshold'
+
+                    counts = dict.fromkeys(('added', 'removed', 'present', 'absent', 'not_rg5329'), 0)
+                    for line in order.order_line:
+                        # Only process products marked for RG5329
+                        if not (line.product_id and line.product_id.apply_rg5329):
+                            counts['not_rg5329'] += 1
+                            continue
+
+                        has_tax = rg5329_tax.id in line.tax_id.ids
+
+                        if decision == 'apply':
+                            # ADD tax if not present
+                            if not has_tax:
+                                new_taxes_by_line[line] = line.tax_id | rg5329_tax
+                                action = 'added'
                                 otel.record_perception_applied(
                                     order_type="sale",
                                     rate=3.0,
                                     base_amount=float(line.price_subtotal),
                                 )
-                                # Force UI refresh
-                                self._force_ui_refresh()
-                        else:
-                            _logger.info("RG5329 UNIFIED: ✅ Tax already present - total $%s >= $10M", total)
-                    else:
-                        # REMOVE tax if present
-                        if has_tax:
-                            current_tax_ids = [t_id for t_id in line.tax_id.ids if t_id != rg5329_tax.id]
-                            line.with_context(skip_onchange=True).write({'tax_id': [(6, 0, current_tax_ids)]})
-                            _logger.info("RG5329 UNIFIED: ❌ REMOVED tax - total $%s < $10M", total)
-                            otel.record_perception_skipped(order_type="sale", reason="below_threshold")
-                            # Force UI refresh
-                            self._force_ui_refresh()
+                            else:
+                                action = 'present'
                         else:
-                            _logger.info("RG5329 UNIFIED: ❌ Tax already not present - total $%s < $10M", total)
-
-                _logger.debug("RG5329 DEBUG: Processed %d lines total", line_count)
-                return True
+                            # REMOVE tax if present (customer exempt/not eligible or total < $10M)
+                            if has_tax:
+                                new_taxes_by_line[line] = line.tax_id - rg5329_tax
+                                action = 'removed'
+                            else:
+                                action = 'absent'
+                            if skip_reason or has_tax:
+                                otel.record_perception_skipped(order_type="sale", reason=decision)
+                        counts[action] += 1
+
+                        if log_lines:
+                            _logger.log(line_log_level, "RG5329 LINE: %s line %s (%s): %s",
+                                        order.name or 'New', line.id, line.product_id.display_name, action)
+
+                    # One structured summary record per order; INFO only when taxes changed
+                    _logger.log(
+                        logging.INFO if counts['added'] or counts['removed'] else logging.DEBUG,
+                        "RG5329 UNIFIED: %s order %s total $%s -> %s (added=%d removed=%d present=%d absent=%d not_rg5329=%d)",
+                        "Sale", order.name or 'New', total, decision, counts['added'], counts['removed'],
+                        counts['present'], counts['absent'], counts['not_rg5329'],
+                        extra={'rg5329': dict(counts, order_type="sale", order=order.name, total=total, decision=decision)},
+                    )
+                    profiler.lap("decision")
+
+                changed_lines = self._write_rg5329_line_taxes(new_taxes_by_line)
+                profiler.lap("line_writes")
+                if changed_lines:
+                    # Queue the UI refresh, then flush it once per order
+                    changed_lines.order_id._force_ui_refresh()
+                    profiler.lap("ui_refresh")
+                    orders._flush_rg5329_dirty_orders()
+                    profiler.lap("compute_amounts")
+
+                _logger.debug("RG5329 DEBUG: Processed %d orders, %d lines updated", len(orders), len(changed_lines))
+                profiler.save(orders, line_count=len(lines))
+                return result
             except Exception as e:
                 span.record_exception(e)
                 otel.record_error("SaleOrder._apply_rg5329_logic")
@@ -202,63 +247,11 @@ class SaleOrder(models.Model):
     def _is_customer_eligible_for_rg5329(self):
         """
         Check if customer is eligible for RG 5329
-        Only applies to IVA Responsable Inscripto (code '1')
+        Only applies to IVA Responsable Inscripto (code '1') not marked as exempt.
+        The decision comes from the shared res.partner eligibility service.
         """
-        with otel.start_span("rg5329.sale.eligibility_check") as span:
-            span.set_attribute("partner.id", self.partner_id.id if self.partner_id else 0)
-            span.set_attribute("partner.name", self.partner_id.name or "")
-            try:
-                partner = self.partner_id
-
-                if not hasattr(partner, 'l10n_ar_afip_responsibility_type_id'):
-                    _logger.warning("RG5329 UNIFIED: No AFIP responsibility field found")
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_afip_field")
-                    return False
-
-                if not partner.l10n_ar_afip_responsibility_type_id:
-                    _logger.debug("RG5329 UNIFIED: Partner %s - no fiscal responsibility configured", partner.name)
-                    span.set_attribute("eligible", False)
-                    span.set_attribute("skip_reason", "no_responsibility_configured")
-                    return False
-
-                responsibility_code = partner.l10n_ar_afip_responsibility_type_id.code
-                is_eligible = responsibility_code == '1'  # IVA Responsable Inscripto
-
-                span.set_attribute("partner.afip_code", responsibility_code or "")
-                span.set_attribute("eligible", is_eligible)
-                _logger.debug("RG5329 UNIFIED: Partner %s - code %s - eligible: %s",
-                            partner.name, responsibility_code, is_eligible)
-
-                return is_eligible
-
-            except Exception as e:
-                span.record_exception(e)
-                otel.record_error("SaleOrder._is_customer_eligible_for_rg5329")
-                _logger.error("RG5329 UNIFIED: Error checking eligibility: %s", str(e))
-                return False
-
-    def _force_ui_refresh(self):
-        """Force UI refresh after tax changes"""
-        try:
-            # Invalidate computed fields cache
-            self.invalidate_recordset(['amount_untaxed', 'amount_tax', 'amount_total'])
-
-            # Force recomputation
-            self._compute_amounts()
-
-            # Notify UI of changes
-            if hasattr(self.env['bus.bus'], '_sendone'):
-                self.env['bus.bus']._sendone(
-                    self.env.user.partner_id,
-                    'sale_order/rg5329_updated',
-                    {'order_id': self.id}
-                )
-
-            _logger.debug("RG5329 UNIFIED: UI refresh triggered")
-
-        except Exception as e:
-            _logger.error("RG5329 UNIFIED: Error forcing UI refresh: %s", str(e))
+        self.ensure_one()
+        return not self.partner_id._rg5329_skip_reasons().get(self.partner_id.id, 'not_eligible')
 
     @api.onchange('partner_id')
     def _onchange_partner_rg5329_unified(self):
@@ -270,27 +263,24 @@ class SaleOrder(models.Model):
     def _compute_amounts(self):
         """Override _compute_amounts to trigger RG5329 logic after totals are calculated"""
         result = super()._compute_amounts()
-
-        # Trigger RG5329 logic after amounts are computed (but avoid infinite loops)
-        if (not self.env.context.get('applying_rg5329') and
-            not self.env.context.get('skip_rg5329_auto')):
-
-            for order in self:
-                if order.state in ['draft', 'sent']:
-                    # Only trigger if there are RG5329 products
-                    has_rg5329_products = any(
-                        line.product_id and line.product_id.apply_rg5329
-                        for line in order.order_line
-                    )
-                    if has_rg5329_products:
-                        _logger.debug("RG5329 UNIFIED: Amounts computed, checking RG5329 logic...")
-                        order.with_context(skip_rg5329_auto=True)._apply_rg5329_logic()
-
+        # Same pre-check as line writes, then the engine on the orders that need it
+        self._rg5329_apply_after_amounts()
         return result
 
 class SaleOrderLine(models.Model):
     _inherit = 'sale.order.line'
 
+    def _rg5329_threshold_contributions(self):
+        """{line_id: amount} each line adds to the order's RG5329 threshold amount"""
+        return {line.id: line.price_subtotal for line in self}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        # New lines may need the RG5329 tax: checked by the amounts computation
+        lines.order_id._rg5329_mark_touched()
+        return lines
+
     @api.onchange('product_uom_qty', 'price_unit', 'product_id')
     def _onchange_rg5329_unified(self):
         """Trigger RG5329 recalculation when line values change"""
@@ -304,6 +294,12 @@ class SaleOrderLine(models.Model):
         """Override write to trigger RG5329 recalculation when line changes"""
         result = super().write(vals)
 
+        # Orders whose outcome may have changed are queued for the amounts
+        # computation pre-check (threshold crossings are queued by
+        # _compute_rg5329_threshold_amount), unless evaluated right below
+        if not self.env.context.get('rg5329_tax_update') and ('product_id' in vals or 'tax_id' in vals):
+            self.order_id._rg5329_mark_touched()
+
         # Only trigger for critical changes and avoid loops
         critical_fields = ['product_uom_qty', 'price_unit', 'product_id']
         if (not self.env.context.get('applying_rg5329') and
@@ -311,15 +307,21 @@ class SaleOrderLine(models.Model):
             any(field in vals for field in critical_fields) and
             'tax_id' not in vals):  # Don't trigger if we're updating taxes
 
-            orders_to_recalc = set()
-            for line in self:
-                if line.order_id and line.order_id.state in ['draft', 'sent']:
-                    orders_to_recalc.add(line.order_id.id)
-
-            # Trigger for all affected orders with context to prevent loops
-            for order_id in orders_to_recalc:
-                order = self.env['sale.order'].browse(order_id)
-                _logger.debug("RG5329 UNIFIED: Line write triggered for order %s", order.name)
-                order.with_context(skip_onchange=True)._apply_rg5329_logic()
+            orders = self.order_id.filtered(lambda order: order.state in ['draft', 'sent'])
+
+            # Skip orders whose threshold side did not change and whose
+            # product did not change, or that have no RG5329 product at all
+            evaluated = orders._rg5329_filter_needs_logic()
+            otel.record_write_precheck(
+                order_type="sale",
+                skipped=len(orders) - len(evaluated),
+                evaluated=len(evaluated),
+            )
+            orders = evaluated
+
+            # Trigger once for all affected orders with context to prevent loops
+            if orders:
+                _logger.debug("RG5329 UNIFIED: Line write triggered for orders %s", orders.ids)
+                orders.with_context(skip_onchange=True)._apply_rg5329_logic()
 
         return result
@@ -3,23 +3,45 @@
 Tests post-upgrade para modulo_rg5329
 Valida los cambios del último deploy via XML-RPC.
 
+Cada verificación usa la menor cantidad de llamadas posible (search_read y
+fields_get en bloque) para que la validación sea rápida contra un servidor
+remoto. Con --concurrent las verificaciones independientes corren en
+paralelo, cada una con su propia conexión.
+
 Uso:
     python3 test_upgrade.py
     python3 test_upgrade.py --host http://mi-servidor:8069 --db odoo
     python3 test_upgrade.py --host http://mi-servidor:8069 --db odoo --password secret
+    python3 test_upgrade.py --host http://mi-servidor:8069 --db odoo --concurrent
 """
 import xmlrpc.client
 import sys
 import argparse
-from typing import Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
 
 MODULE_NAME = "modulo_rg5329"
-MODULE_VERSION = "18.0.1.0.0"
+MODULE_VERSION = "18.0.1.1.0"
+
+RG5329_TAXES = [
+    ("Percepción IVA RG 5329 - 3%", 3.0),
+    ("Percepción IVA RG 5329 - 1,5%", 1.5),  # coma — notación española del XML
+]
+
+CUSTOM_FIELDS = {
+    "res.partner": ["rg5329_exempt", "rg5329_eligible"],
+    "product.template": ["apply_rg5329"],
+    "sale.order": ["rg5329_threshold_amount"],
+    "purchase.order": ["rg5329_threshold_amount"],
+}
 
 
 class OdooClient:
     def __init__(self, host: str, db: str, user: str, password: str):
+        self.host = host
         self.db = db
         self.password = password
         common = xmlrpc.client.ServerProxy(f"{host}/xmlrpc/2/common")
@@ -28,6 +50,13 @@ class OdooClient:
             raise ConnectionError(f"Autenticacion fallida para {user}@{db}")
         self.models = xmlrpc.client.ServerProxy(f"{host}/xmlrpc/2/object")
 
+    def clone(self) -> "OdooClient":
+        """Mismo usuario con una conexión propia (ServerProxy no es seguro entre hilos)"""
+        client = object.__new__(type(self))
+        client.__dict__.update(self.__dict__)
+        client.models = xmlrpc.client.ServerProxy(f"{self.host}/xmlrpc/2/object")
+        return client
+
     def execute(self, model: str, method: str, *args, **kwargs) -> Any:
         return self.models.execute_kw(
             self.db, self.uid, self.password, model, method, list(args), kwargs
@@ -35,300 +64,247 @@ class OdooClient:
 
 
 class Results:
-    def __init__(self):
+    """
+    Resultados de las verificaciones. Con ``echo=False`` la salida queda en
+    ``lines`` para imprimirla en orden al terminar (modo concurrente).
+    """
+
+    def __init__(self, echo: bool = True):
         self.passed = 0
         self.failed = 0
         self.errors: list[str] = []
+        self.echo = echo
+        self.lines: list[str] = []
+
+    def _print(self, text: str):
+        if self.echo:
+            print(text)
+        else:
+            self.lines.append(text)
 
     def ok(self, name: str):
         self.passed += 1
-        print(f"    [OK]   {name}")
+        self._print(f"    [OK]   {name}")
 
     def fail(self, name: str, reason: str):
         self.failed += 1
         self.errors.append(f"{name}: {reason}")
-        print(f"    [FAIL] {name}")
-        print(f"           → {reason}")
+        self._print(f"    [FAIL] {name}")
+        self._print(f"           → {reason}")
 
+    def merge(self, other: "Results"):
+        self.passed += other.passed
+        self.failed += other.failed
+        self.errors.extend(other.errors)
+        for line in other.lines:
+            self._print(line)
 
-def _test_purchase_threshold(client: OdooClient, r: Results) -> None:
-    """Crea una PO de prueba y verifica el umbral $10M en compras."""
-    partner_ids = client.execute(
-        "res.partner", "search",
-        [["l10n_ar_afip_responsibility_type_id.code", "=", "1"],
-         ["rg5329_exempt", "=", False]],
-        limit=1
-    )
-    if not partner_ids:
-        r.fail("umbral PO - partner", "No hay partners RI no exentos para probar")
-        return
 
-    product_ids = client.execute(
-        "product.product", "search",
-        [["apply_rg5329", "=", True]],
-        limit=1
-    )
-    if not product_ids:
-        r.fail("umbral PO - product", "No hay productos con apply_rg5329=True para probar")
-        return
-
-    tax_ids = client.execute(
-        "account.tax", "search",
-        [["is_rg5329_perception", "=", True],
-         ["amount", "=", 3.0],
-         ["type_tax_use", "=", "purchase"]],
-        limit=1
-    )
-    if not tax_ids:
-        r.fail("umbral PO - tax", "No se encontró impuesto RG5329 de compras (3%)")
-        return
-
-    rg5329_tax_id = tax_ids[0]
-    po_id = None
-
-    try:
-        # --- Crear PO con total bien por debajo del umbral ---
-        po_id = client.execute("purchase.order", "create", {
-            "partner_id": partner_ids[0],
-            "order_line": [(0, 0, {
-                "product_id": product_ids[0],
-                "product_qty": 1,
-                "price_unit": 500_000,      # $500k — bajo el umbral de $10M
-                "name": "[TEST] RG5329 threshold check",
-            })],
-        })
-        client.execute("purchase.order", "apply_rg5329_logic_manual", [po_id])
+class _ThresholdFixtures:
+    """
+    Partner, producto e impuestos RG5329 de venta y compra para las pruebas
+    de umbral: se buscan una sola vez (3 llamadas) y se comparten entre
+    ventas y compras, también cuando corren en paralelo.
+    """
 
-        lines = client.execute(
-            "purchase.order.line", "search_read",
-            [["order_id", "=", po_id]],
-            fields=["id", "taxes_id"]
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: dict | None = None
+
+    def get(self, client: OdooClient) -> dict:
+        with self._lock:
+            if self._data is None:
+                self._data = self._load(client)
+            return self._data
+
+    @staticmethod
+    def _load(client: OdooClient) -> dict:
+        partner_ids = client.execute(
+            "res.partner", "search",
+            [["l10n_ar_afip_responsibility_type_id.code", "=", "1"],
+             ["rg5329_exempt", "=", False]],
+            limit=1
         )
-        if not any(rg5329_tax_id in ln["taxes_id"] for ln in lines):
-            r.ok("PO $500k < $10M → sin percepción RG5329")
-        else:
-            r.fail("umbral PO (bajo)", "Percepción aplicada con total < $10M — ¿umbral viejo $100k activo?")
-
-        # --- Subir precio a exactamente el umbral ---
-        line_ids = [ln["id"] for ln in lines]
-        client.execute("purchase.order.line", "write", line_ids, {
-            "price_unit": 10_000_000,       # $10M — en el umbral
-        })
-        client.execute("purchase.order", "apply_rg5329_logic_manual", [po_id])
-
-        lines = client.execute(
-            "purchase.order.line", "search_read",
-            [["order_id", "=", po_id]],
-            fields=["taxes_id"]
+        product_ids = client.execute(
+            "product.product", "search",
+            [["apply_rg5329", "=", True]],
+            limit=1
         )
-        if any(rg5329_tax_id in ln["taxes_id"] for ln in lines):
-            r.ok("PO $10M >= $10M → percepción RG5329 aplicada")
-        else:
-            r.fail("umbral PO (alto)", "Percepción NO aplicada con total >= $10M")
-
-    except Exception as e:
-        r.fail("umbral PO (ejecución)", str(e))
-    finally:
-        if po_id:
-            try:
-                client.execute("purchase.order", "button_cancel", [po_id])
-            except Exception:
-                pass
-            try:
-                client.execute("purchase.order", "unlink", [po_id])
-            except Exception:
-                pass
-
-
-def _test_sale_threshold(client: OdooClient, r: Results) -> None:
-    """Crea una SO de prueba y verifica el umbral $10M en ventas."""
-    partner_ids = client.execute(
-        "res.partner", "search",
-        [["l10n_ar_afip_responsibility_type_id.code", "=", "1"],
-         ["rg5329_exempt", "=", False]],
-        limit=1
-    )
-    if not partner_ids:
-        r.fail("umbral SO - partner", "No hay partners RI no exentos para probar")
+        taxes = client.execute(
+            "account.tax", "search_read",
+            [["is_rg5329_perception", "=", True],
+             ["amount", "=", 3.0],
+             ["type_tax_use", "in", ["sale", "purchase"]]],
+            fields=["type_tax_use"]
+        )
+        tax_ids: dict[str, int] = {}
+        for tax in taxes:
+            tax_ids.setdefault(tax["type_tax_use"], tax["id"])
+        return {
+            "partner_id": partner_ids[0] if partner_ids else None,
+            "product_id": product_ids[0] if product_ids else None,
+            "tax_ids": tax_ids,
+        }
+
+
+def _test_threshold(
+    client: OdooClient, r: Results, fixtures: dict, *,
+    label: str, model: str, line_model: str, type_tax_use: str,
+    qty_field: str, tax_field: str, cancel_method: str,
+) -> None:
+    """Crea un pedido de prueba y verifica el umbral $10M (compartido SO/PO)."""
+    if not fixtures["partner_id"]:
+        r.fail(f"umbral {label} - partner", "No hay partners RI no exentos para probar")
         return
-
-    product_ids = client.execute(
-        "product.product", "search",
-        [["apply_rg5329", "=", True]],
-        limit=1
-    )
-    if not product_ids:
-        r.fail("umbral SO - product", "No hay productos con apply_rg5329=True para probar")
+    if not fixtures["product_id"]:
+        r.fail(f"umbral {label} - product", "No hay productos con apply_rg5329=True para probar")
         return
-
-    tax_ids = client.execute(
-        "account.tax", "search",
-        [["is_rg5329_perception", "=", True],
-         ["amount", "=", 3.0],
-         ["type_tax_use", "=", "sale"]],
-        limit=1
-    )
-    if not tax_ids:
-        r.fail("umbral SO - tax", "No se encontró impuesto RG5329 de ventas (3%)")
+    rg5329_tax_id = fixtures["tax_ids"].get(type_tax_use)
+    if not rg5329_tax_id:
+        kind = "ventas" if type_tax_use == "sale" else "compras"
+        r.fail(f"umbral {label} - tax", f"No se encontró impuesto RG5329 de {kind} (3%)")
         return
 
-    rg5329_tax_id = tax_ids[0]
-    so_id = None
-
+    order_id = None
     try:
-        # --- Crear SO con total bien por debajo del umbral ---
-        so_id = client.execute("sale.order", "create", {
-            "partner_id": partner_ids[0],
+        # --- Crear pedido con total bien por debajo del umbral ---
+        order_id = client.execute(model, "create", {
+            "partner_id": fixtures["partner_id"],
             "order_line": [(0, 0, {
-                "product_id": product_ids[0],
-                "product_uom_qty": 1,
-                "price_unit": 500_000,
+                "product_id": fixtures["product_id"],
+                qty_field: 1,
+                "price_unit": 500_000,      # $500k — bajo el umbral de $10M
                 "name": "[TEST] RG5329 threshold check",
             })],
         })
-        client.execute("sale.order", "apply_rg5329_logic_manual", [so_id])
+        client.execute(model, "apply_rg5329_logic_manual", [order_id])
 
         lines = client.execute(
-            "sale.order.line", "search_read",
-            [["order_id", "=", so_id]],
-            fields=["id", "tax_id"]
+            line_model, "search_read",
+            [["order_id", "=", order_id]],
+            fields=[tax_field]
         )
-        if not any(rg5329_tax_id in ln["tax_id"] for ln in lines):
-            r.ok("SO $500k < $10M → sin percepción RG5329")
+        if not any(rg5329_tax_id in ln[tax_field] for ln in lines):
+            r.ok(f"{label} $500k < $10M → sin percepción RG5329")
         else:
-            r.fail("umbral SO (bajo)", "Percepción aplicada con total < $10M — ¿umbral viejo $100k activo?")
+            r.fail(f"umbral {label} (bajo)", "Percepción aplicada con total < $10M — ¿umbral viejo $100k activo?")
 
         # --- Subir precio a exactamente el umbral ---
         line_ids = [ln["id"] for ln in lines]
-        client.execute("sale.order.line", "write", line_ids, {
-            "price_unit": 10_000_000,
+        client.execute(line_model, "write", line_ids, {
+            "price_unit": 10_000_000,       # $10M — en el umbral
         })
-        client.execute("sale.order", "apply_rg5329_logic_manual", [so_id])
+        client.execute(model, "apply_rg5329_logic_manual", [order_id])
 
         lines = client.execute(
-            "sale.order.line", "search_read",
-            [["order_id", "=", so_id]],
-            fields=["tax_id"]
+            line_model, "search_read",
+            [["order_id", "=", order_id]],
+            fields=[tax_field]
         )
-        if any(rg5329_tax_id in ln["tax_id"] for ln in lines):
-            r.ok("SO $10M >= $10M → percepción RG5329 aplicada")
+        if any(rg5329_tax_id in ln[tax_field] for ln in lines):
+            r.ok(f"{label} $10M >= $10M → percepción RG5329 aplicada")
         else:
-            r.fail("umbral SO (alto)", "Percepción NO aplicada con total >= $10M")
+            r.fail(f"umbral {label} (alto)", "Percepción NO aplicada con total >= $10M")
 
     except Exception as e:
-        r.fail("umbral SO (ejecución)", str(e))
+        r.fail(f"umbral {label} (ejecución)", str(e))
     finally:
-        if so_id:
-            try:
-                client.execute("sale.order", "action_cancel", [so_id])
-            except Exception:
-                pass
-            try:
-                client.execute("sale.order", "unlink", [so_id])
-            except Exception:
-                pass
-
-
-def run_tests(client: OdooClient) -> Results:
-    r = Results()
-
-    # ------------------------------------------------------------------
-    # TEST 1: Módulo instalado con la versión correcta
-    # ------------------------------------------------------------------
-    print("\n[1] Estado del módulo")
-    module_ids = client.execute(
-        "ir.module.module", "search", [["name", "=", MODULE_NAME]]
+        if order_id:
+            for method in (cancel_method, "unlink"):
+                try:
+                    client.execute(model, method, [order_id])
+                except Exception:
+                    pass
+
+
+# ----------------------------------------------------------------------
+# Verificaciones: cada una recibe su cliente y sus resultados, y no
+# depende de las demás (pueden correr en paralelo)
+# ----------------------------------------------------------------------
+def check_module(client: OdooClient, r: Results) -> None:
+    """TEST 1: Módulo instalado con la versión correcta"""
+    modules = client.execute(
+        "ir.module.module", "search_read", [["name", "=", MODULE_NAME]],
+        fields=["state", "installed_version"], limit=1
     )
-    if not module_ids:
+    if not modules:
         r.fail("módulo existe", f"'{MODULE_NAME}' no encontrado")
+        return
+    info = modules[0]
+    if info["state"] == "installed":
+        r.ok("módulo instalado (state=installed)")
     else:
-        info = client.execute(
-            "ir.module.module", "read", module_ids[0],
-            fields=["state", "installed_version"]
-        )[0]
-        if info["state"] == "installed":
-            r.ok("módulo instalado (state=installed)")
-        else:
-            r.fail("módulo instalado", f"state={info['state']}")
-        if info["installed_version"] == MODULE_VERSION:
-            r.ok(f"versión correcta ({MODULE_VERSION})")
-        else:
-            r.fail(
-                "versión",
-                f"esperada={MODULE_VERSION}, actual={info['installed_version']}"
-            )
+        r.fail("módulo instalado", f"state={info['state']}")
+    if info["installed_version"] == MODULE_VERSION:
+        r.ok(f"versión correcta ({MODULE_VERSION})")
+    else:
+        r.fail(
+            "versión",
+            f"esperada={MODULE_VERSION}, actual={info['installed_version']}"
+        )
+
 
-    # ------------------------------------------------------------------
-    # TEST 2: Tax group con l10n_ar_tribute_afip_code = '06'
-    #         (movido a noupdate="0" para que se actualice en upgrades)
-    # ------------------------------------------------------------------
-    print("\n[2] Tax group 'Percepción RG 5329' (noupdate=0)")
+def check_tax_group(client: OdooClient, r: Results) -> None:
+    """
+    TEST 2: Tax group con l10n_ar_tribute_afip_code = '06'
+    (movido a noupdate="0" para que se actualice en upgrades)
+    """
     try:
-        group_ids = client.execute(
-            "account.tax.group", "search",
-            [["name", "=", "Percepción RG 5329"]]
+        groups = client.execute(
+            "account.tax.group", "search_read",
+            [["name", "=", "Percepción RG 5329"]],
+            fields=["name", "l10n_ar_tribute_afip_code", "sequence"], limit=1
         )
-        if not group_ids:
+        if not groups:
             r.fail("tax group existe", "No se encontró 'Percepción RG 5329'")
+            return
+        g = groups[0]
+        afip_code = g.get("l10n_ar_tribute_afip_code")
+        if afip_code == "06":
+            r.ok("l10n_ar_tribute_afip_code = '06'")
         else:
-            g = client.execute(
-                "account.tax.group", "read", group_ids[0],
-                fields=["name", "l10n_ar_tribute_afip_code", "sequence"]
-            )[0]
-            afip_code = g.get("l10n_ar_tribute_afip_code")
-            if afip_code == "06":
-                r.ok("l10n_ar_tribute_afip_code = '06'")
-            else:
-                r.fail(
-                    "l10n_ar_tribute_afip_code",
-                    f"esperado='06', actual='{afip_code}' "
-                    f"(el campo no se actualizó — verificar que noupdate='0' se deployó)"
-                )
-            if g.get("sequence") == 20:
-                r.ok("sequence = 20")
-            else:
-                r.fail("sequence", f"esperado=20, actual={g.get('sequence')}")
+            r.fail(
+                "l10n_ar_tribute_afip_code",
+                f"esperado='06', actual='{afip_code}' "
+                f"(el campo no se actualizó — verificar que noupdate='0' se deployó)"
+            )
+        if g.get("sequence") == 20:
+            r.ok("sequence = 20")
+        else:
+            r.fail("sequence", f"esperado=20, actual={g.get('sequence')}")
     except Exception as e:
         r.fail(
             "tax group (l10n_ar_tribute_afip_code)",
             f"campo no accesible — posiblemente l10n_ar no tiene el campo: {e}"
         )
 
-    # ------------------------------------------------------------------
-    # TEST 3: Impuestos de percepción RG 5329 existen con alícuotas correctas
-    # ------------------------------------------------------------------
-    print("\n[3] Impuestos de percepción")
-    for tax_name, expected_amount in [
-        ("Percepción IVA RG 5329 - 3%", 3.0),
-        ("Percepción IVA RG 5329 - 1,5%", 1.5),  # coma — notación española del XML
-    ]:
-        tax_ids = client.execute(
-            "account.tax", "search", [["name", "=", tax_name]]
-        )
-        if tax_ids:
-            tax = client.execute(
-                "account.tax", "read", tax_ids[0],
-                fields=["name", "amount"]
-            )[0]
-            if abs(tax["amount"] - expected_amount) < 0.01:
-                r.ok(f"{tax_name} (amount={expected_amount}%)")
-            else:
-                r.fail(
-                    tax_name,
-                    f"amount esperado={expected_amount}, actual={tax['amount']}"
-                )
-        else:
-            r.fail(tax_name, "no encontrado")
 
-    # ------------------------------------------------------------------
-    # TEST 4: Cuenta contable 2.1.3.03.041
-    # ------------------------------------------------------------------
-    print("\n[4] Cuenta contable percepciones")
-    account_ids = client.execute(
-        "account.account", "search",
-        [["code", "=", "2.1.3.03.041"]]
+def check_taxes(client: OdooClient, r: Results) -> None:
+    """TEST 3: Impuestos de percepción RG 5329 existen con alícuotas correctas"""
+    taxes = client.execute(
+        "account.tax", "search_read",
+        [["name", "in", [name for name, amount in RG5329_TAXES]]],
+        fields=["name", "amount"]
     )
-    if account_ids:
+    by_name: dict[str, dict] = {}
+    for tax in taxes:
+        by_name.setdefault(tax["name"], tax)
+    for tax_name, expected_amount in RG5329_TAXES:
+        tax = by_name.get(tax_name)
+        if not tax:
+            r.fail(tax_name, "no encontrado")
+        elif abs(tax["amount"] - expected_amount) < 0.01:
+            r.ok(f"{tax_name} (amount={expected_amount}%)")
+        else:
+            r.fail(
+                tax_name,
+                f"amount esperado={expected_amount}, actual={tax['amount']}"
+            )
+
+
+def check_account(client: OdooClient, r: Results) -> None:
+    """TEST 4: Cuenta contable 2.1.3.03.041"""
+    if client.execute("account.account", "search_count", [["code", "=", "2.1.3.03.041"]]):
         r.ok("cuenta 2.1.3.03.041 existe")
     else:
         r.fail(
@@ -336,43 +312,35 @@ def run_tests(client: OdooClient) -> Results:
             "no encontrada — puede ser normal si la empresa fue creada sin el módulo activo"
         )
 
-    # ------------------------------------------------------------------
-    # TEST 5: Campos custom del módulo accesibles en sus modelos
-    # ------------------------------------------------------------------
-    print("\n[5] Campos custom del módulo")
-    custom_fields = [
-        ("res.partner", "rg5329_exempt", False),
-        ("product.template", "apply_rg5329", False),
-    ]
-    for model, field, value in custom_fields:
+
+def check_custom_fields(client: OdooClient, r: Results) -> None:
+    """TEST 5: Campos custom del módulo accesibles en sus modelos (un fields_get por modelo)"""
+    for model, field_names in CUSTOM_FIELDS.items():
         try:
-            client.execute(model, "search", [[field, "=", value]], limit=1)
-            r.ok(f"{model}.{field} accesible")
+            fields = client.execute(
+                model, "fields_get", field_names, attributes=["type"]
+            )
         except Exception as e:
-            r.fail(f"{model}.{field}", str(e))
-
-    # ------------------------------------------------------------------
-    # TEST 7: Umbral de percepción en purchase.order ($10M)
-    # ------------------------------------------------------------------
-    print("\n[7] Umbral $10M en purchase.order")
-    _test_purchase_threshold(client, r)
-
-    # ------------------------------------------------------------------
-    # TEST 8: Umbral de percepción en sale.order ($10M)
-    # ------------------------------------------------------------------
-    print("\n[8] Umbral $10M en sale.order")
-    _test_sale_threshold(client, r)
-
-    # ------------------------------------------------------------------
-    # TEST 9: account.move carga sin errores de import
-    #         Valida indirectamente que wsfe_get_cae_request no tiene
-    #         errores de sintaxis o imports faltantes.
-    # ------------------------------------------------------------------
-    print("\n[9] account.move (override wsfe_get_cae_request)")
+            for field in field_names:
+                r.fail(f"{model}.{field}", str(e))
+            continue
+        for field in field_names:
+            if field in fields:
+                r.ok(f"{model}.{field} accesible")
+            else:
+                r.fail(f"{model}.{field}", "campo inexistente o sin acceso")
+
+
+def check_account_move(client: OdooClient, r: Results) -> None:
+    """
+    TEST 9: account.move carga sin errores de import
+    Valida indirectamente que wsfe_get_cae_request no tiene
+    errores de sintaxis o imports faltantes.
+    """
     try:
         fields = client.execute(
-            "account.move", "fields_get", [],
-            attributes=["string", "type"]
+            "account.move", "fields_get", ["name", "move_type"],
+            attributes=["type"]
         )
         # Si el modelo cargó, no hay errores de import en account_move.py
         if "name" in fields and "move_type" in fields:
@@ -385,9 +353,70 @@ def run_tests(client: OdooClient) -> Results:
             f"error al acceder al modelo — puede indicar error en account_move.py: {e}"
         )
 
+
+def run_tests(client: OdooClient, concurrent: bool = False, workers: int = 4) -> Results:
+    fixtures = _ThresholdFixtures()
+
+    def check_purchase_threshold(c: OdooClient, r: Results) -> None:
+        """TEST 7: Umbral de percepción en purchase.order ($10M)"""
+        _test_threshold(
+            c, r, fixtures.get(c), label="PO", model="purchase.order",
+            line_model="purchase.order.line", type_tax_use="purchase",
+            qty_field="product_qty", tax_field="taxes_id", cancel_method="button_cancel",
+        )
+
+    def check_sale_threshold(c: OdooClient, r: Results) -> None:
+        """TEST 8: Umbral de percepción en sale.order ($10M)"""
+        _test_threshold(
+            c, r, fixtures.get(c), label="SO", model="sale.order",
+            line_model="sale.order.line", type_tax_use="sale",
+            qty_field="product_uom_qty", tax_field="tax_id", cancel_method="action_cancel",
+        )
+
+    checks: list[tuple[str, Callable[[OdooClient, Results], None]]] = [
+        ("[1] Estado del módulo", check_module),
+        ("[2] Tax group 'Percepción RG 5329' (noupdate=0)", check_tax_group),
+        ("[3] Impuestos de percepción", check_taxes),
+        ("[4] Cuenta contable percepciones", check_account),
+        ("[5] Campos custom del módulo", check_custom_fields),
+        ("[7] Umbral $10M en purchase.order", check_purchase_threshold),
+        ("[8] Umbral $10M en sale.order", check_sale_threshold),
+        ("[9] account.move (override wsfe_get_cae_request)", check_account_move),
+    ]
+
+    r = Results()
+    if not concurrent:
+        for title, check in checks:
+            print(f"\n{title}")
+            _run_check(check, client, r)
+        return r
+
+    # Una conexión por hilo; la salida de cada verificación se imprime en orden
+    local = threading.local()
+
+    def run_buffered(check):
+        c = getattr(local, "client", None)
+        if c is None:
+            c = local.client = client.clone()
+        buffer = Results(echo=False)
+        _run_check(check, c, buffer)
+        return buffer
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(title, pool.submit(run_buffered, check)) for title, check in checks]
+        for title, future in futures:
+            print(f"\n{title}")
+            r.merge(future.result())
     return r
 
 
+def _run_check(check: Callable[[OdooClient, Results], None], client: OdooClient, r: Results) -> None:
+    try:
+        check(client, r)
+    except Exception as e:
+        r.fail(check.__name__, str(e))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description=f"Tests post-upgrade {MODULE_NAME}"
@@ -396,6 +425,10 @@ def main():
     parser.add_argument("--db",       default="odoo")
     parser.add_argument("--user",     default="admin")
     parser.add_argument("--password", default="admin")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="ejecutar las verificaciones independientes en paralelo")
+    parser.add_argument("--workers",  type=int, default=4,
+                        help="hilos para --concurrent (una conexión por hilo)")
     args = parser.parse_args()
 
     print(f"Conectando a {args.host}  DB={args.db}  user={args.user}")
@@ -406,7 +439,9 @@ def main():
         print(f"[ERROR] {e}")
         sys.exit(1)
 
-    results = run_tests(client)
+    t0 = time.perf_counter()
+    results = run_tests(client, concurrent=args.concurrent, workers=max(1, args.workers))
+    elapsed = time.perf_counter() - t0
 
     total = results.passed + results.failed
     print(f"\n{'=' * 52}")
@@ -418,6 +453,7 @@ def main():
             print(f"  - {err}")
     else:
         print("  ✓ Todo OK")
+    print(f"  Tiempo: {elapsed:.1f} s")
     print("=" * 52)
 
     sys.exit(0 if results.failed == 0 else 1)
@@ -0,0 +1,18 @@
+from . import test_rg5329_account_tax
+from .benchmarks import test_rg5329_engines
+from .benchmarks import test_rg5329_perception
+from .benchmarks import test_rg5329_purchase_stock
+from .benchmarks import test_rg5329_logging
+from .benchmarks import test_rg5329_telemetry
+from . import test_rg5329_query_count
+from . import test_rg5329_threshold_amount
+from . import test_rg5329_recalc_job
+from . import test_rg5329_recompute_cli
+from . import test_rg5329_metrics_store
+from . import test_rg5329_profile_trace
+from . import test_rg5329_invoice_taxes
+from . import test_rg5329_partner_eligibility
+from . import test_rg5329_purchase_stock
+from . import test_rg5329_purchase_confirm
+from . import test_rg5329_ui_refresh
+from . import test_rg5329_telemetry
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+# Tamaños por defecto; RG5329_BENCH_SIZES="10,100" para una corrida corta
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+
+def get_bench_sizes():
+    sizes = os.environ.get("RG5329_BENCH_SIZES")
+    if not sizes:
+        return DEFAULT_SIZES
+    return tuple(int(size) for size in sizes.split(",") if size.strip())
+
+
+class Rg5329BenchCommon(TransactionCase):
+    """
+    Datos sintéticos y medición (tiempo de reloj y consultas SQL) para los
+    benchmarks RG 5329. Cada clase escribe al terminar un reporte JSON en
+    RG5329_BENCH_REPORT_DIR (por defecto el directorio temporal) para poder
+    comparar corridas entre commits.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = []
+        cls.sizes = get_bench_sizes()
+
+        Partner = cls.env['res.partner']
+        responsible = cls.env.ref('l10n_ar.res_IVARI')
+        cls.partners = {
+            'eligible': Partner.create({
+                'name': 'RG5329 bench RI', 'l10n_ar_afip_responsibility_type_id': responsible.id,
+            }),
+            'exempt': Partner.create({
+                'name': 'RG5329 bench RI exento', 'l10n_ar_afip_responsibility_type_id': responsible.id,
+                'rg5329_exempt': True,
+            }),
+            'non_ri': Partner.create({
+                'name': 'RG5329 bench CF', 'l10n_ar_afip_responsibility_type_id': cls.env.ref('l10n_ar.res_CF').id,
+            }),
+        }
+
+        Tax = cls.env['account.tax']
+        cls.iva = {}
+        for type_tax_use in ('sale', 'purchase'):
+            for rate in (21.0, 10.5):
+                cls.iva[type_tax_use, rate] = Tax.create({
+                    'name': 'IVA %s%% bench %s' % (rate, type_tax_use),
+                    'amount': rate,
+                    'type_tax_use': type_tax_use,
+                })
+            for rate in (3.0, 1.5):
+                if not Tax._get_rg5329_tax(type_tax_use, rate):
+                    Tax.create({
+                        'name': 'Percepción RG 5329 %s%% bench %s' % (rate, type_tax_use),
+                        'amount': rate,
+                        'type_tax_use': type_tax_use,
+                        'is_rg5329_perception': True,
+                    })
+
+        Product = cls.env['product.product']
+        cls.products = [
+            (Product.create({'name': 'RG bench 21', 'apply_rg5329': True, 'type': 'consu'}), 21.0),
+            (Product.create({'name': 'RG bench 10,5', 'apply_rg5329': True, 'type': 'consu'}), 10.5),
+            (Product.create({'name': 'No RG bench', 'apply_rg5329': False, 'type': 'consu'}), 21.0),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._write_report()
+        super().tearDownClass()
+
+    # ------------------------------------------------------------------
+    # Generadores de documentos
+    # ------------------------------------------------------------------
+    def _line_values(self, size, total, type_tax_use):
+        """Valores de ``size`` líneas con productos mezclados que suman ~``total`` sin IVA"""
+        price_unit = round(total / size, 2)
+        for index in range(size):
+            product, rate = self.products[index % len(self.products)]
+            yield product, price_unit, self.iva[type_tax_use, rate]
+
+    def _untaxed_total(self, size, total_with_vat):
+        """Total sin IVA de ``size`` líneas de la mezcla de alícuotas que con IVA suma ``total_with_vat``"""
+        factor = sum(1 + self.products[index % len(self.products)][1] / 100 for index in range(size))
+        return total_with_vat * size / factor
+
+    def _create_sale_order(self, size, total, partner='eligible'):
+        return self.env['sale.order'].create({
+            'partner_id': self.partners[partner].id,
+            'order_line': [
+                (0, 0, {'product_id': product.id, 'product_uom_qty': 1, 'price_unit': price_unit, 'tax_id': [(6, 0, tax.ids)]})
+                for product, price_unit, tax in self._line_values(size, total, 'sale')
+            ],
+        })
+
+    def _create_purchase_order(self, size, total, partner='eligible'):
+        return self.env['purchase.order'].create({
+            'partner_id': self.partners[partner].id,
+            'order_line': [
+                (0, 0, {'product_id': product.id, 'product_qty': 1, 'price_unit': price_unit, 'taxes_id': [(6, 0, tax.ids)]})
+                for product, price_unit, tax in self._line_values(size, total, 'purchase')
+            ],
+        })
+
+    def _create_invoice(self, size, total, partner='eligible'):
+        return self.env['account.move'].create({
+            'move_type': 'out_invoice',
+            'partner_id': self.partners[partner].id,
+            'invoice_line_ids': [
+                (0, 0, {'product_id': product.id, 'quantity': 1, 'price_unit': price_unit, 'tax_ids': [(6, 0, tax.ids)]})
+                for product, price_unit, tax in self._line_values(size, total, 'sale')
+            ],
+        })
+
+    # ------------------------------------------------------------------
+    # Medición y reporte
+    # ------------------------------------------------------------------
+    def measure(self, scenario, size, func):
+        """Ejecuta ``func`` con la caché fría y registra tiempo y consultas (incluido el flush)"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        t0 = time.perf_counter()
+        result = func()
+        self.env.flush_all()
+        wall_ms = (time.perf_counter() - t0) * 1000
+        query_count = self.env.cr.sql_log_count - queries
+        self.results.append({
+            'scenario': scenario,
+            'lines': size,
+            'wall_ms': round(wall_ms, 3),
+            'queries': query_count,
+        })
+        _logger.info("RG5329 bench: %-32s %6d lines %10.1f ms %6d queries", scenario, size, wall_ms, query_count)
+        return result
+
+    @contextmanager
+    def count_calls(self, model, method):
+        """Mock que cuenta las llamadas a ``model.method`` sin cambiar su comportamiento"""
+        Model = type(self.env[model])
+        with patch.object(Model, method, autospec=True, side_effect=getattr(Model, method)) as mock:
+            yield mock
+
+    @classmethod
+    def _write_report(cls):
+        if not cls.results:
+            return
+        directory = os.environ.get("RG5329_BENCH_REPORT_DIR") or tempfile.gettempdir()
+        path = os.path.join(directory, "rg5329_bench_%s.json" % cls.__name__)
+        module = cls.env['ir.module.module'].search([('name', '=', 'modulo_rg5329')])
+        with open(path, "w") as f:
+            json.dump({
+                'benchmark': cls.__name__,
+                'module_version': module.latest_version,
+                'date': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'sizes': list(cls.sizes),
+                'results': cls.results,
+            }, f, indent=2)
+        _logger.info("RG5329 bench: report written to %s", path)
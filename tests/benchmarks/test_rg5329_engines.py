@@ -0,0 +1,63 @@
+from odoo.tests import tagged
+
+from .common import Rg5329BenchCommon
+
+ABOVE_THRESHOLD = 20000000
+BELOW_THRESHOLD = 9900000
+
+
+@tagged('post_install', '-at_install', 'rg5329_bench', '-standard')
+class TestRg5329EnginesBenchmark(Rg5329BenchCommon):
+
+    def test_sale_apply_logic(self):
+        for size in self.sizes:
+            for partner in ('eligible', 'exempt', 'non_ri'):
+                order = self._create_sale_order(size, ABOVE_THRESHOLD, partner).with_context(rg5329_sync=True)
+                self.measure('sale.apply_logic.%s' % partner, size, order._apply_rg5329_logic)
+            # Steady state: the taxes are already in place
+            self.measure('sale.apply_logic.noop', size, order._apply_rg5329_logic)
+
+    def test_sale_line_write_crossing_threshold(self):
+        for size in self.sizes:
+            order = self._create_sale_order(size, BELOW_THRESHOLD).with_context(rg5329_sync=True)
+            line = order.order_line[0]
+            self.measure('sale.line_write.cross_up', size,
+                         lambda: line.write({'price_unit': line.price_unit + 200000}))
+            self.measure('sale.line_write.cross_down', size,
+                         lambda: line.write({'price_unit': line.price_unit - 200000}))
+            self.measure('sale.line_write.same_side', size,
+                         lambda: order.order_line[-1].write({'product_uom_qty': 1}))
+
+    def test_purchase_apply_logic_and_confirm(self):
+        for size in self.sizes:
+            order = self._create_purchase_order(size, ABOVE_THRESHOLD).with_context(rg5329_sync=True)
+            self.measure('purchase.apply_logic', size, order._apply_rg5329_logic)
+            self.measure('purchase.button_confirm', size, order.button_confirm)
+            self.assertIn(order.state, ('purchase', 'to approve'))
+
+    def test_purchase_line_write_crossing_threshold(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('purchase', 3.0)
+        for size in self.sizes:
+            # En compras el umbral es con IVA: 1% por debajo con la mezcla real de alícuotas
+            order = self._create_purchase_order(size, self._untaxed_total(size, BELOW_THRESHOLD))
+            order = order.with_context(rg5329_sync=True)
+            line = order.order_line[0]
+            self.assertNotIn(rg5329_tax, line.taxes_id)
+            self.measure('purchase.line_write.cross_up', size,
+                         lambda: line.write({'price_unit': line.price_unit + 200000}))
+            self.assertIn(rg5329_tax, line.taxes_id, "%d lines: the RG5329 tax was not applied" % size)
+            self.measure('purchase.line_write.cross_down', size,
+                         lambda: line.write({'price_unit': line.price_unit - 200000}))
+            self.assertNotIn(rg5329_tax, line.taxes_id, "%d lines: the RG5329 tax was not removed" % size)
+
+    def test_invoice_compute_perception(self):
+        for size in self.sizes:
+            move = self._create_invoice(size, ABOVE_THRESHOLD)
+            fields_to_protect = [move._fields['rg5329_perception_amount'], move._fields['rg5329_base_amount']]
+
+            def compute():
+                with self.env.protecting(fields_to_protect, move):
+                    move._compute_rg5329_perception()
+
+            self.measure('invoice.compute_perception', size, compute)
+            self.measure('invoice.auto_apply_taxes', size, move._auto_apply_rg5329_taxes)
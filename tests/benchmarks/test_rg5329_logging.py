@@ -0,0 +1,89 @@
+import logging
+
+from odoo.tests import tagged
+
+from .common import Rg5329BenchCommon
+
+ABOVE_THRESHOLD = 20000000
+LINES = 500
+RUNS = 5
+
+_order_logger = logging.getLogger('odoo.addons.modulo_rg5329.models.sale_order')
+
+
+def _legacy_line_logging(order, rg5329_tax, total):
+    """
+    Referencia: las llamadas de log por línea del motor anterior para un
+    pedido ya aplicado (argumentos armados siempre, INFO en cada línea)
+    """
+    _order_logger.debug("=== RG5329 UNIFIED: Processing order %s with total $%s ===", order.name or 'New', total)
+    _order_logger.debug("RG5329 UNIFIED: Found RG5329 tax: %s (ID: %s)", rg5329_tax.name, rg5329_tax.id)
+    _order_logger.debug("RG5329 DEBUG: Order has %d lines", len(order.order_line))
+    _order_logger.debug("RG5329 DEBUG: Order line IDs: %s", [line.id for line in order.order_line])
+    for line in order.order_line:
+        _order_logger.debug("RG5329 DEBUG: Processing line with product: %s",
+                            line.product_id.name if line.product_id else 'No product')
+        if not (line.product_id and line.product_id.apply_rg5329):
+            _order_logger.debug("RG5329 DEBUG: Skipping line - product not marked for RG5329")
+            continue
+        _order_logger.debug("RG5329 DEBUG: Line has RG5329 product, checking customer conditions...")
+        _order_logger.debug("RG5329 DEBUG: Customer not exempt, checking eligibility...")
+        _order_logger.debug("RG5329 DEBUG: Customer eligible! Proceeding with tax logic...")
+        _order_logger.info("RG5329 UNIFIED: ✅ Tax already present - total $%s >= $10M", total)
+    _order_logger.debug("RG5329 DEBUG: Processed %d lines total", len(order.order_line))
+
+
+class _CountingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.count = 0
+        self.size = 0
+
+    def emit(self, record):
+        self.count += 1
+        self.size += len(self.format(record))
+
+
+@tagged('post_install', '-at_install', 'rg5329_bench', '-standard')
+class TestRg5329ApplyLogicLogging(Rg5329BenchCommon):
+
+    def _logged_runs(self, scenario, func):
+        """``RUNS`` corridas de ``func`` con el logger del motor en INFO; devuelve el handler"""
+        handler = _CountingHandler()
+        old_level = _order_logger.level
+        _order_logger.addHandler(handler)
+        _order_logger.setLevel(logging.INFO)
+        try:
+            for _run in range(RUNS):
+                self.measure(scenario, LINES, func)
+        finally:
+            _order_logger.removeHandler(handler)
+            _order_logger.setLevel(old_level)
+        return handler
+
+    def test_apply_logic_500_lines_log_volume(self):
+        order = self._create_sale_order(LINES, ABOVE_THRESHOLD).with_context(rg5329_sync=True)
+        order._apply_rg5329_logic()
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0)
+        rg5329_lines = len(order.order_line.filtered('product_id.apply_rg5329'))
+        total = order.rg5329_threshold_amount
+
+        def legacy():
+            order._apply_rg5329_logic()
+            _legacy_line_logging(order, rg5329_tax, total)
+
+        legacy = self._logged_runs('sale.apply_logic.legacy_line_logs', legacy)
+        summary = self._logged_runs('sale.apply_logic.summary_log', order._apply_rg5329_logic)
+        detail = self._logged_runs('sale.apply_logic.rg5329_debug', order.with_context(rg5329_debug=True)._apply_rg5329_logic)
+
+        self.results.append({
+            'scenario': 'sale.apply_logic.log_volume', 'lines': LINES,
+            'legacy_records': legacy.count, 'legacy_bytes': legacy.size,
+            'summary_records': summary.count, 'summary_bytes': summary.size,
+        })
+        # Antes: un INFO por línea RG 5329 en cada recálculo; ahora nada en
+        # estado estable y el detalle por línea solo a pedido
+        self.assertEqual(legacy.count, RUNS * rg5329_lines)
+        self.assertEqual(summary.count, 0)
+        self.assertGreaterEqual(detail.count, RUNS * rg5329_lines)
@@ -0,0 +1,67 @@
+from odoo.tests import tagged
+
+from .common import Rg5329BenchCommon
+
+ABOVE_THRESHOLD = 20000000
+
+
+def _legacy_rg5329_perception(move):
+    """Implementación de referencia: el doble recorrido línea por línea anterior"""
+    base_amount = 0
+    perception_amount = 0
+    for line in move.invoice_line_ids:
+        if line.product_id and line.product_id.apply_rg5329:
+            base_amount += line.price_subtotal
+    if (move.amount_untaxed or 0) >= 10000000 and base_amount > 0:
+        for line in move.invoice_line_ids:
+            if line.product_id and line.product_id.apply_rg5329:
+                iva_rate = move._get_line_iva_rate(line)
+                if iva_rate == 21.0:
+                    perception_rate = 3.0
+                elif iva_rate == 10.5:
+                    perception_rate = 1.5
+                else:
+                    perception_rate = 3.0
+                perception_amount += line.price_subtotal * (perception_rate / 100)
+    return base_amount, perception_amount
+
+
+@tagged('post_install', '-at_install', 'rg5329_bench', '-standard')
+class TestRg5329PerceptionBenchmark(Rg5329BenchCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Producto RG 5329 sin IVA: alícuota de percepción por defecto (3%)
+        cls.product_no_iva = cls.env['product.product'].create({
+            'name': 'RG bench sin IVA', 'apply_rg5329': True, 'type': 'consu',
+        })
+
+    def _create_mixed_invoice(self, size):
+        """Factura de ``size`` líneas: la mezcla 21% / 10,5% / no RG más un cuarto sin IVA"""
+        move = self._create_invoice(size, ABOVE_THRESHOLD)
+        move.write({'invoice_line_ids': [
+            (0, 0, {'product_id': self.product_no_iva.id, 'quantity': 1, 'price_unit': 1000.0 + index % 7, 'tax_ids': []})
+            for index in range(max(1, size // 4))
+        ]})
+        return move
+
+    def _compute(self, move):
+        fields_to_protect = [move._fields['rg5329_perception_amount'], move._fields['rg5329_base_amount']]
+        with self.env.protecting(fields_to_protect, move):
+            move._compute_rg5329_perception()
+
+    def test_perception_matches_legacy(self):
+        for size in self.sizes:
+            move = self._create_mixed_invoice(size)
+            tax_sets = len(set(move.invoice_line_ids.mapped(lambda line: line.tax_ids._ids)))
+            expected_base, expected_perception = self.measure(
+                'invoice.compute_perception.legacy', size, lambda: _legacy_rg5329_perception(move),
+            )
+            with self.count_calls('account.move', '_get_line_iva_rate') as get_rate:
+                self.measure('invoice.compute_perception.single_pass', size, lambda: self._compute(move))
+
+            self.assertAlmostEqual(move.rg5329_base_amount, expected_base, places=2)
+            self.assertAlmostEqual(move.rg5329_perception_amount, expected_perception, places=2)
+            # La alícuota se resuelve una vez por conjunto de impuestos, no por línea
+            self.assertLessEqual(get_rate.call_count, tax_sets)
@@ -0,0 +1,30 @@
+from odoo.tests import tagged
+
+from .common import Rg5329BenchCommon
+
+BELOW_THRESHOLD = 5000000
+
+
+@tagged('post_install', '-at_install', 'rg5329_bench', '-standard')
+class TestRg5329StockMovePriceBenchmark(Rg5329BenchCommon):
+
+    def setUp(self):
+        super().setUp()
+        purchase_stock = self.env['ir.module.module'].search([('name', '=', 'purchase_stock')])
+        if purchase_stock.state != 'installed':
+            self.skipTest("purchase_stock is not installed")
+
+    def test_stock_move_price_unit_reads_stored_threshold(self):
+        for size in self.sizes:
+            order = self._create_purchase_order(size, BELOW_THRESHOLD)
+
+            def price_units():
+                for line in order.order_line:
+                    line._get_stock_move_price_unit()
+
+            # Sin recalcular el total de la orden por cada línea (O(n²)): se lee
+            # el monto umbral almacenado
+            with self.count_calls('purchase.order.line', '_rg5329_threshold_contributions') as contributions:
+                self.measure('purchase.stock_move_price_unit', size, price_units)
+            self.assertEqual(contributions.call_count, 0)
+            self.assertFalse(order.order_line.taxes_id.filtered('is_rg5329_perception'))
@@ -0,0 +1,60 @@
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from ...utils import telemetry as otel
+from .common import Rg5329BenchCommon
+
+_CALLS = 100000
+
+_RECORDERS = [name for name in otel._ENABLED_HELPERS if name not in ('start_span', 'add_eligibility_events')]
+
+
+@tagged('post_install', '-at_install', 'rg5329_bench', '-standard')
+class TestRg5329TelemetryOverhead(Rg5329BenchCommon):
+
+    def _ns_per_call(self, helpers):
+        record_perception_applied = helpers['record_perception_applied']
+        record_perception_skipped = helpers['record_perception_skipped']
+        start_span = helpers['start_span']
+        t0 = time.perf_counter_ns()
+        for _i in range(_CALLS):
+            record_perception_applied(order_type="sale", rate=3.0, base_amount=1000.0)
+            record_perception_skipped(order_type="sale", reason="below_threshold")
+            with start_span("rg5329.bench"):
+                pass
+        return (time.perf_counter_ns() - t0) / (_CALLS * 3)
+
+    def test_telemetry_overhead_per_call(self):
+        noop_helpers = {
+            'record_perception_applied': otel._noop,
+            'record_perception_skipped': otel._noop,
+            'start_span': otel._noop_start_span,
+        }
+        # Solo informativo (reporte JSON): no se compara tiempo de reloj
+        self.results.append({
+            'scenario': 'telemetry.ns_per_call',
+            'otel_enabled': otel._ENABLED,
+            'metrics_store_enabled': otel._metrics.ENABLED,
+            'noop_ns': round(self._ns_per_call(noop_helpers), 1),
+            'instrumented_ns': round(self._ns_per_call(otel._ENABLED_HELPERS), 1),
+        })
+
+        self.assertIs(otel._noop_start_span("a"), otel._noop_start_span("b"))
+        if not otel._ENABLED:
+            self.assertIs(otel.start_span, otel._noop_start_span)
+            self.assertIs(otel.add_eligibility_events, otel._noop)
+        if not otel._ENABLED and not otel._metrics.ENABLED:
+            for name in _RECORDERS:
+                self.assertIs(getattr(otel, name), otel._noop, name)
+
+    def test_disabled_telemetry_is_never_initialised(self):
+        if otel._ENABLED or otel._metrics.ENABLED:
+            self.skipTest("OTel or the metrics store is enabled")
+        order = self._create_sale_order(100, 20000000).with_context(rg5329_sync=True)
+        with patch.object(otel, '_init') as init:
+            self.measure('sale.apply_logic.telemetry_off', 100, order._apply_rg5329_logic)
+            order.order_line[0].write({'price_unit': 1.0})
+            self.env.flush_all()
+        self.assertEqual(init.call_count, 0)
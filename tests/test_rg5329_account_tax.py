@@ -0,0 +1,94 @@
+import random
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329PerceptionFastPath(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Tax = cls.env['account.tax']
+        cls.rg_3 = Tax.create({
+            'name': 'Percepción RG 5329 3% test', 'amount': 3.0,
+            'type_tax_use': 'purchase', 'is_rg5329_perception': True,
+        })
+        cls.rg_1_5 = Tax.create({
+            'name': 'Percepción RG 5329 1,5% test', 'amount': 1.5,
+            'type_tax_use': 'purchase', 'is_rg5329_perception': True,
+        })
+        cls.rg_included = Tax.create({
+            'name': 'Percepción RG 5329 3% incluido test', 'amount': 3.0,
+            'type_tax_use': 'purchase', 'is_rg5329_perception': True,
+            'price_include_override': 'tax_included',
+        })
+        cls.rg_fixed = Tax.create({
+            'name': 'Percepción RG 5329 fija test', 'amount': 150.0, 'amount_type': 'fixed',
+            'type_tax_use': 'purchase', 'is_rg5329_perception': True,
+        })
+        cls.currencies = cls.env.company.currency_id | cls.env.ref('base.USD') | cls.env.ref('base.CLP')
+        cls.currencies.active = True
+
+    def _compute_all_perception(self, tax, price_unit, quantity, currency):
+        tax_result = tax.compute_all(price_unit, currency, quantity)
+        return tax_result['total_included'] - tax_result['total_excluded']
+
+    def test_fast_path_matches_compute_all(self):
+        rng = random.Random(5329)
+        for _i in range(500):
+            tax = rng.choice([self.rg_3, self.rg_1_5, self.rg_included, self.rg_fixed])
+            currency = rng.choice(self.currencies)
+            price_unit = round(rng.uniform(0, 500000), rng.choice([0, 2, 4]))
+            quantity = round(rng.uniform(0, 1000), rng.choice([0, 3]))
+            with self.subTest(tax=tax.name, currency=currency.name, price_unit=price_unit, quantity=quantity):
+                self.assertTrue(currency.is_zero(
+                    tax._rg5329_compute_perception(price_unit, quantity, currency)
+                    - self._compute_all_perception(tax, price_unit, quantity, currency)
+                ))
+
+    def test_multiple_taxes_are_summed(self):
+        taxes = self.rg_3 | self.rg_1_5 | self.rg_fixed
+        currency = self.env.company.currency_id
+        expected = sum(self._compute_all_perception(tax, 1234.56, 7, currency) for tax in taxes)
+        self.assertAlmostEqual(taxes._rg5329_compute_perception(1234.56, 7, currency), expected,
+                               places=currency.decimal_places)
+        self.assertEqual(self.env['account.tax']._rg5329_compute_perception(1234.56, 7, currency), 0)
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329TaxCache(TransactionCase):
+    """El cache de _get_rg5329_tax_ids sigue a los impuestos RG 5329"""
+
+    def test_cache_follows_tax_lifecycle(self):
+        Tax = self.env['account.tax']
+        self.assertFalse(Tax._get_rg5329_tax('sale', 2.5))
+        tax = Tax.create({
+            'name': 'Percepción RG 5329 2,5% test', 'amount': 2.5,
+            'type_tax_use': 'sale', 'is_rg5329_perception': True,
+        })
+        self.assertEqual(Tax._get_rg5329_tax('sale', 2.5), tax)
+
+        tax.amount = 2.0
+        self.assertFalse(Tax._get_rg5329_tax('sale', 2.5))
+        self.assertEqual(Tax._get_rg5329_tax('sale', 2.0), tax)
+
+        tax.active = False
+        self.assertFalse(Tax._get_rg5329_tax('sale', 2.0))
+        tax.active = True
+        self.assertEqual(Tax._get_rg5329_tax('sale', 2.0), tax)
+
+        tax.unlink()
+        self.assertFalse(Tax._get_rg5329_tax('sale', 2.0))
+
+    def test_unrelated_write_keeps_cache(self):
+        tax = self.env['account.tax'].create({
+            'name': 'Percepción RG 5329 2,5% test', 'amount': 2.5,
+            'type_tax_use': 'sale', 'is_rg5329_perception': True,
+        })
+        with patch.object(self.env.registry, 'clear_cache') as clear_cache:
+            tax.name = 'Percepción RG 5329 2,5%'
+            clear_cache.assert_not_called()
+            tax.amount = 2.0
+            clear_cache.assert_called()
@@ -0,0 +1,80 @@
+from odoo import Command
+from odoo.tests import Form, tagged
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329InvoiceTaxes(Rg5329BenchCommon):
+    """Los impuestos RG 5329 de facturas se ajustan al crear, editar y publicar, nunca al recalcular"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Tax = cls.env['account.tax']
+        cls.rg_3 = Tax._get_rg5329_tax('sale', 3.0)
+        cls.rg_1_5 = Tax._get_rg5329_tax('sale', 1.5)
+        cls.rg_product_21, cls.rg_product_10_5 = cls.products[0][0], cls.products[1][0]
+
+    def assertRg5329Taxes(self, move, expected):
+        """``expected`` es (impuesto en la línea RG 21%, impuesto en la línea RG 10,5%) o None"""
+        line_21, line_10_5 = move.invoice_line_ids[:2]
+        rg5329_taxes = self.rg_3 | self.rg_1_5
+        if expected:
+            self.assertEqual(line_21.tax_ids & rg5329_taxes, expected[0])
+            self.assertEqual(line_10_5.tax_ids & rg5329_taxes, expected[1])
+        else:
+            self.assertFalse(move.invoice_line_ids.tax_ids & rg5329_taxes)
+
+    def _strip_rg5329_taxes(self, move):
+        move.invoice_line_ids.write({'tax_ids': [Command.unlink(tax.id) for tax in self.rg_3 | self.rg_1_5]})
+        self.assertRg5329Taxes(move, None)
+
+    def test_create_applies_taxes(self):
+        # Igual que sale.order._create_invoices o una creación por RPC
+        self.assertRg5329Taxes(self._create_invoice(9, 20000000), (self.rg_3, self.rg_1_5))
+        self.assertRg5329Taxes(self._create_invoice(9, 20000000, 'exempt'), None)
+        self.assertRg5329Taxes(self._create_invoice(9, 5000000), None)
+
+    def test_post_applies_taxes(self):
+        move = self._create_invoice(9, 20000000)
+        self._strip_rg5329_taxes(move)
+        move.action_post()
+        self.assertRg5329Taxes(move, (self.rg_3, self.rg_1_5))
+
+    def test_post_removes_taxes_for_exempt_partner(self):
+        move = self._create_invoice(9, 20000000)
+        # Escritura directa (RPC): no pasa por el onchange
+        move.partner_id = self.partners['exempt']
+        move.action_post()
+        self.assertRg5329Taxes(move, None)
+
+    def test_onchange_line_applies_taxes(self):
+        with Form(self.env['account.move'].with_context(default_move_type='out_invoice')) as move_form:
+            move_form.partner_id = self.partners['eligible']
+            for product, rate in ((self.rg_product_21, 21.0), (self.rg_product_10_5, 10.5)):
+                with move_form.invoice_line_ids.new() as line_form:
+                    line_form.product_id = product
+                    line_form.price_unit = 10000000
+                    line_form.tax_ids.clear()
+                    line_form.tax_ids.add(self.iva['sale', rate])
+        self.assertRg5329Taxes(move_form.record, (self.rg_3, self.rg_1_5))
+
+    def test_onchange_partner_removes_taxes(self):
+        move = self._create_invoice(9, 20000000)
+        self.assertRg5329Taxes(move, (self.rg_3, self.rg_1_5))
+        with Form(move) as move_form:
+            move_form.partner_id = self.partners['exempt']
+        self.assertRg5329Taxes(move, None)
+
+    def test_recompute_perception_keeps_taxes(self):
+        move = self._create_invoice(9, 20000000)
+        # Línea RG sin percepción: el cálculo almacenado no debe agregarla
+        move.invoice_line_ids[0].tax_ids -= self.rg_3
+        self.env.flush_all()
+        taxes_before = {line.id: line.tax_ids for line in move.invoice_line_ids}
+        for fname in ('rg5329_perception_amount', 'rg5329_base_amount'):
+            self.env.add_to_compute(move._fields[fname], move)
+        move.flush_recordset(['rg5329_perception_amount', 'rg5329_base_amount'])
+        self.env.invalidate_all()
+        self.assertEqual({line.id: line.tax_ids for line in move.invoice_line_ids}, taxes_before)
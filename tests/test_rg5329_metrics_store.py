@@ -0,0 +1,64 @@
+import os
+import subprocess
+import tempfile
+import threading
+from unittest.mock import patch
+
+from odoo.tests import BaseCase, tagged
+
+from ..utils import metrics_store
+
+_COUNTER = ('rg5329_errors_total', (('method', 'test_metrics_store'),))
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329MetricsStore(BaseCase):
+    """Los contadores no se pierden ni retroceden al terminar hilos o procesos"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = patch.dict(os.environ, {'RG5329_METRICS_DIR': self.directory})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Sin hilo de flush: uno arrancado acá seguiría escribiendo en el
+        # directorio por defecto cuando se restaure el entorno
+        patcher = patch.object(metrics_store, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _count(self, counters):
+        return counters.get(_COUNTER, 0)
+
+    def test_finished_threads_are_folded(self):
+        before = self._count(metrics_store._snapshot()[0])
+        for _i in range(50):
+            thread = threading.Thread(target=metrics_store.add, args=_COUNTER)
+            thread.start()
+            thread.join()
+        self.assertEqual(self._count(metrics_store._snapshot()[0]), before + 50)
+        alive = {thread.ident for thread in threading.enumerate()}
+        self.assertLessEqual(set(metrics_store._shards), alive)
+
+    def _dead_pid(self):
+        process = subprocess.Popen(['true'])
+        process.wait()
+        return process.pid
+
+    def test_dead_and_reused_pid_files_are_archived(self):
+        dead_pid = self._dead_pid()
+        metrics_store._write_json(os.path.join(self.directory, '%d-1.json' % dead_pid), {_COUNTER: 5}, {})
+        # Mismo pid que este proceso pero iniciado antes: el pid fue reutilizado
+        metrics_store._write_json(os.path.join(self.directory, '%d-1.json' % os.getpid()), {_COUNTER: 7}, {})
+        own = self._count(metrics_store._snapshot()[0])
+
+        counters = metrics_store._load_all()[0]
+        self.assertEqual(self._count(counters), own + 12)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if name.endswith('.json')),
+            sorted([metrics_store._ARCHIVE_FILENAME, '%s.json' % metrics_store._process_key]),
+        )
+        # Un segundo scrape no vuelve a sumar lo archivado
+        self.assertEqual(self._count(metrics_store._load_all()[0]), own + 12)
@@ -0,0 +1,42 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329PartnerEligibility(TransactionCase):
+    """Una sola decisión RG 5329 por entidad comercial"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Partner = cls.env['res.partner']
+        responsible = cls.env.ref('l10n_ar.res_IVARI')
+        cls.company = Partner.create({
+            'name': 'RG5329 empresa RI', 'is_company': True,
+            'l10n_ar_afip_responsibility_type_id': responsible.id,
+        })
+        cls.delivery = Partner.create({'name': 'Entrega', 'type': 'delivery', 'parent_id': cls.company.id})
+        cls.invoice = Partner.create({'name': 'Facturación', 'type': 'invoice', 'parent_id': cls.company.id})
+        cls.final_consumer = Partner.create({
+            'name': 'RG5329 CF', 'l10n_ar_afip_responsibility_type_id': cls.env.ref('l10n_ar.res_CF').id,
+        })
+
+    def test_contacts_share_the_commercial_decision(self):
+        contacts = self.company | self.delivery | self.invoice
+        self.assertEqual(set(contacts._rg5329_skip_reasons().values()), {False})
+
+        self.company.rg5329_exempt = True
+        # Los contactos no tienen la marca propia pero heredan la de la empresa
+        self.assertFalse(self.delivery.rg5329_exempt)
+        self.assertEqual(set(contacts._rg5329_skip_reasons().values()), {'customer_exempt'})
+
+    def test_eligibility_for(self):
+        partner_ids = [self.company.id, self.delivery.id, self.invoice.id, self.final_consumer.id]
+        self.assertEqual(self.env['res.partner'].rg5329_eligibility_for(partner_ids), {
+            self.company.id: True,
+            self.delivery.id: True,
+            self.invoice.id: True,
+            self.final_consumer.id: False,
+        })
+        self.company.rg5329_exempt = True
+        self.assertEqual(self.env['res.partner'].rg5329_eligibility_for([self.delivery.id]), {self.delivery.id: False})
+        self.assertEqual(self.env['res.partner'].rg5329_eligibility_for([]), {})
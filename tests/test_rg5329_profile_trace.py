@@ -0,0 +1,29 @@
+from odoo.tests import tagged
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329ProfileTrace(Rg5329BenchCommon):
+    """Las trazas se escriben al confirmar la transacción, no dentro de los cómputos"""
+
+    def _traces(self, orders):
+        return self.env['rg5329.profile.trace'].search([
+            ('res_model', '=', orders._name), ('res_id', 'in', orders.ids),
+        ])
+
+    def test_traces_written_once_at_precommit(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('modulo_rg5329.profiling', True)
+        ICP.set_param('modulo_rg5329.profile_buffer_size', 3)
+        orders = self.env['sale.order'].browse()
+        for _i in range(3):
+            orders |= self._create_sale_order(5, 20000000)
+        self.env.flush_all()
+        self.assertFalse(self._traces(orders))
+
+        self.env.cr.precommit.run()
+        traces = self._traces(orders)
+        self.assertTrue(traces)
+        self.assertLessEqual(self.env['rg5329.profile.trace'].search_count([]), 3)
+        self.assertTrue(all(trace.phases for trace in traces))
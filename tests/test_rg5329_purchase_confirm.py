@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import tagged
+from odoo.tools import frozendict
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329PurchaseConfirm(Rg5329BenchCommon):
+    """La percepción que la confirmación quita de las líneas se restaura desde la foto previa"""
+
+    def test_restore_taxes_removed_during_confirm(self):
+        rg_3 = self.env['account.tax']._get_rg5329_tax('purchase', 3.0)
+        orders = self._create_purchase_order(3, 15000000) | self._create_purchase_order(3, 15000000)
+        rg_lines = orders.order_line.filtered(lambda line: rg_3 in line.taxes_id)
+        self.assertEqual(len(rg_lines), 4)
+
+        PurchaseOrder = type(self.env['purchase.order'])
+        add_supplier = PurchaseOrder._add_supplier_to_product
+        restore = PurchaseOrder._restore_rg5329_taxes_after_confirm
+        restore_writes = []
+
+        def strip_rg5329(order):
+            # Dentro de super().button_confirm(): otro módulo borra la percepción
+            order.order_line.write({'taxes_id': [Command.unlink(rg_3.id)]})
+            return add_supplier(order)
+
+        def counting_restore(order, snapshot):
+            with self.count_calls('purchase.order.line', 'write') as line_write:
+                restore(order, snapshot)
+            restore_writes.append(line_write.call_count)
+
+        with patch.object(PurchaseOrder, '_add_supplier_to_product', autospec=True, side_effect=strip_rg5329), \
+                patch.object(PurchaseOrder, '_restore_rg5329_taxes_after_confirm', autospec=True,
+                             side_effect=counting_restore) as restore_mock:
+            orders.button_confirm()
+
+        self.assertEqual(orders.mapped('state'), ['purchase', 'purchase'])
+        self.assertTrue(all(rg_3 in line.taxes_id for line in rg_lines))
+
+        snapshot = restore_mock.call_args.args[1]
+        self.assertIsInstance(snapshot, frozendict)
+        self.assertEqual(dict(snapshot), {
+            order.id: (rg_3.id, tuple((rg_lines & order.order_line).ids)) for order in orders
+        })
+        # Una escritura por conjunto de impuestos resultante (IVA 21% y 10,5%), no una por línea
+        self.assertEqual(restore_writes, [2])
@@ -0,0 +1,43 @@
+from odoo import Command
+from odoo.tests import tagged
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329PurchaseStockPrice(Rg5329BenchCommon):
+    """Líneas agregadas a una compra confirmada: el precio del movimiento incluye la percepción"""
+
+    def setUp(self):
+        super().setUp()
+        purchase_stock = self.env['ir.module.module'].search([('name', '=', 'purchase_stock')])
+        if purchase_stock.state != 'installed':
+            self.skipTest("purchase_stock is not installed")
+        self.rg_3 = self.env['account.tax']._get_rg5329_tax('purchase', 3.0)
+
+    def _add_line_to_confirmed_order(self, partner):
+        order = self._create_purchase_order(3, 15000000, partner)
+        order.button_confirm()
+        self.assertEqual(order.state, 'purchase')
+        product, rate = self.products[0]
+        iva = self.iva['purchase', rate]
+        order.order_line = [Command.create({
+            'product_id': product.id, 'product_qty': 1, 'price_unit': 1000.0, 'taxes_id': [Command.set(iva.ids)],
+        })]
+        line = order.order_line[-1]
+        self.assertEqual(len(line.move_ids), 1)
+        return line, iva
+
+    def test_added_line_includes_perception(self):
+        line, iva = self._add_line_to_confirmed_order('eligible')
+        self.assertIn(self.rg_3, line.taxes_id)
+        expected = (iva | self.rg_3).compute_all(1000.0)['total_void']
+        self.assertAlmostEqual(line.move_ids.price_unit, expected)
+        self.assertNotAlmostEqual(line.move_ids.price_unit, iva.compute_all(1000.0)['total_void'])
+
+    def test_added_line_without_perception_for_ineligible_partner(self):
+        for partner in ('exempt', 'non_ri'):
+            with self.subTest(partner=partner):
+                line, iva = self._add_line_to_confirmed_order(partner)
+                self.assertNotIn(self.rg_3, line.taxes_id)
+                self.assertAlmostEqual(line.move_ids.price_unit, iva.compute_all(1000.0)['total_void'])
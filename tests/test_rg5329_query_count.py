@@ -0,0 +1,93 @@
+from odoo.tests import tagged
+
+from .benchmarks.common import Rg5329BenchCommon
+
+SIZES = (10, 50, 200)
+
+# Per-order query ceilings, checked by assertQueryCount at every size. On top
+# of them every entry point must run exactly the same number of queries at
+# every size, so a single per-line query fails the test. Lower a ceiling to
+# the count reported by the test when an entry point gets cheaper; never
+# raise it to make a per-line query pass.
+QUERY_BUDGETS = {
+    'sale.apply_rg5329_manual_button': 45,
+    'sale.apply_rg5329_via_js': 45,
+    'sale.line_write': 50,
+    'purchase.apply_rg5329_manual_button': 45,
+    'purchase.line_write': 50,
+    'purchase.button_confirm': 150,
+}
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329QueryCount(Rg5329BenchCommon):
+
+    def _check_entry_point(self, name, prepare, call, check=None):
+        """
+        Run ``call(record)`` on documents of every size in SIZES under the
+        entry point's ceiling, and fail unless the query count is exactly the
+        same at every size. ``check(record)`` then verifies the outcome.
+        """
+        counts = []
+        for size in SIZES:
+            record = prepare(size)
+            self.env.flush_all()
+            self.env.invalidate_all()
+            queries = self.env.cr.sql_log_count
+            with self.assertQueryCount(QUERY_BUDGETS[name]):
+                call(record)
+                self.env.flush_all()
+            counts.append(self.env.cr.sql_log_count - queries)
+            if check:
+                check(record)
+        self.assertEqual(
+            counts, [counts[0]] * len(SIZES),
+            "%s: query count depends on line count %s" % (name, dict(zip(SIZES, counts))),
+        )
+
+    def test_sale_manual_button(self):
+        self._check_entry_point(
+            'sale.apply_rg5329_manual_button',
+            lambda size: self._create_sale_order(size, 20000000),
+            lambda order: order.apply_rg5329_manual_button(),
+        )
+
+    def test_sale_via_js(self):
+        self._check_entry_point(
+            'sale.apply_rg5329_via_js',
+            lambda size: self._create_sale_order(size, 20000000),
+            lambda order: order.apply_rg5329_via_js(),
+        )
+
+    def test_sale_line_write(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0)
+        self._check_entry_point(
+            'sale.line_write',
+            lambda size: self._create_sale_order(size, 9900000),
+            lambda order: order.order_line[0].write({'price_unit': order.order_line[0].price_unit + 200000}),
+            lambda order: self.assertIn(rg5329_tax, order.order_line[0].tax_id),
+        )
+
+    def test_purchase_manual_button(self):
+        self._check_entry_point(
+            'purchase.apply_rg5329_manual_button',
+            lambda size: self._create_purchase_order(size, 20000000),
+            lambda order: order.apply_rg5329_manual_button(),
+        )
+
+    def test_purchase_line_write(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('purchase', 3.0)
+        # The purchase threshold includes VAT: start 1% below it and cross it
+        self._check_entry_point(
+            'purchase.line_write',
+            lambda size: self._create_purchase_order(size, self._untaxed_total(size, 9900000)),
+            lambda order: order.order_line[0].write({'price_unit': order.order_line[0].price_unit + 200000}),
+            lambda order: self.assertIn(rg5329_tax, order.order_line[0].taxes_id),
+        )
+
+    def test_purchase_button_confirm(self):
+        self._check_entry_point(
+            'purchase.button_confirm',
+            lambda size: self._create_purchase_order(size, 20000000),
+            lambda order: order.button_confirm(),
+        )
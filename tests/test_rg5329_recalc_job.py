@@ -0,0 +1,132 @@
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329RecalcJob(Rg5329BenchCommon):
+    """Los pedidos grandes se encolan una vez por transacción, fuera del cómputo de totales"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('modulo_rg5329.async_line_threshold', 5)
+        cls.cron = cls.env.ref('modulo_rg5329.ir_cron_rg5329_recalc_jobs')
+
+    def _job_ids(self, order):
+        self.env.cr.execute(
+            "SELECT res_id FROM rg5329_recalc_job WHERE res_model = %s AND res_id = %s", [order._name, order.id],
+        )
+        return [res_id for res_id, in self.env.cr.fetchall()]
+
+    def _trigger_count(self):
+        return self.env['ir.cron.trigger'].sudo().search_count([('cron_id', '=', self.cron.id)])
+
+    def test_large_order_enqueued_at_precommit(self):
+        triggers = self._trigger_count()
+        order = self._create_sale_order(10, 20000000)
+        self.env.flush_all()
+        # Encolado en memoria durante el cómputo, sin filas ni disparos todavía
+        self.assertTrue(order.rg5329_pending)
+        self.assertFalse(self._job_ids(order))
+        self.assertEqual(self._trigger_count(), triggers)
+
+        self.env.cr.precommit.run()
+        self.assertEqual(self._job_ids(order), [order.id])
+        self.assertEqual(self._trigger_count(), triggers + 1)
+
+        # Un cambio de producto llega al motor y vuelve a encolar el pedido
+        # ya pendiente: la fila sigue siendo única y el cron no se dispara otra vez
+        Job = type(self.env['rg5329.recalc.job'])
+        with patch.object(Job, '_enqueue_at_commit', autospec=True,
+                          side_effect=Job._enqueue_at_commit) as enqueue_at_commit:
+            order.order_line[0].product_id = self.products[1][0]
+            self.env.flush_all()
+        self.assertTrue(enqueue_at_commit.called)
+        self.env.cr.precommit.run()
+        self.assertEqual(self._job_ids(order), [order.id])
+        self.assertEqual(self._trigger_count(), triggers + 1)
+
+    def test_cron_applies_tax_to_queued_order(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0)
+        order = self._create_sale_order(10, 20000000)
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.assertNotIn(rg5329_tax, order.order_line[0].tax_id)
+
+        self.env['rg5329.recalc.job']._cron_process_jobs()
+        self.assertFalse(self._job_ids(order))
+        self.assertFalse(order.rg5329_pending)
+        self.assertIn(rg5329_tax, order.order_line[0].tax_id)
+
+    def test_dequeue_before_commit(self):
+        order = self._create_purchase_order(10, 20000000)
+        self.env.flush_all()
+        self.assertEqual(self.env['rg5329.recalc.job']._dequeue(order), order)
+        self.assertFalse(order.rg5329_pending)
+        self.env.cr.precommit.run()
+        self.assertFalse(self._job_ids(order))
+
+    def _orders_by_state(self):
+        """Pedidos chicos (procesados en el momento) de venta y compra: (abiertos, confirmados)"""
+        open_orders = [self._create_sale_order(3, 20000000), self._create_purchase_order(3, 20000000)]
+        confirmed = [self._create_sale_order(3, 20000000), self._create_purchase_order(3, 20000000)]
+        confirmed[0].action_confirm()
+        confirmed[1].button_confirm()
+        return open_orders, confirmed
+
+    def assertQueued(self, queued, not_queued):
+        for order in queued:
+            self.assertEqual(self._job_ids(order), [order.id], "%s was not queued" % order._name)
+        for order in not_queued:
+            self.assertFalse(self._job_ids(order), "confirmed %s was queued" % order._name)
+
+    def test_product_toggle_requeues_open_orders(self):
+        open_orders, confirmed = self._orders_by_state()
+        self.products[0][0].product_tmpl_id.apply_rg5329 = False
+        self.assertQueued(open_orders, confirmed)
+
+    def test_partner_exemption_requeues_open_orders(self):
+        open_orders, confirmed = self._orders_by_state()
+        self.partners['eligible'].rg5329_exempt = True
+        self.assertQueued(open_orders, confirmed)
+
+    def test_partner_responsibility_requeues_open_orders(self):
+        open_orders, confirmed = self._orders_by_state()
+        self.partners['eligible'].l10n_ar_afip_responsibility_type_id = self.env.ref('l10n_ar.res_CF')
+        self.assertQueued(open_orders, confirmed)
+
+    def test_rg5329_tax_write_requeues_open_orders(self):
+        open_orders, confirmed = self._orders_by_state()
+        self.env['account.tax']._get_rg5329_tax('sale', 3.0).write({'amount': 3.0})
+        self.assertQueued(open_orders, confirmed)
+
+    def test_failing_order_does_not_block_queue(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0)
+        orders = self.env['sale.order'].concat(*(self._create_sale_order(10, 20000000) for _i in range(3)))
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+        self.assertFalse(orders.order_line.tax_id & rg5329_tax)
+
+        SaleOrder = type(orders)
+        apply_logic = SaleOrder._apply_rg5329_logic
+
+        def apply_or_fail(records):
+            if orders[1] in records:
+                raise UserError("RG5329 test failure")
+            return apply_logic(records)
+
+        with patch.object(SaleOrder, '_apply_rg5329_logic', autospec=True, side_effect=apply_or_fail), \
+                mute_logger('odoo.addons.modulo_rg5329.models.rg5329_recalc_job'):
+            self.env['rg5329.recalc.job']._cron_process_jobs()
+
+        # La cola se vació y los demás pedidos del lote se recalcularon
+        for order in orders:
+            self.assertFalse(self._job_ids(order))
+        self.assertIn(rg5329_tax, orders[0].order_line[0].tax_id)
+        self.assertNotIn(rg5329_tax, orders[1].order_line[0].tax_id)
+        self.assertIn(rg5329_tax, orders[2].order_line[0].tax_id)
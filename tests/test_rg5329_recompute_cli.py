@@ -0,0 +1,76 @@
+import os
+
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import SQL
+
+from odoo.addons.modulo_rg5329.cli.rg5329_recompute import Rg5329Recompute, _worker_pool
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+def _worker_probe():
+    """Se ejecuta en el hijo: el addon es importable y el proceso es otro"""
+    from odoo.addons.modulo_rg5329.cli import rg5329_recompute
+    return os.getpid(), rg5329_recompute._recompute_partition.__module__
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329RecomputeCli(TransactionCase):
+
+    def test_worker_pool_runs_addon_functions(self):
+        with _worker_pool(2) as executor:
+            results = [executor.submit(_worker_probe).result(timeout=60) for _i in range(2)]
+        for pid, module in results:
+            self.assertNotEqual(pid, os.getpid())
+            self.assertEqual(module, 'odoo.addons.modulo_rg5329.cli.rg5329_recompute')
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329RecomputeRange(Rg5329BenchCommon):
+
+    def _customer_move_ids(self):
+        self.env.flush_all()
+        return self.env['account.move'].search(
+            [('move_type', 'in', ['out_invoice', 'out_refund'])], order='id'
+        ).ids
+
+    def test_range_restores_corrupted_perception(self):
+        moves = self._create_invoice(9, 20000000) | self._create_invoice(9, 20000000, 'exempt')
+        self.env.flush_all()
+        expected = [(move.rg5329_perception_amount, move.rg5329_base_amount) for move in moves]
+        self.assertTrue(expected[0][0])
+
+        self.env.cr.execute(SQL(
+            "UPDATE account_move SET rg5329_perception_amount = 12345.0, rg5329_base_amount = 0.0 WHERE id IN %s",
+            tuple(moves.ids),
+        ))
+        self.env.invalidate_all()
+        self.assertEqual(moves[0].rg5329_perception_amount, 12345.0)
+
+        count = self.env['account.move']._rg5329_recompute_perception_range(min(moves.ids), max(moves.ids))
+        self.assertEqual(count, 2)
+        self.env.invalidate_all()
+        self.assertEqual([(move.rg5329_perception_amount, move.rg5329_base_amount) for move in moves], expected)
+
+    def test_get_partitions(self):
+        self._create_invoice(3, 20000000)
+        self._create_invoice(3, 20000000)
+        self._create_invoice(3, 20000000)
+        move_ids = self._customer_move_ids()
+        command = Rg5329Recompute()
+
+        # Partición más grande que la tabla: un solo rango con todo
+        self.assertEqual(command._get_partitions(self.env.cr, len(move_ids) + 10),
+                         [(move_ids[0], move_ids[-1], len(move_ids))])
+
+        partitions = command._get_partitions(self.env.cr, 2)
+        self.assertEqual([count for _min_id, _max_id, count in partitions][:-1], [2] * (len(partitions) - 1))
+        self.assertEqual(sum(count for _min_id, _max_id, count in partitions), len(move_ids))
+        self.assertEqual(partitions[0][0], move_ids[0])
+        self.assertEqual(partitions[-1][1], move_ids[-1])
+
+        # Sin facturas de cliente (el cambio se descarta con la transacción del test)
+        self.env.cr.execute(SQL(
+            "UPDATE account_move SET move_type = 'entry' WHERE id IN %s", tuple(move_ids),
+        ))
+        self.assertEqual(command._get_partitions(self.env.cr, 2), [])
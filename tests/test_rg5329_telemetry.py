@@ -0,0 +1,42 @@
+import os
+from unittest.mock import MagicMock, patch
+
+from odoo.tests import BaseCase, tagged
+
+from ..utils import telemetry as otel
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329Telemetry(BaseCase):
+
+    def _sample_ratio(self, value):
+        with patch.dict(os.environ, {'RG5329_OTEL_SAMPLE_RATIO': value}):
+            return otel._get_sample_ratio()
+
+    def test_sample_ratio(self):
+        with patch.dict(os.environ):
+            os.environ.pop('RG5329_OTEL_SAMPLE_RATIO', None)
+            self.assertEqual(otel._get_sample_ratio(), 1.0)
+        self.assertEqual(self._sample_ratio('0.25'), 0.25)
+        self.assertEqual(self._sample_ratio('-0.5'), 0.0)
+        self.assertEqual(self._sample_ratio('3'), 1.0)
+        with self.assertLogs(otel._logger, 'WARNING'):
+            self.assertEqual(self._sample_ratio('diez por ciento'), 1.0)
+
+    def test_eligibility_events_need_a_recording_span(self):
+        # Implementación instrumentada: sin OTel el helper público es un no-op
+        add_eligibility_events = otel._ENABLED_HELPERS['add_eligibility_events']
+
+        span = MagicMock()
+        span.is_recording.return_value = False
+        skip_reasons = MagicMock()
+        add_eligibility_events(span, skip_reasons)
+        span.add_event.assert_not_called()
+        skip_reasons.items.assert_not_called()
+
+        span.is_recording.return_value = True
+        add_eligibility_events(span, {7: False, 8: 'customer_exempt'})
+        self.assertEqual([call.args for call in span.add_event.call_args_list], [
+            ("rg5329.eligibility", {"partner.id": 7, "eligible": True, "reason": "eligible"}),
+            ("rg5329.eligibility", {"partner.id": 8, "eligible": False, "reason": "customer_exempt"}),
+        ])
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from odoo.addons.modulo_rg5329.hooks import _resync_rg5329_threshold_amounts
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329ThresholdAmount(Rg5329BenchCommon):
+    """El monto umbral almacenado coincide siempre con el calculado desde las líneas"""
+
+    def assertThresholdInSync(self, order):
+        self.env.flush_all()
+        self.env.invalidate_all()
+        live = sum(order.order_line._rg5329_threshold_contributions().values())
+        self.assertAlmostEqual(order.rg5329_threshold_amount, live, places=2)
+
+    def test_backfill_confirmed_purchase_order(self):
+        order = self._create_purchase_order(10, 20000000)
+        order.button_confirm()
+        self.assertIn(order.state, ('purchase', 'to approve'))
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE purchase_order SET rg5329_threshold_amount = 0 WHERE id = %s", [order.id])
+        self.env.invalidate_all()
+
+        _resync_rg5329_threshold_amounts(self.env)
+
+        self.assertGreaterEqual(order.rg5329_threshold_amount, 10000000)
+        self.assertThresholdInSync(order)
+
+    def _map_taxes_to_reduced_rate(self, order, type_tax_use):
+        """Productos con IVA 21% y una posición fiscal que lo mapea a 10,5%"""
+        taxes_field = 'taxes_id' if type_tax_use == 'sale' else 'supplier_taxes_id'
+        for product, rate in self.products:
+            product[taxes_field] = self.iva[type_tax_use, 21.0]
+        fiscal_position = self.env['account.fiscal.position'].create({
+            'name': 'RG5329 IVA reducido %s' % type_tax_use,
+            'tax_ids': [(0, 0, {
+                'tax_src_id': self.iva[type_tax_use, 21.0].id,
+                'tax_dest_id': self.iva[type_tax_use, 10.5].id,
+            })],
+        })
+        order.fiscal_position_id = fiscal_position
+        # Lo que hacen el onchange de la posición fiscal / "Actualizar impuestos"
+        order.order_line._compute_tax_id()
+
+    def test_sale_fiscal_position_change(self):
+        order = self._create_sale_order(10, 9900000)
+        self._map_taxes_to_reduced_rate(order, 'sale')
+        self.assertThresholdInSync(order)
+        self.assertAlmostEqual(order.rg5329_threshold_amount, order.amount_untaxed, places=2)
+
+    def test_purchase_fiscal_position_change(self):
+        order = self._create_purchase_order(10, 9900000)
+        total_before = order.rg5329_threshold_amount
+        self._map_taxes_to_reduced_rate(order, 'purchase')
+        self.assertThresholdInSync(order)
+        self.assertLess(order.rg5329_threshold_amount, total_before)
+        perception = sum(line._rg5329_perception_amount() for line in order.order_line)
+        self.assertAlmostEqual(order.rg5329_threshold_amount, order.amount_total - perception, places=2)
+
+    def test_line_unlink_keeps_amount_in_sync(self):
+        for order, taxes_field in (
+            (self._create_sale_order(10, 10500000), 'tax_id'),
+            (self._create_purchase_order(10, self._untaxed_total(10, 10500000)), 'taxes_id'),
+        ):
+            rg5329_tax = self.env['account.tax']._get_rg5329_tax(order._name.split('.')[0], 3.0)
+            self.env.flush_all()
+            line = order.order_line[0]
+            self.assertIn(rg5329_tax, line[taxes_field])
+            # Below the threshold after removing one line: the tax goes away
+            order.order_line[1].unlink()
+            self.assertThresholdInSync(order)
+            self.assertLess(order.rg5329_threshold_amount, 10000000)
+            self.assertNotIn(rg5329_tax, line[taxes_field], "%s: tax kept after unlink" % order._name)
+
+    def _count_engine_calls(self, order, func):
+        """Llamadas a _apply_rg5329_logic durante ``func`` y el flush posterior"""
+        Order = type(order)
+        with patch.object(Order, '_apply_rg5329_logic', autospec=True,
+                          side_effect=Order._apply_rg5329_logic) as engine:
+            func()
+            self.env.flush_all()
+        return engine.call_count
+
+    def test_same_side_write_skips_engine(self):
+        for order, qty_field in (
+            (self._create_sale_order(10, 5000000), 'product_uom_qty'),
+            (self._create_purchase_order(10, 5000000), 'product_qty'),
+        ):
+            self.env.flush_all()
+            line = order.order_line[0]
+            calls = self._count_engine_calls(order, lambda: line.write({qty_field: 2}))
+            self.assertEqual(calls, 0, "%s: write below the threshold ran the engine" % order._name)
+
+    def test_crossing_write_runs_engine(self):
+        rg5329_tax = self.env['account.tax']._get_rg5329_tax('sale', 3.0)
+        order = self._create_sale_order(10, 9900000)
+        self.env.flush_all()
+        line = order.order_line[0]
+        calls = self._count_engine_calls(order, lambda: line.write({'price_unit': line.price_unit + 200000}))
+        self.assertGreaterEqual(calls, 1)
+        self.assertIn(rg5329_tax, line.tax_id)
@@ -0,0 +1,48 @@
+from collections import Counter
+
+from odoo import Command
+from odoo.tests import tagged
+
+from .benchmarks.common import Rg5329BenchCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRg5329UiRefresh(Rg5329BenchCommon):
+    """Un solo recálculo de totales y una sola notificación por pedido, aunque cambien varias líneas"""
+
+    def _assert_refreshed_once(self, orders, line_tax_field, amounts_method):
+        Tax = self.env['account.tax']
+        type_tax_use = 'sale' if orders._name == 'sale.order' else 'purchase'
+        rg5329_taxes = Tax._get_rg5329_tax(type_tax_use, 3.0) | Tax._get_rg5329_tax(type_tax_use, 1.5)
+        rg_lines = orders.order_line.filtered(lambda line: line[line_tax_field] & rg5329_taxes)
+        self.assertEqual(len(rg_lines), 6)
+
+        # Sacar las percepciones sin pasar por el motor
+        rg_lines.with_context(rg5329_tax_update=True, skip_onchange=True).write({
+            line_tax_field: [Command.unlink(tax.id) for tax in rg5329_taxes],
+        })
+        self.env.flush_all()
+        self.assertFalse(orders.order_line[line_tax_field] & rg5329_taxes)
+
+        with self.count_calls('bus.bus', '_sendone') as sendone, \
+                self.count_calls(orders._name, amounts_method) as amounts:
+            orders.with_context(rg5329_sync=True)._apply_rg5329_logic()
+            self.env.flush_all()
+
+        self.assertTrue(all(line[line_tax_field] & rg5329_taxes for line in rg_lines))
+        self.assertEqual(
+            Counter(call.args[3]['order_id'] for call in sendone.call_args_list),
+            Counter(orders.ids),
+        )
+        self.assertEqual(
+            Counter(order_id for call in amounts.call_args_list for order_id in call.args[0].ids),
+            Counter(orders.ids),
+        )
+
+    def test_sale_orders(self):
+        orders = self._create_sale_order(4, 15000000) | self._create_sale_order(4, 15000000)
+        self._assert_refreshed_once(orders, 'tax_id', '_compute_amounts')
+
+    def test_purchase_orders(self):
+        orders = self._create_purchase_order(4, 15000000) | self._create_purchase_order(4, 15000000)
+        self._assert_refreshed_once(orders, 'taxes_id', '_amount_all')
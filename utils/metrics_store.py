@@ -0,0 +1,345 @@
+"""
+In-process aggregation of the RG5329 metrics, exposed in Prometheus format.
+
+Each Odoo process (prefork worker, cron worker or threaded server) keeps
+its own counters and histograms in per-thread shards, so recording never
+takes a lock. The shards of finished threads are folded into a per-process
+base. A background thread snapshots the process every few seconds to its
+own file in the metrics directory, named after the pid and the process
+start time; the ``/rg5329/metrics`` controller flushes its own process and
+merges all the files into one Prometheus text exposition. Files left by
+dead processes are folded into ``archive.json``, so counters never go
+down when a worker is recycled or a pid is reused.
+
+Configuration via environment variables:
+    RG5329_METRICS_TOKEN=secret       # enables the store and the endpoint (Bearer token)
+    RG5329_METRICS_DIR=/var/lib/odoo/rg5329_metrics   # optional, default: <tmp>/rg5329_metrics
+
+Scrape configuration::
+
+    - job_name: odoo-rg5329
+      metrics_path: /rg5329/metrics
+      authorization:
+        credentials: secret
+"""
+import atexit
+import fcntl
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+ENABLED = bool(os.environ.get("RG5329_METRICS_TOKEN"))
+
+_FLUSH_INTERVAL = 5.0
+
+# Bucket upper bounds per histogram (the +Inf bucket is implicit)
+_DEFAULT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+HISTOGRAM_BUCKETS = {
+    "rg5329_apply_logic_duration_ms": _DEFAULT_BUCKETS,
+    "rg5329_perception_base_amount_ars": (1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+    "rg5329_recalc_throughput_orders_per_s": (0.1, 0.5, 1, 5, 10, 50, 100, 500),
+}
+
+HELP = {
+    "rg5329_perceptions_applied_total": "Total RG5329 perception taxes applied across order lines",
+    "rg5329_perceptions_skipped_total": "Total times RG5329 perception was not applied (with reason)",
+    "rg5329_perception_base_amount_ars": "Base line subtotal (ARS) on which RG5329 perception was applied",
+    "rg5329_apply_logic_duration_ms": "Wall-clock duration of _apply_rg5329_logic() in milliseconds",
+    "rg5329_errors_total": "Total unhandled errors in RG5329 processing methods",
+    "rg5329_taxes_restored_total": "Total RG5329 taxes restored after order confirmation",
+    "rg5329_cae_enrichments_total": "Total CAE requests enriched with CondicionIVAReceptorId (RG 5616)",
+    "rg5329_write_precheck_total": "Order evaluations requested by order line writes, by pre-check result",
+    "rg5329_recalc_jobs_total": "Asynchronous RG5329 recalculation jobs, by action (queued/processed)",
+    "rg5329_recalc_throughput_orders_per_s": "Orders recalculated per second by one run of the RG5329 job worker",
+}
+
+_ARCHIVE_FILENAME = "archive.json"
+
+
+# ---------------------------------------------------------------------------
+# Recording: per-thread shards, no lock on the hot path
+# ---------------------------------------------------------------------------
+def _init_process():
+    """(Re)set the per-process state; also runs in the child after a fork"""
+    global _local, _shards, _base, _shards_lock, _flush_lock, _flusher_pid, _process_key
+    _local = threading.local()
+    _shards = {}                     # thread ident -> (thread, (counters, histograms))
+    _base = ({}, {})                 # shards of finished threads
+    _shards_lock = threading.Lock()  # only taken once per thread, to register its shard
+    _flush_lock = threading.Lock()   # never waited on: a busy flush is simply skipped
+    _flusher_pid = None
+    _process_key = "%d-%d" % (os.getpid(), time.time_ns())
+
+
+_init_process()
+
+
+def _merge_into(target, shard):
+    counters, histograms = target
+    for key, value in dict(shard[0]).items():
+        counters[key] = counters.get(key, 0) + value
+    for key, data in dict(shard[1]).items():
+        merged = histograms.get(key)
+        histograms[key] = list(data) if merged is None else [a + b for a, b in zip(merged, data)]
+
+
+def _fold_dead_shards():
+    """Fold the shards of finished threads into the process base (``_shards_lock`` held)"""
+    for ident, (thread, shard) in list(_shards.items()):
+        if not thread.is_alive():
+            _merge_into(_base, shard)
+            del _shards[ident]
+
+
+def _get_shard():
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = ({}, {})  # (counters, histograms)
+        thread = threading.current_thread()
+        with _shards_lock:
+            _fold_dead_shards()
+            previous = _shards.get(thread.ident)
+            if previous is not None:
+                # Reused thread ident: the previous owner is gone
+                _merge_into(_base, previous[1])
+            _shards[thread.ident] = (thread, shard)
+        _ensure_flusher()
+    return shard
+
+
+def add(name, labels, value=1):
+    """Add ``value`` to counter ``name``; ``labels`` is a tuple of (key, value) pairs."""
+    counters = _get_shard()[0]
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, labels, value):
+    """Record ``value`` in histogram ``name``; ``labels`` is a tuple of (key, value) pairs."""
+    histograms = _get_shard()[1]
+    key = (name, labels)
+    data = histograms.get(key)
+    if data is None:
+        bounds = HISTOGRAM_BUCKETS.get(name, _DEFAULT_BUCKETS)
+        # [bucket counts..., +Inf count, sum]
+        data = histograms[key] = [0] * (len(bounds) + 1) + [0.0]
+    else:
+        bounds = HISTOGRAM_BUCKETS.get(name, _DEFAULT_BUCKETS)
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            data[index] += 1
+            break
+    else:
+        data[len(bounds)] += 1
+    data[-1] += value
+
+
+# ---------------------------------------------------------------------------
+# Per-process snapshot files
+# ---------------------------------------------------------------------------
+def get_token():
+    return os.environ.get("RG5329_METRICS_TOKEN") or None
+
+
+def _get_dir():
+    return os.environ.get("RG5329_METRICS_DIR") or os.path.join(tempfile.gettempdir(), "rg5329_metrics")
+
+
+def _snapshot():
+    """Merge the base and the thread shards of this process"""
+    snapshot = ({}, {})
+    with _shards_lock:
+        _fold_dead_shards()
+        _merge_into(snapshot, _base)
+        shards = [shard for _thread, shard in _shards.values()]
+    for shard in shards:
+        _merge_into(snapshot, shard)
+    return snapshot
+
+
+def _write_json(path, counters, histograms):
+    """Atomically replace ``path`` with the given metrics"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+            "histograms": [[name, labels, data] for (name, labels), data in histograms.items()],
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    """(counters, histograms) stored in ``path``; raises OSError/ValueError"""
+    with open(path) as f:
+        snapshot = json.load(f)
+    counters, histograms = {}, {}
+    for name, labels, value in snapshot.get("counters", []):
+        counters[(name, tuple(map(tuple, labels)))] = value
+    for name, labels, data in snapshot.get("histograms", []):
+        histograms[(name, tuple(map(tuple, labels)))] = data
+    return counters, histograms
+
+
+def flush():
+    """Write this process's snapshot to ``<dir>/<pid>-<start>.json`` (atomic replace)"""
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        counters, histograms = _snapshot()
+        directory = _get_dir()
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, "%s.json" % _process_key), counters, histograms)
+    except OSError:
+        _logger.warning("RG5329 metrics: could not write snapshot", exc_info=True)
+    finally:
+        _flush_lock.release()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(_FLUSH_INTERVAL)
+        flush()
+
+
+def _ensure_flusher():
+    """Start the periodic flush thread of this process (idle workers flush too)"""
+    global _flusher_pid
+    with _shards_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name="rg5329-metrics-flush", daemon=True).start()
+
+
+if ENABLED:
+    atexit.register(flush)
+    os.register_at_fork(after_in_child=_init_process)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dead_files(filenames):
+    """Snapshot files of processes that no longer exist
+
+    A pid is dead when no process has it, or when a newer file with the same
+    pid exists (the pid was reused by a process started later).
+    """
+    latest = {}
+    processes = []
+    for filename in filenames:
+        try:
+            pid, start = map(int, filename[:-len(".json")].split("-"))
+        except ValueError:
+            continue
+        processes.append((filename, pid, start))
+        latest[pid] = max(latest.get(pid, start), start)
+    return [
+        filename for filename, pid, start in processes
+        if filename != "%s.json" % _process_key and (start < latest[pid] or not _pid_alive(pid))
+    ]
+
+
+def _fold_dead_files(directory, filenames):
+    """Add the dead processes' files to the archive and remove them"""
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = [name for name in _dead_files(filenames) if os.path.exists(os.path.join(directory, name))]
+        if not dead:
+            return
+        archive_path = os.path.join(directory, _ARCHIVE_FILENAME)
+        try:
+            archive = _read_json(archive_path)
+        except FileNotFoundError:
+            archive = ({}, {})
+        for filename in dead:
+            try:
+                _merge_into(archive, _read_json(os.path.join(directory, filename)))
+            except (OSError, ValueError):
+                continue
+        _write_json(archive_path, *archive)
+        for filename in dead:
+            os.unlink(os.path.join(directory, filename))
+
+
+def _load_all():
+    """Merge the snapshot files of every process, including this one"""
+    flush()
+    merged = ({}, {})
+    directory = _get_dir()
+    try:
+        filenames = [name for name in os.listdir(directory) if name.endswith(".json")]
+    except FileNotFoundError:
+        filenames = []
+    if filenames:
+        try:
+            _fold_dead_files(directory, filenames)
+            filenames = [name for name in os.listdir(directory) if name.endswith(".json")]
+        except OSError:
+            _logger.warning("RG5329 metrics: could not fold dead process files", exc_info=True)
+    for filename in filenames:
+        try:
+            _merge_into(merged, _read_json(os.path.join(directory, filename)))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+# ---------------------------------------------------------------------------
+# Prometheus text exposition
+# ---------------------------------------------------------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (key, _escape(value)) for key, value in pairs)
+
+
+def _format_bound(bound):
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def render_prometheus():
+    """All processes' metrics in Prometheus text format (version 0.0.4)"""
+    counters, histograms = _load_all()
+    output = []
+
+    for name in sorted({name for name, labels in counters}):
+        output.append("# HELP %s %s" % (name, HELP.get(name, name)))
+        output.append("# TYPE %s counter" % name)
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                output.append("%s%s %s" % (name, _format_labels(labels), value))
+
+    for name in sorted({name for name, labels in histograms}):
+        bounds = (*HISTOGRAM_BUCKETS.get(name, _DEFAULT_BUCKETS), math.inf)
+        output.append("# HELP %s %s" % (name, HELP.get(name, name)))
+        output.append("# TYPE %s histogram" % name)
+        for (metric, labels), data in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(bounds, data):
+                cumulative += count
+                output.append("%s_bucket%s %s" % (name, _format_labels(labels, [("le", _format_bound(bound))]), cumulative))
+            output.append("%s_sum%s %s" % (name, _format_labels(labels), data[-1]))
+            output.append("%s_count%s %s" % (name, _format_labels(labels), cumulative))
+
+    return "\n".join(output) + "\n"
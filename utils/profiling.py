@@ -0,0 +1,82 @@
+"""
+Modo de perfilado de los motores RG 5329.
+
+Desglosa el tiempo de una llamada a un motor (venta, compra, factura) por
+fases, con el tiempo de reloj y la cantidad de consultas SQL de cada una
+(contador ``cr.sql_log_count`` del cursor). El resultado se exporta como
+eventos del span y se guarda en el buffer circular ``rg5329.profile.trace``
+al confirmar la transacción, visible por pedido o factura desde el modo
+desarrollador.
+
+Se activa con el parámetro de sistema ``modulo_rg5329.profiling`` o, para una
+llamada puntual, con el contexto ``rg5329_profile=True``. Desactivado, los
+motores reciben un perfilador nulo compartido sin costo.
+
+Uso::
+
+    profiler = profiling.get_profiler(self.env, "sale.apply_logic", span)
+    ...                          # trabajo de la fase
+    profiler.lap("eligibility")  # tiempo y consultas desde la marca anterior
+    ...
+    profiler.save(orders, line_count=len(lines))
+"""
+import time
+
+PROFILING_PARAM = 'modulo_rg5329.profiling'
+
+
+class _NoOpProfiler:
+    """Perfilador desactivado: una sola instancia compartida"""
+
+    def lap(self, name):
+        pass
+
+    def save(self, records, line_count=0):
+        pass
+
+
+_NOOP_PROFILER = _NoOpProfiler()
+
+
+class Rg5329Profiler:
+    """Tiempos y consultas SQL por fase de una llamada a un motor RG 5329"""
+
+    def __init__(self, env, engine, span=None):
+        self.env = env
+        self.engine = engine
+        self.span = span
+        self.phases = {}
+        self._start = self._mark = time.perf_counter()
+        self._start_queries = self._mark_queries = env.cr.sql_log_count
+
+    def lap(self, name):
+        """Suma a la fase ``name`` el tiempo y las consultas desde la marca anterior"""
+        now, queries = time.perf_counter(), self.env.cr.sql_log_count
+        duration_ms, query_count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (
+            duration_ms + (now - self._mark) * 1000,
+            query_count + queries - self._mark_queries,
+        )
+        self._mark, self._mark_queries = now, queries
+
+    def save(self, records, line_count=0):
+        """Exporta las fases como eventos del span y las encola para el buffer circular"""
+        duration_ms = (time.perf_counter() - self._start) * 1000
+        query_count = self.env.cr.sql_log_count - self._start_queries
+        if self.span is not None and self.span.is_recording():
+            for name, (phase_ms, phase_queries) in self.phases.items():
+                self.span.add_event("rg5329.phase", {
+                    "phase": name,
+                    "duration_ms": phase_ms,
+                    "query_count": phase_queries,
+                })
+        self.env['rg5329.profile.trace'].sudo()._record(
+            self.engine, records, self.phases, duration_ms, query_count, line_count,
+        )
+
+
+def get_profiler(env, engine, span=None):
+    """Perfilador real si el perfilado está activo, si no el perfilador nulo"""
+    if env.context.get('rg5329_profile') or env['ir.config_parameter'].sudo().get_param(PROFILING_PARAM):
+        return Rg5329Profiler(env, engine, span)
+    return _NOOP_PROFILER
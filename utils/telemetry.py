@@ -10,18 +10,25 @@ Installation (inside the Odoo virtualenv):
 Configuration via environment variables:
     OTEL_EXPORTER_OTLP_ENDPOINT=http://otel-collector:4317   # OTLP/gRPC endpoint
     OTEL_SERVICE_NAME=odoo-rg5329                            # optional override
+    RG5329_OTEL_SAMPLE_RATIO=0.1                             # fraction of root traces kept (default 1.0)
 
 Development (console output, no extra infra needed):
     Leave OTEL_EXPORTER_OTLP_ENDPOINT unset — spans/metrics go to stdout.
 
 Production:
     export OTEL_EXPORTER_OTLP_ENDPOINT=http://otel-collector:4317
+
+Without a collector, set RG5329_METRICS_TOKEN to aggregate the metrics
+in-process and scrape them from /rg5329/metrics (see metrics_store).
 """
 import os
 import time
 import logging
+import functools
 import threading
 
+from . import metrics_store as _metrics
+
 _logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -31,6 +38,7 @@ try:
     from opentelemetry import trace, metrics
     from opentelemetry.sdk.resources import Resource
     from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
     from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
     from opentelemetry.sdk.metrics import MeterProvider
     from opentelemetry.sdk.metrics.export import (
@@ -55,6 +63,9 @@ if _OTEL_AVAILABLE:
     except ImportError:
         _OTLP_AVAILABLE = False
 
+# OTEL_SDK_DISABLED=true turns telemetry off even when the packages are installed
+_ENABLED = _OTEL_AVAILABLE and os.environ.get("OTEL_SDK_DISABLED", "").strip().lower() != "true"
+
 # ---------------------------------------------------------------------------
 # Lazy, thread-safe, idempotent initialization
 # ---------------------------------------------------------------------------
@@ -71,6 +82,19 @@ _processing_duration = None
 _errors_counter = None
 _taxes_restored = None
 _cae_enrichments = None
+_write_prechecks = None
+_recalc_jobs = None
+_recalc_throughput = None
+
+
+def _get_sample_ratio():
+    """Trace sampling ratio from RG5329_OTEL_SAMPLE_RATIO, clamped to [0, 1]."""
+    try:
+        ratio = float(os.environ.get("RG5329_OTEL_SAMPLE_RATIO", "1.0"))
+    except ValueError:
+        _logger.warning("RG5329 OTel: invalid RG5329_OTEL_SAMPLE_RATIO, sampling everything")
+        return 1.0
+    return min(max(ratio, 0.0), 1.0)
 
 
 def _setup_providers_if_needed():
@@ -89,7 +113,7 @@ def _setup_providers_if_needed():
 
     resource = Resource.create({
         "service.name": os.environ.get("OTEL_SERVICE_NAME", "odoo-rg5329"),
-        "service.version": "18.0.1.0.0",
+        "service.version": "18.0.1.1.0",
         "service.namespace": "odoo",
     })
 
@@ -106,7 +130,14 @@ def _setup_providers_if_needed():
             "(set OTEL_EXPORTER_OTLP_ENDPOINT to send to a collector)"
         )
 
-    tracer_provider = TracerProvider(resource=resource)
+    # Parent-based: child spans follow the decision of their root span, so a
+    # trace is either kept whole or dropped whole
+    sample_ratio = _get_sample_ratio()
+    _logger.info("RG5329 OTel: sampling %.0f%% of root traces", sample_ratio * 100)
+    tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
     tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
     trace.set_tracer_provider(tracer_provider)
 
@@ -126,8 +157,9 @@ def _init():
     global _initialized, _tracer, _meter
     global _perceptions_applied, _perceptions_skipped, _perception_base_amount
     global _processing_duration, _errors_counter, _taxes_restored, _cae_enrichments
+    global _write_prechecks, _recalc_jobs, _recalc_throughput
 
-    if _initialized or not _OTEL_AVAILABLE:
+    if _initialized or not _ENABLED:
         return
 
     with _init_lock:
@@ -140,7 +172,7 @@ def _init():
             "rg5329",
             schema_url="https://opentelemetry.io/schemas/1.11.0",
         )
-        _meter = metrics.get_meter("rg5329", version="18.0.1.0.0")
+        _meter = metrics.get_meter("rg5329", version="18.0.1.1.0")
 
         _perceptions_applied = _meter.create_counter(
             name="rg5329_perceptions_applied_total",
@@ -177,6 +209,21 @@ def _init():
             description="Total CAE requests enriched with CondicionIVAReceptorId (RG 5616)",
             unit="1",
         )
+        _write_prechecks = _meter.create_counter(
+            name="rg5329_write_precheck_total",
+            description="Order evaluations requested by order line writes, by pre-check result (skipped/evaluated)",
+            unit="1",
+        )
+        _recalc_jobs = _meter.create_counter(
+            name="rg5329_recalc_jobs_total",
+            description="Asynchronous RG5329 recalculation jobs, by action (queued/processed)",
+            unit="1",
+        )
+        _recalc_throughput = _meter.create_histogram(
+            name="rg5329_recalc_throughput_orders_per_s",
+            description="Orders recalculated per second by one run of the RG5329 job worker",
+            unit="1",
+        )
 
         _initialized = True
         _logger.info("RG5329 OTel: telemetry initialized")
@@ -204,6 +251,18 @@ class _NoOpSpan:
     def add_event(self, name, attributes=None):
         pass
 
+    def is_recording(self):
+        return False
+
+
+_NOOP_SPAN = _NoOpSpan()
+
+
+@functools.lru_cache(maxsize=None)
+def _attrs(*items):
+    """Metric attribute dict for ``(key, value)`` pairs, built once and reused."""
+    return dict(items)
+
 
 # ---------------------------------------------------------------------------
 # Public helpers — safe to call even when OTel is not installed
@@ -216,15 +275,55 @@ def start_span(name: str):
     Usage::
 
         with otel.start_span("rg5329.sale.apply_logic") as span:
-            span.set_attribute("order.name", self.name)
+            if span.is_recording():
+                span.set_attribute("order.name", self.name)
             ...
+
+    Unsampled spans (and the no-op span) are not recording: guard any
+    attribute that is costly to build with ``span.is_recording()``.
     """
-    _init()
-    if not _OTEL_AVAILABLE or _tracer is None:
-        return _NoOpSpan()
+    if not _initialized:
+        _init()
+    if _tracer is None:
+        return _NOOP_SPAN
     return _tracer.start_as_current_span(name)
 
 
+def add_eligibility_events(span, skip_reasons):
+    """
+    Record RG5329 eligibility decisions as events on ``span``, one per partner.
+
+    Replaces per-check eligibility spans; nothing is built when the span
+    is not recording.
+
+    :param skip_reasons: {partner_id: reason or False} from _rg5329_skip_reasons()
+    """
+    if not span.is_recording():
+        return
+    for partner_id, reason in skip_reasons.items():
+        span.add_event("rg5329.eligibility", {
+            "partner.id": partner_id,
+            "eligible": not reason,
+            "reason": reason or "eligible",
+        })
+
+
+def _count(counter, name, value, labels):
+    """Add ``value`` to an OTel counter and to the in-process metrics store."""
+    if _metrics.ENABLED:
+        _metrics.add(name, labels, value)
+    if counter:
+        counter.add(value, _attrs(*labels))
+
+
+def _observe(histogram, name, value, labels):
+    """Record ``value`` in an OTel histogram and in the in-process metrics store."""
+    if _metrics.ENABLED:
+        _metrics.observe(name, labels, value)
+    if histogram:
+        histogram.record(value, _attrs(*labels))
+
+
 def record_perception_applied(
     order_type: str = "sale",
     rate: float = 3.0,
@@ -237,12 +336,12 @@ def record_perception_applied(
     :param rate: perception rate used (3.0 or 1.5)
     :param base_amount: line.price_subtotal used as the perception base (ARS)
     """
-    _init()
-    attrs = {"order_type": order_type, "rate": str(rate)}
-    if _perceptions_applied:
-        _perceptions_applied.add(1, attrs)
-    if _perception_base_amount and base_amount > 0:
-        _perception_base_amount.record(base_amount, attrs)
+    if not _initialized:
+        _init()
+    labels = (("order_type", order_type), ("rate", str(rate)))
+    _count(_perceptions_applied, "rg5329_perceptions_applied_total", 1, labels)
+    if base_amount > 0:
+        _observe(_perception_base_amount, "rg5329_perception_base_amount_ars", base_amount, labels)
 
 
 def record_perception_skipped(order_type: str = "sale", reason: str = "unknown"):
@@ -256,23 +355,25 @@ def record_perception_skipped(order_type: str = "sale", reason: str = "unknown")
         - ``no_tax_found``     — RG5329 account.tax record missing in DB
         - ``wrong_state``      — order state not in ['draft', 'sent']
     """
-    _init()
-    if _perceptions_skipped:
-        _perceptions_skipped.add(1, {"order_type": order_type, "reason": reason})
+    if not _initialized:
+        _init()
+    _count(_perceptions_skipped, "rg5329_perceptions_skipped_total", 1,
+           (("order_type", order_type), ("reason", reason)))
 
 
 def record_error(method_name: str):
     """Record an unhandled exception in a RG5329 processing method."""
-    _init()
-    if _errors_counter:
-        _errors_counter.add(1, {"method": method_name})
+    if not _initialized:
+        _init()
+    _count(_errors_counter, "rg5329_errors_total", 1, (("method", method_name),))
 
 
 def record_processing_duration(duration_ms: float, order_type: str = "sale"):
     """Record wall-clock duration of a _apply_rg5329_logic() call."""
-    _init()
-    if _processing_duration:
-        _processing_duration.record(duration_ms, {"order_type": order_type})
+    if not _initialized:
+        _init()
+    _observe(_processing_duration, "rg5329_apply_logic_duration_ms", duration_ms,
+             (("order_type", order_type),))
 
 
 def record_taxes_restored(count: int, order_type: str = "purchase"):
@@ -286,9 +387,10 @@ def record_taxes_restored(count: int, order_type: str = "purchase"):
     :param count: number of lines on which taxes were restored
     :param order_type: "purchase" (sale orders don't go through confirm)
     """
-    _init()
-    if _taxes_restored and count > 0:
-        _taxes_restored.add(count, {"order_type": order_type})
+    if not _initialized:
+        _init()
+    if count > 0:
+        _count(_taxes_restored, "rg5329_taxes_restored_total", count, (("order_type", order_type),))
 
 
 def record_cae_enrichment(condicion_iva: int):
@@ -298,6 +400,93 @@ def record_cae_enrichment(condicion_iva: int):
 
     :param condicion_iva: the fiscal condition code injected into the request
     """
-    _init()
-    if _cae_enrichments:
-        _cae_enrichments.add(1, {"condicion_iva": str(condicion_iva)})
+    if not _initialized:
+        _init()
+    _count(_cae_enrichments, "rg5329_cae_enrichments_total", 1, (("condicion_iva", str(condicion_iva)),))
+
+
+def record_write_precheck(order_type: str = "sale", skipped: int = 0, evaluated: int = 0):
+    """
+    Record the outcome of the order line ``write`` pre-check.
+
+    :param order_type: "sale" or "purchase"
+    :param skipped: orders for which _apply_rg5329_logic() was not needed
+    :param evaluated: orders for which _apply_rg5329_logic() was run
+    """
+    if not _initialized:
+        _init()
+    if skipped:
+        _count(_write_prechecks, "rg5329_write_precheck_total", skipped,
+               (("order_type", order_type), ("result", "skipped")))
+    if evaluated:
+        _count(_write_prechecks, "rg5329_write_precheck_total", evaluated,
+               (("order_type", order_type), ("result", "evaluated")))
+
+
+def record_recalc_jobs(order_type: str = "sale", queued: int = 0, processed: int = 0):
+    """
+    Record asynchronous RG5329 recalculation jobs.
+
+    :param order_type: "sale" or "purchase"
+    :param queued: new jobs added to the queue (coalesced edits are not counted)
+    :param processed: orders recalculated by the cron worker
+    """
+    if not _initialized:
+        _init()
+    if queued:
+        _count(_recalc_jobs, "rg5329_recalc_jobs_total", queued,
+               (("order_type", order_type), ("action", "queued")))
+    if processed:
+        _count(_recalc_jobs, "rg5329_recalc_jobs_total", processed,
+               (("order_type", order_type), ("action", "processed")))
+
+
+def record_recalc_throughput(orders_per_s: float):
+    """Record the throughput (orders/s) of one run of the RG5329 job worker."""
+    if not _initialized:
+        _init()
+    _observe(_recalc_throughput, "rg5329_recalc_throughput_orders_per_s", orders_per_s, ())
+
+
+# ---------------------------------------------------------------------------
+# Zero-overhead fast path: without OTel (or with OTEL_SDK_DISABLED=true) and
+# without the in-process metrics store, the public helpers are rebound once,
+# at import time, to shared no-ops
+# ---------------------------------------------------------------------------
+def _noop(*args, **kwargs):
+    return None
+
+
+def _noop_start_span(name):
+    return _NOOP_SPAN
+
+
+# Instrumented implementations, kept for the telemetry microbenchmark
+_ENABLED_HELPERS = {
+    "start_span": start_span,
+    "add_eligibility_events": add_eligibility_events,
+    "record_perception_applied": record_perception_applied,
+    "record_perception_skipped": record_perception_skipped,
+    "record_error": record_error,
+    "record_processing_duration": record_processing_duration,
+    "record_taxes_restored": record_taxes_restored,
+    "record_cae_enrichment": record_cae_enrichment,
+    "record_write_precheck": record_write_precheck,
+    "record_recalc_jobs": record_recalc_jobs,
+    "record_recalc_throughput": record_recalc_throughput,
+}
+
+if not _ENABLED:
+    start_span = _noop_start_span
+    add_eligibility_events = _noop
+
+if not _ENABLED and not _metrics.ENABLED:
+    record_perception_applied = _noop
+    record_perception_skipped = _noop
+    record_error = _noop
+    record_processing_duration = _noop
+    record_taxes_restored = _noop
+    record_cae_enrichment = _noop
+    record_write_precheck = _noop
+    record_recalc_jobs = _noop
+    record_recalc_throughput = _noop